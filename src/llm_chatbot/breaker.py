@@ -0,0 +1,216 @@
+"""Circuit breakers per (model, endpoint) for the OpenAI fallback chain.
+
+Generation and the judge try the Responses API first and fall back to Chat
+Completions. When a model is unsupported on a path (capability error) or
+the path keeps failing, `BreakerBoard` opens that path's breaker so calls
+go straight to the path that works. After a cooldown the breaker turns
+half-open and the next call probes the path again while other callers keep
+being routed around it: success closes it, a failure re-opens it with a
+doubled cooldown. Capability errors open the
+breaker for a long cooldown on the first occurrence; rate limits,
+request errors and expired `previous_response_id` chains do not count.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .resilience import DeadlineExceeded
+from .scheduler import Shed
+
+logger = logging.getLogger(__name__)
+
+# Error text that marks a model/path as unsupported rather than broken
+CAPABILITY_HINTS = (
+    "not supported",
+    "unsupported",
+    "does not support",
+    "does not exist",
+    "model_not_found",
+    "not found",
+    "invalid model",
+    "unknown model",
+)
+
+
+def classify_error(err: BaseException) -> Optional[str]:
+    """Return `capability`, `failure`, or None for errors that should not count."""
+    if isinstance(err, (DeadlineExceeded, Shed)):
+        return None  # the reply ran out of time or was shed; the path did not fail
+    status = getattr(err, "status_code", None)
+    if status is None:
+        status = getattr(getattr(err, "response", None), "status_code", None)
+    msg = str(err).lower()
+    if "previous response" in msg or "previous_response" in msg:
+        return None  # a stale conversation chain (see `chain.py`), not the path
+    if status == 404 or (status in (400, 405) and any(h in msg for h in CAPABILITY_HINTS)):
+        return "capability"
+    if isinstance(status, int) and 400 <= status < 500:
+        return None  # rate limits, auth and malformed requests fail on every path alike
+    return "failure"  # 5xx, timeouts, connection errors
+
+
+@dataclass
+class BreakerConfig:
+    """Thresholds shared by all breakers."""
+
+    failure_threshold: int = 3  # consecutive failures that open a breaker
+    cooldown: float = 30.0  # seconds before the first half-open probe
+    max_cooldown: float = 600.0
+    capability_cooldown: float = 3600.0  # seconds a capability error keeps a path open
+    probe_timeout: float = 60.0  # a half-open probe that never reports back frees the path after this
+
+
+@dataclass
+class Breaker:
+    """State of one (model, endpoint) path."""
+
+    model: str
+    endpoint: str
+    state: str = "closed"  # closed | open | half_open
+    failures: int = 0
+    reason: str = ""
+    opened_at: float = 0.0
+    cooldown: float = 0.0
+    trips: int = 0
+    skipped: int = 0  # calls routed around this path while open
+    successes: int = 0
+    probe_at: float = 0.0  # when the in-flight half-open probe started (0: none)
+
+
+class BreakerBoard:
+    """Thread-safe registry of breakers keyed by model and endpoint."""
+
+    def __init__(self, config: Optional[BreakerConfig] = None, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config or BreakerConfig()
+        self._clock = clock
+        self._breakers: Dict[Tuple[str, str], Breaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: BreakerConfig) -> None:
+        self.config = config
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers = {}
+
+    def _get(self, model: str, endpoint: str) -> Breaker:
+        key = (model, endpoint)
+        b = self._breakers.get(key)
+        if b is None:
+            b = self._breakers[key] = Breaker(model, endpoint)
+        return b
+
+    def _transition(self, b: Breaker, state: str) -> None:
+        b.state = state
+        logger.info(
+            "openai-breaker: model=%s endpoint=%s state=%s reason=%s cooldown_s=%.0f",
+            b.model,
+            b.endpoint,
+            state,
+            b.reason or "-",
+            b.cooldown,
+        )
+
+    def state(self, model: str, endpoint: str) -> str:
+        with self._lock:
+            b = self._breakers.get((model, endpoint))
+            return b.state if b is not None else "closed"
+
+    def allow(self, model: str, endpoint: str) -> bool:
+        """True if a call may use this path (closed, or it is this caller's turn to probe).
+
+        Half-open paths admit a single probe at a time; other callers are
+        routed around them until it reports back (or `probe_timeout` passes).
+        """
+        with self._lock:
+            b = self._get(model, endpoint)
+            if b.state == "closed":
+                return True
+            now = self._clock()
+            if b.state == "open":
+                if now - b.opened_at < b.cooldown:
+                    b.skipped += 1
+                    return False
+                self._transition(b, "half_open")
+            elif b.probe_at and now - b.probe_at < self.config.probe_timeout:
+                b.skipped += 1
+                return False
+            b.probe_at = now
+            return True
+
+    def route(self, model: str, endpoints: Iterable[str]) -> List[str]:
+        """Endpoints to try for `model`, in preference order, skipping open paths.
+
+        If every path is open the full list is returned: trying beats
+        failing without a request.
+        """
+        endpoints = list(endpoints)
+        allowed = [e for e in endpoints if self.allow(model, e)]
+        if not allowed:
+            logger.debug("openai-breaker: all paths open for model=%s; trying anyway", model)
+        return allowed or endpoints
+
+    def success(self, model: str, endpoint: str) -> None:
+        with self._lock:
+            b = self._get(model, endpoint)
+            b.successes += 1
+            b.failures = 0
+            b.probe_at = 0.0
+            if b.state != "closed":
+                b.reason, b.cooldown = "", 0.0
+                self._transition(b, "closed")
+
+    def failure(self, model: str, endpoint: str, err: BaseException) -> Optional[str]:
+        """Record a failed call; returns the error class (see `classify_error`)."""
+        kind = classify_error(err)
+        c = self.config
+        with self._lock:
+            b = self._get(model, endpoint)
+            b.probe_at = 0.0  # a probe that did not count lets the next caller probe
+            if kind is None:
+                return None
+            b.failures += 1
+            if kind == "capability":
+                cooldown = c.capability_cooldown
+            elif b.state == "half_open":
+                cooldown = min(c.max_cooldown, max(c.cooldown, b.cooldown * 2))
+            elif b.failures >= c.failure_threshold and b.state == "closed":
+                cooldown = c.cooldown
+            else:
+                return kind
+            b.reason, b.cooldown, b.opened_at = kind, cooldown, self._clock()
+            b.trips += 1
+            self._transition(b, "open")
+        logger.warning("openai-breaker: opened model=%s endpoint=%s err=%s", model, endpoint, err)
+        return kind
+
+    def snapshot(self) -> List[dict]:
+        now = self._clock()
+        with self._lock:
+            return [
+                {
+                    "model": b.model,
+                    "endpoint": b.endpoint,
+                    "state": b.state,
+                    "reason": b.reason,
+                    "failures": b.failures,
+                    "trips": b.trips,
+                    "skipped": b.skipped,
+                    "successes": b.successes,
+                    "retry_in_s": round(max(0.0, b.cooldown - (now - b.opened_at)), 1) if b.state == "open" else 0.0,
+                }
+                for b in self._breakers.values()
+            ]
+
+
+BREAKERS = BreakerBoard()
+
+
+def configure_breakers(config: BreakerConfig) -> None:
+    """Apply thresholds to the process-wide breaker board."""
+    BREAKERS.configure(config)
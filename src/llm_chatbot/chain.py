@@ -0,0 +1,120 @@
+"""Server-side conversation state via `previous_response_id` (opt-in).
+
+With `context.chain_responses` on, the bot remembers the `id` of the last
+Responses reply per channel (`ChannelContext.response_id`, in memory only).
+The next turn sends only the messages stored since that reply, plus a short
+developer note for per-turn directives, with `previous_response_id`: the
+persona prompt, environment context and earlier turns are already held by
+the API. The chain is dropped and the full context resent when
+
+- `~reset` clears the channel (a fresh context has no chain),
+- the persona prompt or the generation model changed (`chain_key`),
+- the chain reached `chain_max_turns`, which bounds server-side growth and
+  refreshes the environment context and summary,
+- messages since the chained reply already left the retained history,
+- another reply landed in the channel while this one was generated,
+- the API rejects the chained request (expired or deleted response): that
+  turn is retried with the full context.
+
+`CHAIN_STATS` keeps the estimated tokens sent, the billed input tokens and
+the latency per mode. The API still bills the chained context as input
+(mostly cached); the saving is upload size and prompt building.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .history import MessageRecord
+from .memory import ChannelContext
+
+logger = logging.getLogger(__name__)
+
+MODES = ("full", "chained")
+
+
+def chain_key(personality: Any, model: str) -> str:
+    """Fingerprint of what the chain's first request fixed: persona prompts and model."""
+    parts = (personality.name, personality.system_prompt, personality.developer_prompt or "", personality.language or "", model)
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def reset_chain(ctx: ChannelContext, reason: str = "") -> None:
+    """Forget the channel's chain; the next reply resends the full context."""
+    if ctx.response_id and reason:
+        CHAIN_STATS.breaks[reason] += 1
+        logger.info("chain: dropped reason=%s turns=%d", reason, ctx.response_turns)
+    ctx.response_id, ctx.response_key, ctx.response_seq, ctx.response_turns = "", "", 0, 0
+
+
+def chain_point(ctx: ChannelContext, key: str, max_turns: int = 0) -> Optional[Tuple[str, int]]:
+    """Return (previous_response_id, first unsent seq) if the chain can be extended."""
+    if not ctx.response_id:
+        return None
+    if ctx.response_key != key:
+        reset_chain(ctx, "persona_or_model")
+    elif max_turns and ctx.response_turns >= max_turns:
+        reset_chain(ctx, "max_turns")
+    elif ctx.response_seq < ctx.messages.first_seq:
+        reset_chain(ctx, "history_evicted")
+    else:
+        return ctx.response_id, ctx.response_seq
+    return None
+
+
+def chain_delta(ctx: ChannelContext, from_seq: int, *, include_non_addressed: bool = True) -> List[MessageRecord]:
+    """Messages stored since the chained reply, filtered like the full-context selection."""
+    recs = ctx.messages.tail(ctx.messages.next_seq - from_seq)
+    if include_non_addressed:
+        return recs
+    return [r for r in recs if r.role == "assistant" or r.addressed]
+
+
+def commit_chain(ctx: ChannelContext, response_id: Optional[str], key: str, sent_upto: int, reply_seq: int, *, chained: bool) -> None:
+    """Record the reply just stored (at `reply_seq`) as the new chain point.
+
+    `sent_upto` is the history's next seq when the request was built; a
+    reply stored anywhere else means other messages arrived meanwhile that
+    the server never saw, so the chain is dropped instead.
+    """
+    if not response_id:
+        reset_chain(ctx, "no_response_id")
+        return
+    if reply_seq != sent_upto:
+        reset_chain(ctx, "interleaved")
+        return
+    ctx.response_turns = ctx.response_turns + 1 if chained else 1
+    ctx.response_id, ctx.response_key, ctx.response_seq = response_id, key, reply_seq + 1
+
+
+class ChainStats:
+    """Per-mode samples of tokens sent, billed input tokens and latency."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Dict[str, Deque[Tuple[int, int, float]]] = {m: deque(maxlen=window) for m in MODES}
+        self.counts: Counter = Counter()
+        self.breaks: Counter = Counter()
+
+    def observe(self, mode: str, sent_tokens: int, input_tokens: int, latency_ms: float) -> None:
+        self.counts[mode] += 1
+        self._samples.setdefault(mode, deque(maxlen=200)).append((int(sent_tokens), int(input_tokens), float(latency_ms)))
+
+    def snapshot(self) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        for mode, xs in self._samples.items():
+            if not xs:
+                continue
+            lat = sorted(x[2] for x in xs)
+            out[mode] = {
+                "n": self.counts[mode],
+                "sent_avg": round(sum(x[0] for x in xs) / len(xs)),
+                "input_avg": round(sum(x[1] for x in xs) / len(xs)),
+                "latency_p50_ms": round(lat[len(lat) // 2]),
+            }
+        return out
+
+
+CHAIN_STATS = ChainStats()
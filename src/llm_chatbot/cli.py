@@ -2,6 +2,8 @@
 
 Primary CLI: `llm-chatbot` with subcommands (discord-first):
 - `llm-chatbot discord run --personality ...` (canonical)
+- `llm-chatbot store migrate|convert|bench|export` (context store maintenance)
+- `llm-chatbot openai bench` (shared client pool vs per-call clients)
 
 Backward compatibility:
 - The legacy `llm-bot` entrypoint and direct flags without subcommands
@@ -74,6 +76,47 @@ def parse_args(argv: list[str] | None = None) -> tuple[str, argparse.Namespace]:
     # Allow optional nested action like `run` for future extensibility
     p_discord.add_argument("action", nargs="?", default="run", choices=["run"], help=argparse.SUPPRESS)
     _add_common_options(p_discord)
+    p_discord.add_argument(
+        "--standby",
+        action="store_true",
+        help="Follow the primary's change stream (CONTEXT_REPLICATION_SOCKET) and take over when it fails",
+    )
+
+    # Store maintenance subcommands
+    p_store = subparsers.add_parser("store", help="Context store maintenance")
+    store_sub = p_store.add_subparsers(dest="action", metavar="action")
+    p_migrate = store_sub.add_parser("migrate", help="Import a JSON context store into SQLite or sharded files")
+    p_migrate.add_argument("--from", dest="src", help="Source context.json (default: configured JSON store path)")
+    p_migrate.add_argument("--to", dest="dst", help="Destination (default: context.db or context.d next to the source)")
+    p_migrate.add_argument(
+        "--backend", choices=["sqlite", "sharded", "binary"], default="sqlite", help="Destination backend (default: sqlite)"
+    )
+    p_convert = store_sub.add_parser("convert", help="Convert between JSON and binary snapshot formats")
+    p_convert.add_argument("--from", dest="src", required=True, help="Source file (JSON or binary; detected from its header)")
+    p_convert.add_argument("--to", dest="dst", required=True, help="Destination file")
+    p_bench = store_sub.add_parser("bench", help="Compare load time and peak RSS of JSON vs binary snapshot")
+    p_bench.add_argument("--from", dest="src", help="Source context.json (default: configured JSON store path)")
+    p_bench.add_argument("--channel", help="Channel ID to load (default: first in the snapshot)")
+    p_bench.add_argument("--runs", type=int, default=3, help="Runs per format; best is reported (default: 3)")
+    p_export = store_sub.add_parser("export", help="Stream channels, messages, guild settings and billing as JSONL or CSV")
+    p_export.add_argument("--backend", choices=["json", "sqlite", "sharded", "binary"], help="Store backend (default: configured)")
+    p_export.add_argument("--path", help="Store path (default: configured CONTEXT_STORE_PATH)")
+    p_export.add_argument("--format", dest="fmt", choices=["jsonl", "csv"], default="jsonl", help="Output format (default: jsonl)")
+    p_export.add_argument("--out", "-o", default="-", help="Output file (default: stdout)")
+    p_export.add_argument("--guild", action="append", default=[], help="Only this guild ID (repeatable)")
+    p_export.add_argument("--channel", action="append", default=[], help="Only this channel ID (repeatable)")
+    p_export.add_argument("--since", help="Only messages at or after this time (epoch seconds or ISO 8601)")
+    p_export.add_argument("--until", help="Only messages before this time (epoch seconds or ISO 8601)")
+    p_export.add_argument("--kinds", default="channels,messages,guilds,billing", help="Comma-separated row types (default: all)")
+    add_logging_cli_flags(p_store)
+
+    # OpenAI connectivity tools
+    p_openai = subparsers.add_parser("openai", help="OpenAI client tools")
+    openai_sub = p_openai.add_subparsers(dest="action", metavar="action")
+    p_obench = openai_sub.add_parser("bench", help="Compare request latency of per-call clients vs the shared pooled client")
+    p_obench.add_argument("--requests", type=int, default=20, help="Requests per mode (default: 20)")
+    p_obench.add_argument("--base-url", help="API base URL (default: OPENAI_BASE_URL or the SDK default)")
+    add_logging_cli_flags(p_openai)
 
     # If user called legacy `llm-bot` or passed flags directly, parse in compatibility mode
     legacy_direct = not argv or argv[0].startswith("-")
@@ -98,6 +141,97 @@ def _stream_flag_from(ns: argparse.Namespace) -> bool:
     return True
 
 
+def _store_main(args: argparse.Namespace) -> None:
+    """Dispatch `llm-chatbot store <action>` subcommands."""
+    from pathlib import Path
+
+    from .snapshot import benchmark, is_snapshot, json_to_snapshot, snapshot_to_json
+    from .storage import migrate_json_store
+
+    action = getattr(args, "action", None)
+    if action == "migrate":
+        cfg = load_config()
+        src = Path(args.src) if args.src else (cfg.store_path if cfg.store_backend == "json" else cfg.store_path.with_suffix(".json"))
+        kind = getattr(args, "backend", "sqlite") or "sqlite"
+        dst = Path(args.dst) if args.dst else src.with_suffix({"sqlite": ".db", "sharded": ".d", "binary": ".bin"}[kind])
+        if not src.exists():
+            raise SystemExit(f"Source store not found: {src}")
+        counts = migrate_json_store(src, dst, kind)
+        print(
+            f"Imported {counts['channels']} channel(s), {counts['messages']} message(s), "
+            f"{counts['guilds']} guild(s), {counts['billing']} billing row(s) into {dst}"
+        )
+        print(f"Set CONTEXT_STORE_BACKEND={kind} and CONTEXT_STORE_PATH={dst} to use it.")
+    elif action == "convert":
+        src, dst = Path(args.src), Path(args.dst)
+        if not src.exists():
+            raise SystemExit(f"Source store not found: {src}")
+        if is_snapshot(src):
+            n = snapshot_to_json(src, dst)
+            print(f"Wrote {n} channel(s) as JSON to {dst}")
+        else:
+            n = json_to_snapshot(src, dst)
+            print(f"Wrote {n} channel(s) as binary snapshot to {dst}")
+    elif action == "bench":
+        import tempfile
+
+        cfg = load_config()
+        src = Path(args.src) if args.src else cfg.store_path.with_suffix(".json")
+        if not src.exists():
+            raise SystemExit(f"Source store not found: {src}")
+        with tempfile.TemporaryDirectory() as tmp:
+            snap = Path(tmp) / "context.bin"
+            json_to_snapshot(src, snap)
+            res = benchmark(src, snap, args.channel, runs=args.runs)
+        for kind, r in res.items():
+            rss, heap, size = r["peak_rss_kb"] / 1024, r["peak_alloc_kb"] / 1024, r["size_bytes"] / 1024
+            print(f"{kind:>6}: load {r['load_ms']:.1f} ms, heap peak {heap:.1f} MiB, RSS peak {rss:.1f} MiB, file {size:.0f} KiB")
+    elif action == "export":
+        from .export import KINDS, ExportFilter, export_store, parse_time
+
+        cfg = load_config()
+        kind = args.backend or cfg.store_backend
+        path = Path(args.path) if args.path else cfg.store_path
+        if not path.exists():
+            raise SystemExit(f"Store not found: {path}")
+        kinds = tuple(k.strip() for k in args.kinds.split(",") if k.strip())
+        unknown = [k for k in kinds if k not in KINDS]
+        if unknown:
+            raise SystemExit(f"Unknown kinds: {', '.join(unknown)} (choose from {', '.join(KINDS)})")
+        try:
+            flt = ExportFilter(
+                guilds=set(args.guild), channels=set(args.channel), since=parse_time(args.since), until=parse_time(args.until), kinds=kinds
+            )
+        except ValueError as e:
+            raise SystemExit(f"Invalid time: {e}")
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
+        try:
+            counts = export_store(kind, path, out, fmt=args.fmt, flt=flt, history_max=cfg.store_history_max)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        summary = ", ".join(f"{n} {t}" for t, n in sorted(counts.items())) or "nothing"
+        print(f"Exported {summary}", file=sys.stderr)
+    else:
+        raise SystemExit("Usage: llm-chatbot store migrate|convert|bench|export [options] (see --help)")
+
+
+def _openai_main(args: argparse.Namespace) -> None:
+    """Dispatch `llm-chatbot openai <action>` subcommands."""
+    from .clients import benchmark
+
+    if getattr(args, "action", None) != "bench":
+        raise SystemExit("Usage: llm-chatbot openai bench [options] (see --help)")
+    cfg = load_config()
+    if not cfg.openai_api_key:
+        raise SystemExit("OPENAI_API_KEY is required")
+    res = benchmark(cfg.openai_api_key, base_url=args.base_url or cfg.openai_base_url or None, requests=args.requests)
+    for mode in ("per_call", "shared"):
+        r = res[mode]
+        print(f"{mode:>8}: mean {r['mean_ms']:.1f} ms, p50 {r['p50_ms']:.1f} ms, p90 {r['p90_ms']:.1f} ms")
+    print(f"   saved: {res['saved_ms']['mean_ms']:.1f} ms per request")
+
+
 def main() -> None:
     """Entry point for the `llm-chatbot` and legacy `llm-bot` CLIs."""
     platform, args = parse_args()
@@ -115,6 +249,21 @@ def main() -> None:
         if getattr(args, "model", None):
             cfg.openai_model = args.model
         personality = load_personality(args.personality) if getattr(args, "personality", None) else DEFAULT_PERSONALITY
-        run(cfg, personality, stream=_stream_flag_from(args))
+        replica = None
+        if getattr(args, "standby", False):
+            import asyncio
+            from pathlib import Path
+
+            from .replication import Replica, follow
+
+            if not cfg.replication_socket:
+                raise SystemExit("--standby requires CONTEXT_REPLICATION_SOCKET")
+            print(f"Standby: following {cfg.replication_socket}", file=sys.stderr)
+            replica = asyncio.run(follow(Path(cfg.replication_socket), Replica(), timeout=cfg.replication_timeout))
+        run(cfg, personality, stream=_stream_flag_from(args), replica=replica)
+    elif platform == "store":
+        _store_main(args)
+    elif platform == "openai":
+        _openai_main(args)
     else:  # pragma: no cover - reserved for future platforms
         raise SystemExit(f"Unsupported platform: {platform}")
@@ -0,0 +1,290 @@
+"""Process-wide OpenAI clients with pooled keep-alive connections.
+
+Constructing `OpenAI(api_key=...)` per call builds a fresh HTTP client, so
+every request pays DNS, TCP and TLS setup again. `ClientRegistry` keeps one
+client per (API key, base URL) whose connection pool is shared by every
+caller; per-call timeouts use `with_options`, which reuses that pool.
+Async clients (`get_async`) are pooled the same way, one per event loop.
+`warmup` opens connections at startup and `benchmark` measures the latency
+saved versus per-call construction. `run_sync` drives a coroutine on a
+shared background loop so blocking wrappers reuse the async pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from .keys import current_key
+from .throttle import THROTTLE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class ClientPoolConfig:
+    """Connection pool and timeout settings shared by all clients."""
+
+    base_url: str = ""  # empty: SDK default (or OPENAI_BASE_URL)
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 60.0  # seconds an idle connection stays open
+    connect_timeout: float = 5.0
+    timeout: float = 60.0  # default read/write timeout per request
+    warmup_connections: int = 1  # connections opened per client at startup (0 disables)
+    max_retries: int = 0  # SDK-level retries; `resilience.py` retries with deadlines instead
+
+
+def _http():
+    """Return the HTTP library the installed OpenAI SDK is built on."""
+    try:
+        import httpx
+    except ImportError:  # SDK builds that ship their own fork
+        import httpx2 as httpx  # type: ignore[no-redef]
+    return httpx
+
+
+class ClientRegistry:
+    """Shared clients keyed by API key and base URL (and event loop for async).
+
+    Clients are created on first use and live until `close()`. The registry
+    is thread-safe; the SDK clients themselves are safe to share. Async
+    connection pools are bound to the loop that opened them, hence one async
+    client per loop.
+    """
+
+    def __init__(self, config: Optional[ClientPoolConfig] = None) -> None:
+        self.config = config or ClientPoolConfig()
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._async_clients: Dict[Tuple[str, str, int], Any] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def configure(self, config: ClientPoolConfig) -> None:
+        """Replace pool settings; existing clients are closed and rebuilt lazily."""
+        self.close()
+        self.config = config
+
+    def _key(self, api_key: str, base_url: Optional[str]) -> Tuple[str, str]:
+        return api_key or "", (base_url if base_url is not None else self.config.base_url) or ""
+
+    def _build(self, api_key: str, base_url: str, *, use_async: bool = False) -> Any:
+        import openai
+
+        httpx = _http()
+        c = self.config
+        timeout = httpx.Timeout(c.timeout, connect=c.connect_timeout)
+        limits = httpx.Limits(
+            max_connections=c.max_connections, max_keepalive_connections=c.max_keepalive, keepalive_expiry=c.keepalive_expiry
+        )
+        # Rate-limit headers feed the pacing buckets; requests wait for budget first (see `throttle.py`)
+        if use_async:
+            hooks = {"request": [THROTTLE.arequest_hook], "response": [THROTTLE.aresponse_hook]}
+            http_client, cls = openai.DefaultAsyncHttpxClient(limits=limits, timeout=timeout, event_hooks=hooks), openai.AsyncOpenAI
+        else:
+            hooks = {"request": [THROTTLE.request_hook], "response": [THROTTLE.response_hook]}
+            http_client, cls = openai.DefaultHttpxClient(limits=limits, timeout=timeout, event_hooks=hooks), openai.OpenAI
+        kwargs: Dict[str, Any] = {"api_key": api_key, "http_client": http_client, "timeout": timeout, "max_retries": c.max_retries}
+        if base_url:
+            kwargs["base_url"] = base_url
+        return cls(**kwargs)
+
+    def get(self, api_key: str, *, base_url: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+        """Return the shared client, optionally with a per-call `timeout` (seconds)."""
+        key = self._key(api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._build(*key)
+                    self._clients[key] = client
+                    self.created += 1
+                    logger.debug("openai-clients: created client base_url=%s", key[1] or "default")
+        else:
+            self.reused += 1
+        if timeout is not None:
+            return client.with_options(timeout=timeout)
+        return client
+
+    def get_async(self, api_key: str, *, base_url: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+        """Return the shared `AsyncOpenAI` client for the running event loop."""
+        key = (*self._key(api_key, base_url), id(asyncio.get_running_loop()))
+        client = self._async_clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._async_clients.get(key)
+                if client is None:
+                    client = self._build(key[0], key[1], use_async=True)
+                    self._async_clients[key] = client
+                    self.created += 1
+                    logger.debug("openai-clients: created async client base_url=%s", key[1] or "default")
+        else:
+            self.reused += 1
+        if timeout is not None:
+            return client.with_options(timeout=timeout)
+        return client
+
+    async def warmup_async(self, api_key: str, *, base_url: Optional[str] = None, connections: Optional[int] = None) -> float:
+        """Async `warmup` for the running loop's client."""
+        n = self.config.warmup_connections if connections is None else int(connections)
+        if n <= 0 or not api_key:
+            return 0.0
+        client = self.get_async(api_key, base_url=base_url, timeout=self.config.connect_timeout + 5.0)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(client.models.list() for _ in range(n)))
+        except Exception as e:
+            logger.warning("openai-clients: warmup failed err=%s", e)
+        ms = (time.perf_counter() - started) * 1000.0
+        logger.info("openai-clients: warmed %d async connection(s) in %.0f ms", n, ms)
+        return ms
+
+    def warmup(self, api_key: str, *, base_url: Optional[str] = None, connections: Optional[int] = None) -> float:
+        """Open pooled connections (DNS, TCP, TLS) ahead of the first request.
+
+        Issues `connections` concurrent `models.list()` calls and returns the
+        elapsed time in ms. Failures are logged, not raised.
+        """
+        n = self.config.warmup_connections if connections is None else int(connections)
+        if n <= 0 or not api_key:
+            return 0.0
+        client = self.get(api_key, base_url=base_url, timeout=self.config.connect_timeout + 5.0)
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=n) as ex:
+                list(ex.map(lambda _i: client.models.list(), range(n)))
+        except Exception as e:
+            logger.warning("openai-clients: warmup failed err=%s", e)
+        ms = (time.perf_counter() - started) * 1000.0
+        logger.info("openai-clients: warmed %d connection(s) in %.0f ms", n, ms)
+        return ms
+
+    def stats(self) -> dict:
+        return {"clients": len(self._clients), "async_clients": len(self._async_clients), "created": self.created, "reused": self.reused}
+
+    async def aclose(self) -> None:
+        """Close the running loop's async clients."""
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            mine = [k for k in self._async_clients if k[2] == loop_id]
+            clients = [self._async_clients.pop(k) for k in mine]
+        for c in clients:
+            try:
+                await c.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        """Close sync clients; async clients are dropped (their loops may be gone)."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+            self._async_clients = {}
+        for c in clients:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+
+CLIENTS = ClientRegistry()
+
+
+def configure_clients(config: ClientPoolConfig) -> None:
+    """Apply pool settings to the process-wide registry."""
+    CLIENTS.configure(config)
+
+
+def get_client(api_key: str, *, base_url: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+    """Return the process-wide shared client for `api_key`, or for the leased pool key (see `keys.py`)."""
+    return CLIENTS.get(current_key(api_key), base_url=base_url, timeout=timeout)
+
+
+def get_async_client(api_key: str, *, base_url: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+    """Return the process-wide shared async client for the running loop, for the leased pool key if any."""
+    return CLIENTS.get_async(current_key(api_key), base_url=base_url, timeout=timeout)
+
+
+_runner_loop: Optional[asyncio.AbstractEventLoop] = None
+_runner_thread: Optional[threading.Thread] = None
+_runner_lock = threading.Lock()
+
+
+def _runner() -> asyncio.AbstractEventLoop:
+    global _runner_loop, _runner_thread
+    with _runner_lock:
+        if _runner_loop is None:
+            loop = asyncio.new_event_loop()
+            _runner_thread = threading.Thread(target=loop.run_forever, name="openai-sync", daemon=True)
+            _runner_thread.start()
+            _runner_loop = loop
+        return _runner_loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run `coro` on the shared background loop and block until it finishes.
+
+    Lets blocking callers (threads, CLI) use the async client pool. Must not
+    be called from that loop's own thread.
+    """
+    loop = _runner()
+    if threading.current_thread() is _runner_thread:
+        raise RuntimeError("run_sync called from the client runner loop")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()  # type: ignore[arg-type]
+
+
+def _summary(samples_ms: list) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p90_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 2),
+    }
+
+
+def benchmark(
+    api_key: str,
+    *,
+    base_url: Optional[str] = None,
+    requests: int = 20,
+    request: Optional[Callable[[Any], Any]] = None,
+) -> Dict[str, dict]:
+    """Compare per-call client construction with the shared pooled client.
+
+    Runs `request(client)` (default: `models.list()`, which costs no tokens)
+    `requests` times each way, sequentially, and returns latency summaries
+    plus `saved_ms` per request (mean difference).
+    """
+    from openai import OpenAI
+
+    call = request or (lambda c: c.models.list())
+    registry = ClientRegistry(ClientPoolConfig(base_url=base_url or ""))
+    per_call, shared = [], []
+    try:
+        for _ in range(max(1, requests)):
+            t0 = time.perf_counter()
+            kwargs: Dict[str, Any] = {"api_key": api_key}
+            if base_url:
+                kwargs["base_url"] = base_url
+            with OpenAI(**kwargs) as fresh:
+                call(fresh)
+            per_call.append((time.perf_counter() - t0) * 1000.0)
+        call(registry.get(api_key))  # first shared request pays the connection setup once
+        for _ in range(max(1, requests)):
+            t0 = time.perf_counter()
+            call(registry.get(api_key))
+            shared.append((time.perf_counter() - t0) * 1000.0)
+    finally:
+        registry.close()
+    res = {"per_call": _summary(per_call), "shared": _summary(shared)}
+    res["saved_ms"] = {"mean_ms": round(res["per_call"]["mean_ms"] - res["shared"]["mean_ms"], 2)}
+    return res
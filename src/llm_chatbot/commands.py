@@ -7,11 +7,46 @@ from typing import Any
 import discord
 from discord.ext import commands
 
+from .breaker import BREAKERS
+from .chain import CHAIN_STATS
+from .clients import CLIENTS
 from .config import Config
 from .costs import rollover_if_needed
+from .judge import judge_stats
+from .keys import KEYS
 from .memory import MemoryStore
 from .personality import Personality
 from .runtime_utils import _chunk_message
+from .scheduler import SCHEDULER
+from .throttle import THROTTLE
+
+
+def _replication_status(store: MemoryStore, i18n: Any) -> str:
+    """Extra `~store status` lines for warm-standby replication, if enabled."""
+    rep = getattr(store, "replication", None)
+    if rep is None:
+        return ""
+    st = rep.status()
+    out = "\n" + i18n.t("store_replication", role=st["role"], standbys=st["standbys"], lsn=st["lsn"])
+    fo = st.get("failover")
+    if fo:
+        out += "\n" + i18n.t("store_failover", **fo)
+    return out
+
+
+def _judge_status(persona: str, i18n: Any) -> str:
+    """Extra `~listen status` line with the judge strategy mix and latency."""
+    snap = judge_stats(persona).snapshot()
+    st = snap["strategies"]
+    if not any(v["n"] for v in st.values()):
+        return ""
+    fields = {}
+    for name, v in st.items():
+        fields[name] = v["n"]
+        fields[f"{name}_ms"] = v["p50_ms"] if v["p50_ms"] is not None else "-"
+    return "\n" + i18n.t(
+        "listen_judge", escalations=snap["escalations"], rate=round(snap["escalation_rate"] * 100, 1), wasted=snap["wasted"], **fields
+    )
 
 
 def register_commands(
@@ -30,7 +65,7 @@ def register_commands(
         if not ctx.messages:
             await ctx_cmd.send(i18n.t("no_history"))
             return
-        text = "\n".join([f"{m['role']}: {m['content']}" for m in ctx.messages][-10:])
+        text = "\n".join([f"{m['role']}: {m['content']}" for m in ctx.messages.tail(10)])
         for chunk in _chunk_message(text, limit=1970):
             await ctx_cmd.send(f"```\n{chunk}\n```")
 
@@ -59,7 +94,8 @@ def register_commands(
             return
         gs = store.guild_settings(ctx_cmd.guild.id)
         gs["listen_enabled"] = True
-        store.save()
+        store.touch_guild(ctx_cmd.guild.id)
+        store.mark_dirty()
         await ctx_cmd.send(i18n.t("listen_enabled_on"))
 
     @listen_group.command(name="off")
@@ -69,7 +105,8 @@ def register_commands(
             return
         gs = store.guild_settings(ctx_cmd.guild.id)
         gs["listen_enabled"] = False
-        store.save()
+        store.touch_guild(ctx_cmd.guild.id)
+        store.mark_dirty()
         await ctx_cmd.send(i18n.t("listen_enabled_off"))
 
     @listen_group.command(name="status")
@@ -88,6 +125,7 @@ def register_commands(
                 model=cfg.openai_model,
                 reasoning=reasoning,
             )
+            + _judge_status(personality.name, i18n)
         )
 
     @listen_group.command(name="ban")
@@ -99,7 +137,8 @@ def register_commands(
         denied = set(gs.get("denied_channels", []))
         denied.add(str(channel.id))
         gs["denied_channels"] = list(denied)
-        store.save()
+        store.touch_guild(ctx_cmd.guild.id)
+        store.mark_dirty()
         await ctx_cmd.send(i18n.t("listen_banned", channel=channel.mention))
 
     @listen_group.command(name="unban")
@@ -112,7 +151,8 @@ def register_commands(
         if str(channel.id) in denied:
             denied.remove(str(channel.id))
             gs["denied_channels"] = list(denied)
-            store.save()
+            store.touch_guild(ctx_cmd.guild.id)
+            store.mark_dirty()
             await ctx_cmd.send(i18n.t("listen_unbanned", channel=channel.mention))
         else:
             await ctx_cmd.send(i18n.t("listen_not_banned", channel=channel.mention))
@@ -169,11 +209,13 @@ def register_commands(
         b = store.billing_for(getattr(bot_user, "id", 0)) if bot_user else store.billing
         if scope.lower() == "daily":
             b.budget_daily_usd = float(amount)
-            store.save()
+            store.touch_billing(getattr(bot_user, "id", None) if bot_user else None)
+            store.mark_dirty()
             await ctx_cmd.send(i18n.t("cost_budget_set", scope="daily", amount=f"${amount:.2f}"))
         elif scope.lower() == "monthly":
             b.budget_monthly_usd = float(amount)
-            store.save()
+            store.touch_billing(getattr(bot_user, "id", None) if bot_user else None)
+            store.mark_dirty()
             await ctx_cmd.send(i18n.t("cost_budget_set", scope="monthly", amount=f"${amount:.2f}"))
         else:
             await ctx_cmd.send(i18n.t("cost_usage", prefix=effective_prefix))
@@ -187,7 +229,8 @@ def register_commands(
         bot_user = getattr(ctx_cmd.bot, "user", None)
         b = store.billing_for(getattr(bot_user, "id", 0)) if bot_user else store.billing
         b.hard_stop = v
-        store.save()
+        store.touch_billing(getattr(bot_user, "id", None) if bot_user else None)
+        store.mark_dirty()
         await ctx_cmd.send(i18n.t("cost_hardstop_set", value=str(v)))
 
     @cost_group.command(name="pause")
@@ -199,9 +242,101 @@ def register_commands(
         b = store.billing_for(getattr(bot_user, "id", 0)) if bot_user else store.billing
         v = value.lower() in ("on", "true", "1", "yes")
         b.hard_stop = bool(v)
-        store.save()
+        store.touch_billing(getattr(bot_user, "id", None) if bot_user else None)
+        store.mark_dirty()
         await ctx_cmd.send(f"Pause set to {v}")
 
+    # Store persistence status (owner-only)
+    @bot.group(name="store", invoke_without_command=True)
+    async def store_group(ctx_cmd: commands.Context):
+        await ctx_cmd.send(i18n.t("store_usage", prefix=effective_prefix))
+
+    @store_group.command(name="status")
+    async def store_status(ctx_cmd: commands.Context):
+        if cfg.owner_id and str(ctx_cmd.author.id) != str(cfg.owner_id):
+            await ctx_cmd.send(i18n.t("owner_only"))
+            return
+        writer = store.writer
+        st = writer.stats.as_dict() if writer is not None else {}
+        cm = store.cache.metrics()
+        await ctx_cmd.send(
+            i18n.t(
+                "store_status",
+                backend=type(store.backend).__name__,
+                requested=st.get("requested", 0),
+                writes=st.get("writes", 0),
+                coalesced=st.get("coalesced", 0),
+                last_ms=st.get("last_write_ms", 0.0),
+                avg_ms=st.get("avg_write_ms", 0.0),
+                max_ms=st.get("max_write_ms", 0.0),
+            )
+            + "\n"
+            + i18n.t(
+                "store_cache",
+                resident=cm["resident"],
+                resident_kb=round(cm["resident_bytes"] / 1024, 1),
+                cold=cm["cold"],
+                cold_kb=round(cm["cold_bytes"] / 1024, 1),
+            )
+            + "\n"
+            + i18n.t("store_cache_hits", hit_rate=round(cm["hit_rate"] * 100, 1), evictions=cm["evictions"])
+            + _replication_status(store, i18n)
+        )
+
+    # OpenAI client and circuit breaker status (owner-only)
+    @bot.group(name="openai", invoke_without_command=True)
+    async def openai_group(ctx_cmd: commands.Context):
+        await ctx_cmd.send(i18n.t("openai_usage", prefix=effective_prefix))
+
+    @openai_group.command(name="status")
+    async def openai_status(ctx_cmd: commands.Context):
+        if cfg.owner_id and str(ctx_cmd.author.id) != str(cfg.owner_id):
+            await ctx_cmd.send(i18n.t("owner_only"))
+            return
+        lines = [i18n.t("openai_status", **CLIENTS.stats())]
+        breakers = BREAKERS.snapshot()
+        for b in breakers:
+            reason = f" ({b['reason']})" if b["reason"] else ""
+            retry = i18n.t("openai_breaker_retry", seconds=round(b["retry_in_s"])) if b["state"] == "open" else ""
+            lines.append(i18n.t("openai_breaker", **dict(b, reason=reason, retry=retry)))
+        if not breakers:
+            lines.append(i18n.t("openai_breakers_none"))
+        sched = SCHEDULER.snapshot()
+        if sched["enabled"]:
+            lines.append(i18n.t("openai_sched", **sched))
+            for name, c in sched["classes"].items():
+                if c["admitted"] or c["queued"] or c["shed"]:
+                    p50 = "-" if c["wait_p50_ms"] is None else c["wait_p50_ms"]
+                    p90 = "-" if c["wait_p90_ms"] is None else c["wait_p90_ms"]
+                    lines.append(i18n.t("openai_sched_class", name=name, p50=p50, p90=p90, **c))
+        for k in KEYS.snapshot():
+            drained = i18n.t("openai_key_drained", seconds=round(k["drained_s"])) if k["drained_s"] else ""
+            rpm_budget = k["rpm_budget"] or "∞"
+            tpm_budget = k["tpm_budget"] or "∞"
+            lines.append(
+                i18n.t("openai_key", load=round(k["load"] * 100), drained=drained, **dict(k, rpm_budget=rpm_budget, tpm_budget=tpm_budget))
+            )
+        for mode, c in CHAIN_STATS.snapshot().items():
+            lines.append(i18n.t("openai_chain", mode=mode, **c))
+        if CHAIN_STATS.breaks:
+            lines.append(i18n.t("openai_chain_breaks", reasons=", ".join(f"{k} {v}" for k, v in CHAIN_STATS.breaks.most_common())))
+        for chunk in _chunk_message("\n".join(lines), limit=1970):
+            await ctx_cmd.send(chunk)
+
+    @openai_group.command(name="limits")
+    async def openai_limits(ctx_cmd: commands.Context):
+        if cfg.owner_id and str(ctx_cmd.author.id) != str(cfg.owner_id):
+            await ctx_cmd.send(i18n.t("owner_only"))
+            return
+        lines = []
+        for r in THROTTLE.snapshot():
+            reqs = "?" if r["requests_limit"] is None else f"{r['requests_left']}/{r['requests_limit']}"
+            toks = "?" if r["tokens_limit"] is None else f"{r['tokens_left']}/{r['tokens_limit']}"
+            lines.append(i18n.t("openai_limit", reqs=reqs, toks=toks, **r))
+        lines = lines or [i18n.t("openai_limits_none")]
+        for chunk in _chunk_message("\n".join(lines), limit=1970):
+            await ctx_cmd.send(chunk)
+
     # Truncation (per-guild) commands
     @bot.group(name="truncation", invoke_without_command=True)
     async def truncation_group(ctx_cmd: commands.Context):
@@ -231,5 +366,6 @@ def register_commands(
             return
         gs = store.guild_settings(ctx_cmd.guild.id)
         gs["truncation"] = v
-        store.save()
+        store.touch_guild(ctx_cmd.guild.id)
+        store.mark_dirty()
         await ctx_cmd.send(i18n.t("truncation_set", value=v))
@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 import os
 import shutil
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 
@@ -21,6 +21,99 @@ class Config:
     command_prefix: str
     max_turns: int
     store_path: Path
+    # Storage backend: "json" (default), "sqlite", "sharded" (directory of per-channel files), or "binary" (mmap snapshot)
+    store_backend: str = "json"
+    # Write-ahead journal mode for the context store (see `journal.py`)
+    store_journal: bool = False
+    store_journal_fsync: bool = False
+    store_compact_records: int = 5000
+    # Per-channel retention cap; older messages spill to the archive tier
+    store_history_max: int = 200
+    # Resident channel-context cache (0 disables a bound); evicted contexts are compressed in memory
+    cache_max_channels: int = 0
+    cache_max_bytes: int = 0
+    cache_idle_ttl: float = 0.0
+    cache_codec: str = "zlib"
+    # Near-duplicate message suppression (see `dedup.py`); threshold is the MinHash Jaccard estimate
+    store_dedup: bool = False
+    store_dedup_threshold: float = 0.85
+    # Warm-standby replication over a Unix socket (see `replication.py`); empty disables it
+    replication_socket: str = ""
+    replication_heartbeat: float = 1.0
+    replication_timeout: float = 5.0
+    # Shared OpenAI client pool (see `clients.py`); empty base URL uses the SDK default
+    openai_base_url: str = ""
+    openai_max_connections: int = 20
+    openai_max_keepalive: int = 10
+    openai_keepalive_expiry: float = 60.0
+    openai_connect_timeout: float = 5.0
+    openai_timeout: float = 60.0
+    openai_warmup_connections: int = 1
+    # API key pool (see `keys.py`): (key, tokens/min, requests/min) with 0 for no budget; empty uses openai_api_key alone
+    openai_api_keys: list[tuple[str, int, int]] = field(default_factory=list)
+    openai_key_drain: float = 30.0
+    # Pacing from rate-limit headers (see `throttle.py`)
+    openai_throttle: bool = True
+    openai_throttle_max_wait: float = 10.0
+    # Circuit breakers on the Responses/Chat Completions paths (see `breaker.py`)
+    openai_breaker_failures: int = 3
+    openai_breaker_cooldown: float = 30.0
+    openai_breaker_capability_cooldown: float = 3600.0
+    # Retries and per-phase timeouts in seconds (see `resilience.py`)
+    openai_retry_attempts: int = 3
+    openai_retry_backoff: float = 0.5
+    openai_retry_backoff_cap: float = 8.0
+    openai_judge_timeout: float = 10.0
+    openai_chat_timeout: float = 60.0
+    stream_first_token_timeout: float = 20.0
+    stream_idle_timeout: float = 30.0
+    reply_deadline: float = 90.0  # end-to-end budget per message (0 disables)
+    # Admission scheduler for LLM calls (see `scheduler.py`); 0 disables
+    llm_max_concurrency: int = 0  # 0: admission control off (opt-in)
+    llm_max_queue: int = 64
+    llm_guild_weights: dict[str, float] = field(default_factory=dict)
+    # Write-behind persistence (see `persistence.py`)
+    store_save_delay: float = 2.0
+    store_save_max_pending: int = 100
+    store_fsync: str = "batched"
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    v = os.environ.get(name)
+    if v is None:
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_weights(name: str) -> dict[str, float]:
+    """Parse `id:weight,id:weight` (bad entries are skipped)."""
+    out: dict[str, float] = {}
+    for part in os.environ.get(name, "").split(","):
+        key, _, weight = part.strip().partition(":")
+        try:
+            if key:
+                out[key] = float(weight)
+        except ValueError:
+            continue
+    return out
+
+
+def _env_keys(name: str) -> list[tuple[str, int, int]]:
+    """Parse `key[:tpm[:rpm]],...` (bad budgets count as 0, i.e. unbudgeted)."""
+    out: list[tuple[str, int, int]] = []
+    for part in os.environ.get(name, "").split(","):
+        key, *budgets = part.strip().split(":")
+        if not key:
+            continue
+        nums = []
+        for b in budgets[:2]:
+            try:
+                nums.append(max(0, int(b)))
+            except ValueError:
+                nums.append(0)
+        nums += [0] * (2 - len(nums))
+        out.append((key, nums[0], nums[1]))
+    return out
 
 
 def _maybe_migrate_cache(new_dir: Path, new_store: Path) -> None:
@@ -44,15 +137,19 @@ def load_config() -> Config:
     """
     cache_dir = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "llm-chatbot-kit"
     cache_dir.mkdir(parents=True, exist_ok=True)
-    store_path = Path(os.environ.get("CONTEXT_STORE_PATH", cache_dir / "context.json"))
+    store_backend = os.environ.get("CONTEXT_STORE_BACKEND", "json").strip().lower() or "json"
+    default_name = {"sqlite": "context.db", "sharded": "context.d", "binary": "context.bin"}.get(store_backend, "context.json")
+    store_path = Path(os.environ.get("CONTEXT_STORE_PATH", cache_dir / default_name))
 
     # Only attempt migration if using the default location
     if str(store_path) == str(cache_dir / "context.json"):
         _maybe_migrate_cache(cache_dir, store_path)
 
+    api_keys = _env_keys("OPENAI_API_KEYS")
+
     return Config(
         discord_token=os.environ.get("DISCORD_TOKEN", ""),
-        openai_api_key=os.environ.get("OPENAI_API_KEY", ""),
+        openai_api_key=os.environ.get("OPENAI_API_KEY", "") or (api_keys[0][0] if api_keys else ""),
         # Default to mini for generation (user request)
         openai_model=os.environ.get("OPENAI_MODEL", "gpt-5-mini"),
         openai_verbosity=os.environ.get("OPENAI_VERBOSITY", "low"),
@@ -60,6 +157,48 @@ def load_config() -> Config:
         command_prefix=os.environ.get("COMMAND_PREFIX", "~"),
         max_turns=int(os.environ.get("MAX_TURNS", "20")),
         store_path=store_path,
+        store_backend=store_backend,
+        store_journal=_env_bool("CONTEXT_STORE_JOURNAL"),
+        store_journal_fsync=_env_bool("CONTEXT_STORE_JOURNAL_FSYNC"),
+        store_compact_records=int(os.environ.get("CONTEXT_STORE_COMPACT_RECORDS", "5000")),
+        store_history_max=int(os.environ.get("CONTEXT_HISTORY_MAX", "200")),
+        cache_max_channels=int(os.environ.get("CONTEXT_CACHE_MAX_CHANNELS", "0")),
+        cache_max_bytes=int(os.environ.get("CONTEXT_CACHE_MAX_BYTES", "0")),
+        cache_idle_ttl=float(os.environ.get("CONTEXT_CACHE_IDLE_TTL", "0")),
+        cache_codec=os.environ.get("CONTEXT_CACHE_CODEC", "zlib").strip().lower() or "zlib",
+        store_dedup=_env_bool("CONTEXT_DEDUP"),
+        store_dedup_threshold=float(os.environ.get("CONTEXT_DEDUP_THRESHOLD", "0.85")),
+        replication_socket=os.environ.get("CONTEXT_REPLICATION_SOCKET", "").strip(),
+        replication_heartbeat=float(os.environ.get("CONTEXT_REPLICATION_HEARTBEAT", "1.0")),
+        replication_timeout=float(os.environ.get("CONTEXT_REPLICATION_TIMEOUT", "5.0")),
+        openai_base_url=os.environ.get("OPENAI_BASE_URL", "").strip(),
+        openai_max_connections=int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20")),
+        openai_max_keepalive=int(os.environ.get("OPENAI_MAX_KEEPALIVE", "10")),
+        openai_keepalive_expiry=float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", "60")),
+        openai_connect_timeout=float(os.environ.get("OPENAI_CONNECT_TIMEOUT", "5")),
+        openai_timeout=float(os.environ.get("OPENAI_TIMEOUT", "60")),
+        openai_warmup_connections=int(os.environ.get("OPENAI_WARMUP_CONNECTIONS", "1")),
+        openai_api_keys=api_keys,
+        openai_key_drain=float(os.environ.get("OPENAI_KEY_DRAIN_SECONDS", "30")),
+        openai_throttle=_env_bool("OPENAI_THROTTLE", True),
+        openai_throttle_max_wait=float(os.environ.get("OPENAI_THROTTLE_MAX_WAIT", "10")),
+        openai_breaker_failures=int(os.environ.get("OPENAI_BREAKER_FAILURES", "3")),
+        openai_breaker_cooldown=float(os.environ.get("OPENAI_BREAKER_COOLDOWN", "30")),
+        openai_breaker_capability_cooldown=float(os.environ.get("OPENAI_BREAKER_CAPABILITY_COOLDOWN", "3600")),
+        openai_retry_attempts=int(os.environ.get("OPENAI_RETRY_ATTEMPTS", "3")),
+        openai_retry_backoff=float(os.environ.get("OPENAI_RETRY_BACKOFF", "0.5")),
+        openai_retry_backoff_cap=float(os.environ.get("OPENAI_RETRY_BACKOFF_CAP", "8")),
+        openai_judge_timeout=float(os.environ.get("OPENAI_JUDGE_TIMEOUT", "10")),
+        openai_chat_timeout=float(os.environ.get("OPENAI_CHAT_TIMEOUT", "60")),
+        stream_first_token_timeout=float(os.environ.get("STREAM_FIRST_TOKEN_TIMEOUT", "20")),
+        stream_idle_timeout=float(os.environ.get("STREAM_IDLE_TIMEOUT", "30")),
+        reply_deadline=float(os.environ.get("REPLY_DEADLINE_SECONDS", "90")),
+        llm_max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "0")),
+        llm_max_queue=int(os.environ.get("LLM_MAX_QUEUE", "64")),
+        llm_guild_weights=_env_weights("LLM_GUILD_WEIGHTS"),
+        store_save_delay=float(os.environ.get("CONTEXT_STORE_SAVE_DELAY", "2.0")),
+        store_save_max_pending=int(os.environ.get("CONTEXT_STORE_SAVE_MAX_PENDING", "100")),
+        store_fsync=("always" if _env_bool("CONTEXT_STORE_JOURNAL_FSYNC") else os.environ.get("CONTEXT_STORE_FSYNC", "batched").lower()),
     )
 
 
@@ -73,8 +212,15 @@ def read_json(path: Path) -> dict:
         return {}
 
 
-def write_json(path: Path, data: dict) -> None:
-    """Atomically write JSON to `path` by first writing to a temp file."""
+def write_json(path: Path, data: dict, *, fsync: bool = False) -> None:
+    """Atomically write JSON to `path` by first writing to a temp file.
+
+    With `fsync=True` the temp file is flushed to disk before the rename.
+    """
     temp = path.with_suffix(".tmp")
-    temp.write_text(json.dumps(data, ensure_ascii=False))
+    with temp.open("w", encoding="utf-8") as fh:
+        fh.write(json.dumps(data, ensure_ascii=False))
+        if fsync:
+            fh.flush()
+            os.fsync(fh.fileno())
     temp.replace(path)
@@ -0,0 +1,245 @@
+"""Memory-bounded cache of channel contexts with a compressed cold tier.
+
+`MemoryStore` keeps channel contexts in a `ContextCache`. Contexts are held
+resident in LRU order; once the resident count or approximate byte budget is
+exceeded, or a context has been idle longer than the TTL, it is serialized to
+JSON, compressed (zlib or lzma), and moved to the cold tier. The next lookup
+decompresses it back transparently. Limits of `0` disable that bound.
+"""
+
+from __future__ import annotations
+
+import json
+import lzma
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+@dataclass
+class CacheStats:
+    """Counters exposed for sizing the context cache."""
+
+    hits: int = 0  # resident lookups
+    cold_hits: int = 0  # lookups faulted in from the cold tier
+    misses: int = 0  # lookups for unknown channels
+    evictions: int = 0
+    expired: int = 0  # evictions caused by the idle TTL
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.cold_hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "cold_hits": self.cold_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+
+class ContextCache(MutableMapping):
+    """LRU mapping of channel key -> context with a compressed cold tier.
+
+    Parameters
+    ----------
+    to_doc / from_doc: callables
+        Convert a context to and from its plain-dict persisted form.
+    sizeof: callable
+        Approximate resident size of a context in bytes.
+    max_channels: int
+        Maximum resident contexts (0 = unbounded).
+    max_bytes: int
+        Approximate resident byte budget (0 = unbounded).
+    idle_ttl: float
+        Seconds of inactivity after which a context is moved cold (0 = never).
+    codec: str
+        `zlib` (default) or `lzma`.
+    """
+
+    def __init__(
+        self,
+        to_doc: Callable[[Any], dict],
+        from_doc: Callable[[dict], Any],
+        *,
+        sizeof: Callable[[Any], int] = lambda _v: 0,
+        max_channels: int = 0,
+        max_bytes: int = 0,
+        idle_ttl: float = 0.0,
+        codec: str = "zlib",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._to_doc = to_doc
+        self._from_doc = from_doc
+        self._sizeof = sizeof
+        self.max_channels = max(0, int(max_channels))
+        self.max_bytes = max(0, int(max_bytes))
+        self.idle_ttl = max(0.0, float(idle_ttl))
+        self.codec = codec if codec in CODECS else "zlib"
+        self._compress, self._decompress = CODECS[self.codec]
+        self._clock = clock
+        self._hot: "OrderedDict[str, Any]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._cold: Dict[str, bytes] = {}
+        self.stats = CacheStats()
+
+    @property
+    def bounded(self) -> bool:
+        return bool(self.max_channels or self.max_bytes or self.idle_ttl)
+
+    # Mapping protocol (lookups promote cold entries and update LRU order)
+    def __getitem__(self, key: str) -> Any:
+        ctx = self._hot.get(key)
+        if ctx is not None:
+            self.stats.hits += 1
+            self._hot.move_to_end(key)
+            self._touched[key] = self._clock()
+            return ctx
+        blob = self._cold.pop(key, None)
+        if blob is None:
+            self.stats.misses += 1
+            raise KeyError(key)
+        self.stats.cold_hits += 1
+        ctx = self._from_doc(json.loads(self._decompress(blob)))
+        self._insert(key, ctx)
+        return ctx
+
+    def __setitem__(self, key: str, ctx: Any) -> None:
+        self._cold.pop(key, None)
+        self._insert(key, ctx)
+
+    def __delitem__(self, key: str) -> None:
+        found = self._hot.pop(key, None) is not None
+        self._touched.pop(key, None)
+        found = self._cold.pop(key, None) is not None or found
+        if not found:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._hot or key in self._cold
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._hot)
+        yield from list(self._cold)
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._cold)
+
+    def pop(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
+        ctx = self._hot.pop(key, None)
+        self._touched.pop(key, None)
+        blob = self._cold.pop(key, None)
+        if ctx is None and blob is not None:
+            ctx = self._from_doc(json.loads(self._decompress(blob)))
+        return default if ctx is None else ctx
+
+    def clear(self) -> None:
+        self._hot.clear()
+        self._touched.clear()
+        self._cold.clear()
+
+    # Non-promoting access for persistence
+    def peek(self, key: str) -> Any:
+        """Return the context for `key` (decoding a cold copy) without touching LRU order or stats."""
+        ctx = self._hot.get(key)
+        if ctx is not None:
+            return ctx
+        blob = self._cold.get(key)
+        return self._from_doc(json.loads(self._decompress(blob))) if blob is not None else None
+
+    def docs(self) -> Iterator[Tuple[str, dict]]:
+        """Yield `(key, doc)` for every resident and cold context."""
+        for key, ctx in list(self._hot.items()):
+            yield key, self._to_doc(ctx)
+        for key, blob in list(self._cold.items()):
+            yield key, self.cold_doc(blob)
+
+    def capture(self, freeze: Callable[[Any], Any]) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+        """Point-in-time view for off-loop serialization: `freeze(ctx)` per resident context, raw cold blobs.
+
+        Nothing is encoded or decompressed here; pass the blobs to `cold_doc`
+        from the thread that serializes them.
+        """
+        return {key: freeze(ctx) for key, ctx in self._hot.items()}, dict(self._cold)
+
+    def cold_doc(self, blob: bytes) -> dict:
+        """Decode a cold-tier blob back into its document (safe from any thread)."""
+        return json.loads(self._decompress(blob))
+
+    # Eviction
+    def _insert(self, key: str, ctx: Any) -> None:
+        self._hot[key] = ctx
+        self._hot.move_to_end(key)
+        self._touched[key] = self._clock()
+        self.enforce()
+
+    def _evict(self, key: str) -> None:
+        ctx = self._hot.pop(key)
+        self._touched.pop(key, None)
+        raw = json.dumps(self._to_doc(ctx), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._cold[key] = self._compress(raw)
+        self.stats.evictions += 1
+
+    def enforce(self) -> int:
+        """Move expired and over-budget contexts to the cold tier; return how many moved.
+
+        The most recently used context always stays resident.
+        """
+        if not self.bounded:
+            return 0
+        moved = 0
+        if self.idle_ttl:
+            cutoff = self._clock() - self.idle_ttl
+            while len(self._hot) > 1:
+                key = next(iter(self._hot))
+                if self._touched.get(key, 0.0) > cutoff:
+                    break
+                self._evict(key)
+                self.stats.expired += 1
+                moved += 1
+        if self.max_channels:
+            while len(self._hot) > max(1, self.max_channels):
+                self._evict(next(iter(self._hot)))
+                moved += 1
+        if self.max_bytes:
+            total = self.resident_bytes
+            while len(self._hot) > 1 and total > self.max_bytes:
+                key = next(iter(self._hot))
+                total -= self._sizeof(self._hot[key])
+                self._evict(key)
+                moved += 1
+        return moved
+
+    # Metrics
+    @property
+    def resident(self) -> int:
+        return len(self._hot)
+
+    @property
+    def cold(self) -> int:
+        return len(self._cold)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._sizeof(v) for v in self._hot.values())
+
+    @property
+    def cold_bytes(self) -> int:
+        return sum(len(b) for b in self._cold.values())
+
+    def metrics(self) -> dict:
+        d = self.stats.as_dict()
+        d.update(resident=self.resident, resident_bytes=self.resident_bytes, cold=self.cold, cold_bytes=self.cold_bytes)
+        return d
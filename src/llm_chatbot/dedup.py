@@ -0,0 +1,127 @@
+"""Near-duplicate detection for channel messages (shingling + MinHash).
+
+`NearDuplicateDetector` keeps bottom-k MinHash sketches of character
+shingles for a bounded window of recent original messages. A new message
+whose estimated Jaccard similarity with one of them reaches the threshold
+(or that matches exactly) is stored as a compact reference to it, and
+`collapse_repeats` folds such references into one prompt entry with a count.
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+import zlib
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def message_body(content: str, author: Optional[str]) -> str:
+    """Return `content` without the `"<author>: "` prefix the runtime adds."""
+    if author and content.startswith(author + ": "):
+        return content[len(author) + 2 :]
+    return content
+
+
+def _normalize(text: str) -> str:
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+
+
+def sketch(text: str, *, k: int = 32, shingle: int = 5) -> FrozenSet[int]:
+    """Bottom-k MinHash sketch of the character shingles of `text`."""
+    t = _normalize(text)
+    if len(t) <= shingle:
+        grams = {t}
+    else:
+        grams = {t[i : i + shingle] for i in range(len(t) - shingle + 1)}
+    return frozenset(heapq.nsmallest(k, {zlib.crc32(g.encode("utf-8")) for g in grams}))
+
+
+def similarity(a: FrozenSet[int], b: FrozenSet[int], *, k: int = 32) -> float:
+    """Estimate the Jaccard similarity of the shingle sets behind two sketches."""
+    if not a or not b:
+        return 0.0
+    union = heapq.nsmallest(k, a | b)
+    both = a & b
+    return sum(1 for h in union if h in both) / len(union)
+
+
+class NearDuplicateDetector:
+    """Match new messages against a bounded window of recent originals.
+
+    Parameters
+    ----------
+    threshold: float
+        Minimum estimated Jaccard similarity for a near duplicate.
+    window: int
+        Number of recent original messages kept for comparison.
+    min_chars: int
+        Shorter messages only match exactly (sketches of tiny texts are noisy).
+    """
+
+    def __init__(self, *, threshold: float = 0.85, window: int = 64, min_chars: int = 24, k: int = 32) -> None:
+        self.threshold = float(threshold)
+        self.min_chars = int(min_chars)
+        self.k = int(k)
+        self._window: Deque[Tuple[int, str, Optional[FrozenSet[int]]]] = deque(maxlen=max(1, int(window)))
+        self._exact: Dict[str, int] = {}
+
+    def find(self, body: str) -> Optional[int]:
+        """Return the seq of an earlier original that `body` duplicates, if any."""
+        norm = _normalize(body)
+        if not norm:
+            return None
+        seq = self._exact.get(norm)
+        if seq is not None:
+            return seq
+        if len(norm) < self.min_chars:
+            return None
+        sk = sketch(norm, k=self.k)
+        best, best_sim = None, self.threshold
+        for seq, _norm, other in self._window:
+            if other is None:
+                continue
+            sim = similarity(sk, other, k=self.k)
+            if sim >= best_sim:
+                best, best_sim = seq, sim
+        return best
+
+    def add(self, seq: int, body: str) -> None:
+        """Remember an original message."""
+        norm = _normalize(body)
+        if not norm:
+            return
+        if len(self._window) == self._window.maxlen:
+            old_seq, old_norm, _ = self._window[0]
+            if self._exact.get(old_norm) == old_seq:
+                del self._exact[old_norm]
+        self._window.append((seq, norm, sketch(norm, k=self.k) if len(norm) >= self.min_chars else None))
+        self._exact[norm] = seq
+
+
+def collapse_repeats(records: Iterable) -> List[dict]:
+    """Return prompt messages with duplicate references folded into their first occurrence.
+
+    Each folded entry gets a `[repeated N×: authors]` note. The newest record
+    is always kept as its own entry because it is the message being answered.
+    """
+    recs = list(records)
+    out: List[dict] = []
+    groups: Dict[int, Tuple[int, List[str]]] = {}  # canonical seq -> (out index, authors)
+    for i, m in enumerate(recs):
+        ref = m.get("ref")
+        canonical = ref if ref is not None else m.get("seq")
+        foldable = m.get("role") == "user" and canonical is not None and i < len(recs) - 1
+        if foldable and canonical in groups:
+            groups[canonical][1].append(m.get("author") or "?")
+            continue
+        out.append({"role": m.get("role", "user"), "content": m.get("content", "")})
+        if foldable:
+            groups[canonical] = (len(out) - 1, [m.get("author") or "?"])
+    for idx, authors in groups.values():
+        if len(authors) > 1:
+            out[idx]["content"] += f" [repeated {len(authors)}×: {', '.join(dict.fromkeys(authors))}]"
+    return out
@@ -9,32 +9,52 @@ from __future__ import annotations
 import asyncio
 import logging
 import re
-from typing import List
+import time
+from pathlib import Path
+from typing import List, Optional
 
 import discord
 from discord.ext import commands
 
+from .breaker import BREAKERS, BreakerConfig, configure_breakers
+from .chain import CHAIN_STATS, chain_delta, chain_key, chain_point, commit_chain, reset_chain
+from .clients import CLIENTS, ClientPoolConfig, configure_clients
 from .commands import register_commands
 from .config import Config
-from .costs import rollover_if_needed, usd_cost
+from .costs import usd_cost
+from .dedup import collapse_repeats, message_body
+from .history import estimate_tokens
 from .i18n import load_i18n
-from .listener import mark_intervened, should_intervene
+from .judge import JudgeRunner
+from .keys import KEYS, KeyPoolConfig, KeySpec, configure_keys
+from .listener import should_intervene
 from .memory import MemoryStore
 from .openai_client import (
     _messages_to_responses_payload,
-    chat_complete_with_usage,
-    judge_intervention,
+    chat_complete_with_usage_async,
+    judge_intervention_async,
+    moderate_text_async,
+    summarize_conversation,
 )
+from .persistence import WriteBehindScheduler
 from .personality import Personality
 from .rate_limit import MultiKeySlidingWindow
+from .replication import Replica, ReplicationPublisher
+from .resilience import DeadlineExceeded, ResilienceConfig, configure_resilience, start_deadline
 from .runtime_utils import (
     _build_env_context,
     _chunk_message,
     _effective_model_and_params,
+    _effective_reply_cap,
     _effective_truncation,
+    _max_output_tokens,
     _maybe_alert_owner,
 )
+from .scheduler import SchedulerConfig, Shed, configure_scheduler, set_work
+from .storage import open_backend
 from .streaming import send_stream_as_messages, stream_deltas
+from .summarizer import RollingSummarizer
+from .throttle import ThrottleConfig, configure_throttle
 
 logger = logging.getLogger(__name__)
 
@@ -49,25 +69,31 @@ def _conversation(
     remaining: int,
     *,
     add_meta: bool = True,
+    summary: str = "",
 ) -> List[dict]:
     """Return a full conversation list including system/developer guidance.
 
     The bot merges persona system + developer guidance into a single system-like
     context by appending the developer prompt to system guidance as a dedicated
     "developer" item for the Responses API (performed downstream when building
-    typed items).
+    typed items). A rolling `summary` of older messages is appended to that
+    guidance when present.
+    Repeated messages (duplicate references) are folded into one entry with a count.
     """
-    convo = list(messages)
+    # Plain role/content dicts: stored records carry bookkeeping fields the APIs don't accept
+    convo = collapse_repeats(messages)
     sys = system
     if developer:
         sys = developer + "\n\n" + system
+    if summary:
+        sys += "\n\n[summary of earlier conversation]\n" + summary
     if add_meta:
         sys += f"\n\n[meta] {remaining} message(s) remaining in this conversation."
     convo.append({"role": "system", "content": sys})
     return convo
 
 
-def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
+def run(cfg: Config, personality: Personality, *, stream: bool = True, replica: Optional[Replica] = None) -> None:
     """Start the Discord bot event loop.
 
     Parameters
@@ -79,6 +105,9 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
     stream: bool
         Whether to use streaming responses by default (with a natural burst
         sender). If streaming fails, gracefully falls back to non-streaming.
+    replica: Replica, optional
+        State taken over from a failed primary (standby mode); the store is
+        built from it instead of being read from disk.
     """
     intents = discord.Intents.default()
     intents.message_content = True
@@ -87,9 +116,81 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
 
     effective_prefix = personality.command_prefix or cfg.command_prefix
     bot = commands.Bot(command_prefix=effective_prefix, intents=intents)
-    store = MemoryStore(cfg.store_path)
+
+    def _make_store(initial: Optional[dict] = None) -> MemoryStore:
+        return MemoryStore(
+            cfg.store_path,
+            backend=open_backend(cfg.store_backend, cfg.store_path, journal=cfg.store_journal, journal_fsync=cfg.store_journal_fsync),
+            history_max=cfg.store_history_max,
+            max_resident=cfg.cache_max_channels,
+            max_resident_bytes=cfg.cache_max_bytes,
+            idle_ttl=cfg.cache_idle_ttl,
+            cold_codec=cfg.cache_codec,
+            dedup_threshold=cfg.store_dedup_threshold if cfg.store_dedup else None,
+            initial=initial,
+        )
+
+    if replica is not None:
+        store = replica.promote(_make_store)
+        store.replication = replica
+        logger.info("replication: promoted standby %s", replica.stats.as_dict())
+    else:
+        store = _make_store()
+    publisher = None
+    if cfg.replication_socket:
+        publisher = ReplicationPublisher(store, Path(cfg.replication_socket), heartbeat=cfg.replication_heartbeat)
+        publisher.failover = replica.stats if replica is not None else None
+    writer = WriteBehindScheduler(
+        store,
+        max_delay=cfg.store_save_delay,
+        max_pending=cfg.store_save_max_pending,
+        fsync=cfg.store_fsync,
+    )
+    store.attach_writer(writer)
     i18n = load_i18n(personality.language, overrides=personality.messages)
 
+    # One pooled client per API key for every OpenAI call
+    configure_clients(
+        ClientPoolConfig(
+            base_url=cfg.openai_base_url,
+            max_connections=cfg.openai_max_connections,
+            max_keepalive=cfg.openai_max_keepalive,
+            keepalive_expiry=cfg.openai_keepalive_expiry,
+            connect_timeout=cfg.openai_connect_timeout,
+            timeout=cfg.openai_timeout,
+            warmup_connections=cfg.openai_warmup_connections,
+        )
+    )
+
+    configure_breakers(
+        BreakerConfig(
+            failure_threshold=cfg.openai_breaker_failures,
+            cooldown=cfg.openai_breaker_cooldown,
+            capability_cooldown=cfg.openai_breaker_capability_cooldown,
+        )
+    )
+
+    configure_resilience(
+        ResilienceConfig(
+            attempts=cfg.openai_retry_attempts,
+            backoff_base=cfg.openai_retry_backoff,
+            backoff_cap=cfg.openai_retry_backoff_cap,
+            judge_timeout=cfg.openai_judge_timeout,
+            chat_timeout=cfg.openai_chat_timeout,
+            first_token_timeout=cfg.stream_first_token_timeout,
+            idle_timeout=cfg.stream_idle_timeout,
+            reply_deadline=cfg.reply_deadline,
+        )
+    )
+
+    configure_scheduler(
+        SchedulerConfig(max_concurrency=cfg.llm_max_concurrency, max_queue=cfg.llm_max_queue, weights=dict(cfg.llm_guild_weights))
+    )
+    configure_keys(
+        KeyPoolConfig(keys=[KeySpec(k, tpm=tpm, rpm=rpm) for k, tpm, rpm in cfg.openai_api_keys], drain_seconds=cfg.openai_key_drain)
+    )
+    configure_throttle(ThrottleConfig(enabled=cfg.openai_throttle, max_wait=cfg.openai_throttle_max_wait))
+
     # Compute effective judge model locally (avoid mutating personality at runtime)
     def effective_judge_model() -> str:
         try:
@@ -100,6 +201,41 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
         except Exception:
             return "gpt-5-nano"
 
+    def judge_runner() -> JudgeRunner:
+        lc = personality.listen
+
+        def _judge(model: str, msgs: List[dict]):
+            return judge_intervention_async(cfg.openai_api_key, model, msgs, lc.judge_threshold, race=True)
+
+        return JudgeRunner(
+            personality.name,
+            _judge,
+            model=effective_judge_model(),
+            threshold=lc.judge_threshold,
+            escalate_model=lc.judge_escalate_model,
+            band=lc.judge_escalate_band,
+            strategy=lc.judge_strategy,
+            concurrent_above=lc.judge_concurrent_above,
+        )
+
+    summarizer = None
+    ctx_cfg = getattr(personality, "context", None)
+    if ctx_cfg is not None and ctx_cfg.summary_enabled:
+        summary_model = ctx_cfg.summary_model or effective_judge_model()
+
+        def _summarize(previous: str, msgs: List[dict]):
+            return summarize_conversation(
+                cfg.openai_api_key, summary_model, previous, msgs, max_chars=ctx_cfg.summary_max_chars, language=personality.language
+            )
+
+        def _summary_cost(usage) -> None:
+            bot_id = getattr(bot.user, "id", 0) if bot.user else None
+            store.add_cost(bot_id, summary_model, "summary", usd_cost(summary_model, *usage))
+
+        summarizer = RollingSummarizer(
+            store, _summarize, trigger=ctx_cfg.summary_trigger, keep_last=ctx_cfg.summary_keep_last, on_usage=_summary_cost
+        )
+
     def _strip_leading_self_mention(text: str) -> str:
         """Remove a leading mention of the bot itself from text (e.g., '<@id>' or '<@!id>')."""
         if not text or not bot.user:
@@ -118,21 +254,60 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
                 out = s
         return out
 
+    @bot.event
+    async def setup_hook():
+        # Runs after login, before the gateway connects: open API connections meanwhile
+        for key in KEYS.api_keys() or [cfg.openai_api_key]:
+            bot.loop.create_task(CLIENTS.warmup_async(key))
+
     @bot.event
     async def on_ready():
         logger.info("Connected as %s", bot.user)
 
-        async def periodic_save():
-            while True:
-                await asyncio.sleep(300)
-                store.save()
+        # Coalesced write-behind saves replace synchronous saves on the hot path
+        writer.start(bot.loop)
+
+        if replica is not None and not replica.stats.ready_ms:
+            replica.mark_ready()
+            logger.info("replication: failover complete %s", replica.stats.as_dict())
+            store.mark_dirty()  # persist mutations the failed primary had not written
+        if publisher is not None and not publisher.running:
+            try:
+                await publisher.start()
+            except OSError as e:
+                logger.warning("replication: cannot listen on %s: %s", cfg.replication_socket, e)
+
+        if store.journaled:
+
+            async def periodic_compact():
+                # Seal + fold on the writer thread so compaction is serialized with saves
+                while True:
+                    await asyncio.sleep(30)
+                    if store.journal_records() < cfg.store_compact_records:
+                        continue
+                    n = await writer.run_exclusive(store.compact_journal)
+                    logger.info("store: compacted %d journal record(s) writes=%s", n or 0, writer.stats.as_dict())
 
-        bot.loop.create_task(periodic_save())
+            bot.loop.create_task(periodic_compact())
+
+        if store.cache.bounded:
+
+            async def periodic_cache_sweep():
+                # Idle TTL is also enforced on lookups; this catches quiet periods
+                while True:
+                    await asyncio.sleep(60)
+                    moved = store.sweep_cache()
+                    if moved:
+                        logger.debug("store: moved %d idle context(s) cold cache=%s", moved, store.cache.metrics())
+
+            bot.loop.create_task(periodic_cache_sweep())
 
     @bot.event
     async def on_message(message: discord.Message):
         if message.author == bot.user:
             return
+        # Bounded worst-case reply time: judge, generation and fallbacks all fit in this budget
+        start_deadline(cfg.reply_deadline)
 
         is_dm = message.guild is None
         is_mentioned = bot.user and bot.user.mentioned_in(message)
@@ -182,6 +357,11 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
             on_mention_enabled = True
         if is_dm or (is_mentioned and on_mention_enabled) or word_triggered:
             primary_trigger = True
+        # Class this message's LLM calls for the admission scheduler (judge calls run as "judge")
+        set_work(
+            "direct" if (is_dm or (is_mentioned and on_mention_enabled)) else ("trigger" if word_triggered else "listen"),
+            str(message.guild.id) if message.guild else f"dm:{message.author.id}",
+        )
 
         bot_id_str = str(getattr(bot.user, "id", "")) if bot.user else ""
         rl_caps: dict[str, list[tuple[int, int]]] = {}
@@ -197,7 +377,11 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
                     rl_caps["global"] = [(int(d.window), int(d.max)) for d in personality.rate_limit.global_]
         except Exception:
             rl_caps = {}
-        limiter = MultiKeySlidingWindow(rl_caps, store.rate_windows_for(bot_id_str)) if bot_id_str else None
+        limiter = (
+            MultiKeySlidingWindow(rl_caps, store.rate_windows_for(bot_id_str), on_event=store.rate_event_hook(bot_id_str))
+            if bot_id_str
+            else None
+        )
 
         async def send_gate() -> bool:
             if limiter is None:
@@ -210,7 +394,7 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
                     ok = limiter.allow("dm_user", str(getattr(message.author, "id", ""))) and ok
                 ok = limiter.allow("trigger_user", str(getattr(message.author, "id", ""))) and ok
                 if ok:
-                    store.save()
+                    store.mark_dirty()
             except Exception:
                 return False
             return ok
@@ -257,31 +441,21 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
                         # Fallback: use in-memory context (no timestamps)
                         pre_ctx = store.get(message.channel.id)
                         hist = pre_ctx.messages[-max(1, personality.listen.judge_max_context_messages) :]
-                        judge_msgs = hist + [{"role": "user", "content": f"{message.author.display_name}: {content}"}]
-                    accepted, j_intent, conf = judge_intervention(
-                        cfg.openai_api_key,
-                        effective_judge_model(),
-                        judge_msgs,
-                        personality.listen.judge_threshold,
-                    )
+                        # Stored records are not JSON-serializable; send plain role/content dicts
+                        judge_msgs = [{"role": m.role, "content": m.content} for m in hist]
+                        judge_msgs.append({"role": "user", "content": f"{message.author.display_name}: {content}"})
+                    decision = await judge_runner().decide(judge_msgs, message.channel.id)
+                    accepted, j_intent = decision.accepted, decision.intent
                     logger.info(
-                        "listen-judge: model=%s accepted=%s conf=%.2f intent=%s",
-                        personality.listen.judge_model,
+                        "listen-judge: model=%s strategy=%s escalated=%s accepted=%s conf=%.2f intent=%s latency_ms=%.0f",
+                        decision.model,
+                        decision.strategy,
+                        decision.escalated,
                         accepted,
-                        conf,
+                        decision.confidence,
                         j_intent,
+                        decision.latency_ms,
                     )
-                    if not accepted and "nano" in effective_judge_model() and 0.4 <= conf < personality.listen.judge_threshold:
-                        accepted, j_intent, conf = judge_intervention(
-                            cfg.openai_api_key, "gpt-5-mini", judge_msgs, personality.listen.judge_threshold
-                        )
-                        logger.info(
-                            "listen-judge-escalate: model=%s accepted=%s conf=%.2f intent=%s",
-                            "gpt-5-mini",
-                            accepted,
-                            conf,
-                            j_intent,
-                        )
                     if not accepted:
                         logger.debug("listen-skip: judge rejected")
                         return
@@ -312,7 +486,18 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
 
         user_msg = f"{message.author.display_name}: {content}"
         addressed_now = bool(primary_trigger)
-        ctx.messages.append({"role": "user", "content": user_msg, "addressed": addressed_now})
+        store.append_message(
+            channel_id,
+            {
+                "role": "user",
+                "content": user_msg,
+                "author": message.author.display_name,
+                "addressed": addressed_now,
+                "ts": time.time(),
+            },
+        )
+        if message.guild:
+            store.set_channel_guild(channel_id, message.guild.id)
 
         if not intervened and ctx.turns >= cfg.max_turns:
             await message.channel.send(i18n.t("limit_reached", max_turns=cfg.max_turns, prefix=effective_prefix))
@@ -335,6 +520,7 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
             pass
 
         # If intervening, add a light tone directive and respect joke bias
+        turn_note = ""
         if intervened:
             try:
                 if intent != "joke" and "?" not in content and float(personality.listen.joke_bias) > 0:
@@ -345,12 +531,13 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
             except Exception:
                 pass
             if intent == "joke":
-                dev_base += "\n\nTone: brief, witty if appropriate; keep it helpful and concise."
+                turn_note = "Tone: brief, witty if appropriate; keep it helpful and concise."
             elif intent == "snark":
-                dev_base += "\n\nTone: light snark acceptable; stay friendly and concise."
+                turn_note = "Tone: light snark acceptable; stay friendly and concise."
             else:
                 # help (default) intent
-                dev_base += "\n\nTone: helpful, direct, and concise."
+                turn_note = "Tone: helpful, direct, and concise."
+            dev_base += "\n\n" + turn_note
 
         # Decide whether to include meta based on truncation: hide when active (auto)
         truncation_active = effective_truncation == "auto"
@@ -358,7 +545,9 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
             include_n = int(getattr(personality, "context", None).include_last_n) if getattr(personality, "context", None) else 10
         except Exception:
             include_n = 10
-        HARD_CAP = 50
+        token_budget = getattr(getattr(personality, "context", None), "input_token_budget", None)
+        # A token budget bounds input size itself; the count cap then only guards the ring size
+        HARD_CAP = 50 if token_budget is None else cfg.store_history_max
         include_n = max(1, min(include_n, HARD_CAP))
         include_non_addr = True
         try:
@@ -367,17 +556,29 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
         except Exception:
             include_non_addr = True
 
-        if include_non_addr:
-            history = ctx.messages[-include_n:]
+        # O(include_n): recent tail or addressed/assistant index, packed by cached token estimates
+        summary = ""
+        if summarizer is not None:
+            summary, history = summarizer.select(ctx, include_n, include_non_addressed=include_non_addr, token_budget=token_budget)
         else:
-            filtered = []
-            for m in ctx.messages:
-                r = m.get("role")
-                if r == "assistant":
-                    filtered.append(m)
-                elif r == "user" and m.get("addressed"):
-                    filtered.append(m)
-            history = filtered[-include_n:]
+            history = ctx.messages.select(include_n, include_non_addressed=include_non_addr, token_budget=token_budget)
+        retrieval_k = int(getattr(getattr(personality, "context", None), "retrieval_top_k", 0) or 0)
+        if retrieval_k > 0 and history:
+            # Older messages lexically relevant to the new one, ahead of the recency window
+            # Query by topic: the stored "Author: " prefix would favour that author's older messages
+            query = message_body(history[-1].content, history[-1].author)
+            recalled = ctx.messages.search(query, retrieval_k, before_seq=history[0].seq, include_non_addressed=include_non_addr)
+            if token_budget is not None:
+                room = token_budget - ctx.messages.tokens(history)
+                kept = []
+                for m in recalled:
+                    cost = ctx.messages.tokens([m])
+                    if cost <= room:
+                        kept.append(m)
+                        room -= cost
+                recalled = kept
+            history = recalled + history
+        logger.debug("context: messages=%d est_tokens=%d budget=%s", len(history), ctx.messages.tokens(history), token_budget)
 
         b_bot = store.billing_for(getattr(bot.user, "id", 0)) if bot.user else store.billing
         try:
@@ -404,6 +605,7 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
             dev_base,
             remaining,
             add_meta=not truncation_active,
+            summary=summary,
         )
 
         # Build Responses API typed input items (developer/user/assistant)
@@ -411,56 +613,115 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
 
         # Stream (default) or non-stream path
         input_tokens = output_tokens = cached_tokens = 0
+        hedge_usage: list = []
+        shed: Optional[Shed] = None
         use_stream = stream
         # Select model and parameters (allow override for interventions)
         gen_model, reasoning, verbosity = _effective_model_and_params(cfg.openai_model, intervened, personality, cfg.openai_verbosity)
+        # Bound generation at the source rather than only truncating what we send
+        reply_cap = _effective_reply_cap(personality, intervened)
+        max_out = _max_output_tokens(reply_cap, reasoning, personality.max_output_tokens)
+        # Opt-in server-side state: extend the channel's last stored response with only what is new (see `chain.py`)
+        chain_on = bool(ctx_cfg is not None and ctx_cfg.chain_responses)
+        chain_k = chain_key(personality, gen_model) if chain_on else ""
+        sent_upto = ctx.messages.next_seq
+        prev_id: Optional[str] = None
+        chain_msgs: List[dict] = []
+        response_ids: List[str] = []
+        point = chain_point(ctx, chain_k, ctx_cfg.chain_max_turns) if chain_on else None
+        if point is not None:
+            prev_id = point[0]
+            chain_msgs = collapse_repeats(chain_delta(ctx, point[1], include_non_addressed=include_non_addr))
+            meta = "" if truncation_active else f"[meta] {remaining} message(s) remaining in this conversation."
+            note = "\n\n".join(x for x in (turn_note, meta) if x)
+            if note:
+                chain_msgs.append({"role": "developer", "content": note})
+        gen_started = time.perf_counter()
+        if use_stream and not BREAKERS.allow(gen_model, "responses"):
+            logger.info("generate: responses breaker open for model=%s; skipping stream", gen_model)
+            use_stream = False
         if use_stream:
             try:
                 deltas = await stream_deltas(
                     cfg.openai_api_key,
                     gen_model,
-                    input_items,
+                    _messages_to_responses_payload(chain_msgs) if prev_id else input_items,
                     reasoning=reasoning,
                     verbosity=verbosity,
                     truncation=effective_truncation,
+                    max_output_tokens=max_out,
+                    hedge_after=personality.stream_hedge_after,
+                    hedge_model=personality.stream_hedge_model,
+                    previous_response_id=prev_id,
                 )
-                logger.info("generate: streaming model=%s", gen_model)
+                logger.info("generate: streaming model=%s max_output_tokens=%s", gen_model, max_out)
                 # Allow user mentions (to interact with others), block roles/everyone; strip only self-mention token
                 no_pings = discord.AllowedMentions(everyone=False, users=True, roles=False, replied_user=False)
-                final_text = await send_stream_as_messages(
-                    message.channel,
-                    deltas,
-                    rate_hz=personality.stream_rate_hz,
-                    min_first=personality.stream_min_first,
-                    min_next=personality.stream_min_next,
-                    strip_leading=[f"<@{bot.user.id}>", f"<@!{bot.user.id}>"] if bot.user else None,
-                    allowed_mentions=no_pings,
-                    max_total_chars=(personality.listen.response_max_chars if intervened else None),
-                    send_gate=send_gate,
-                )
-                # Capture usage if available
-                if getattr(deltas, "usage", None):
-                    input_tokens, output_tokens, cached_tokens = deltas.usage  # type: ignore
+                # Leaving the block cancels the producer and closes the upstream stream if still open
+                async with deltas:
+                    final_text = await send_stream_as_messages(
+                        message.channel,
+                        deltas,
+                        rate_hz=personality.stream_rate_hz,
+                        min_first=personality.stream_min_first,
+                        min_next=personality.stream_min_next,
+                        strip_leading=[f"<@{bot.user.id}>", f"<@!{bot.user.id}>"] if bot.user else None,
+                        allowed_mentions=no_pings,
+                        max_total_chars=reply_cap,
+                        send_gate=send_gate,
+                    )
+                # Capture usage; a stream stopped early (cap or rate limit) has none, so estimate what was generated
+                input_tokens, output_tokens, cached_tokens = deltas.estimated_usage()
+                if deltas.aborted:
+                    logger.info("generate: stream aborted early chars=%d est_output=%d", deltas.received_chars, output_tokens)
+                # A hedged stream may have been answered by the hedge model; the cancelled request is billed separately
+                gen_model = deltas.model or gen_model
+                hedge_usage = list(deltas.hedge_usage)
+                if deltas.response_id:
+                    response_ids.append(deltas.response_id)
+            except Shed as e:
+                shed = e
             except Exception as e:
                 logger.exception("generate: streaming failed; falling back. error=%s", e)
                 use_stream = False
+                if prev_id is not None:
+                    reset_chain(ctx, "rejected")
+                    prev_id = None
 
-        if not use_stream:
+        if not use_stream and shed is None:
             try:
-                logger.info("generate: non-stream model=%s", gen_model)
-                final_text, usage = chat_complete_with_usage(
-                    api_key=cfg.openai_api_key,
-                    model=gen_model,
-                    messages=convo,
-                    reasoning=reasoning,
-                    verbosity=verbosity,
-                    truncation=effective_truncation,
-                )
+                logger.info("generate: non-stream model=%s chained=%s", gen_model, prev_id is not None)
+
+                def _complete(prev: Optional[str]):
+                    return chat_complete_with_usage_async(
+                        api_key=cfg.openai_api_key,
+                        model=gen_model,
+                        messages=chain_msgs if prev else convo,
+                        reasoning=reasoning,
+                        verbosity=verbosity,
+                        truncation=effective_truncation,
+                        max_output_tokens=max_out,
+                        previous_response_id=prev,
+                        on_response_id=response_ids.append if chain_on else None,
+                    )
+
+                try:
+                    final_text, usage = await _complete(prev_id)
+                except (Shed, DeadlineExceeded):
+                    raise
+                except Exception as e_chain:
+                    if prev_id is None:
+                        raise
+                    # Expired or deleted response: the stored chain is gone, send everything once
+                    logger.info("chain: chained request failed; resending full context error=%s", e_chain)
+                    reset_chain(ctx, "rejected")
+                    prev_id = None
+                    final_text, usage = await _complete(None)
                 input_tokens, output_tokens, cached_tokens = usage
                 # Sanitize leading self-mention; allow user mentions (block roles/everyone)
                 final_text = _strip_leading_self_mention(final_text)
-                if intervened and personality.listen.response_max_chars:
-                    final_text = final_text[: max(0, int(personality.listen.response_max_chars))]
+                if reply_cap:
+                    final_text = final_text[: max(0, reply_cap)]
                 no_pings = discord.AllowedMentions(everyone=False, users=True, roles=False, replied_user=False)
                 for chunk in _chunk_message(final_text):
                     try:
@@ -469,47 +730,70 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
                     except Exception:
                         break
                     await message.channel.send(chunk, allowed_mentions=no_pings)
+            except Shed as e2:
+                shed = e2
+            except DeadlineExceeded as e2:
+                logger.warning("generate: reply deadline passed; giving up error=%s", e2)
+                final_text = i18n.t("generic_error")
+                no_pings = discord.AllowedMentions(everyone=False, users=True, roles=False, replied_user=False)
+                await message.channel.send(final_text, allowed_mentions=no_pings)
             except Exception as e2:
                 logger.exception("generate: non-stream failed error=%s", e2)
                 final_text = i18n.t("generic_error")
                 no_pings = discord.AllowedMentions(everyone=False, users=True, roles=False, replied_user=False)
                 await message.channel.send(final_text, allowed_mentions=no_pings)
 
+        if shed is not None:
+            # Overload: drop optional interventions silently; tell addressed users to retry
+            logger.warning("generate: request shed priority=%s reason=%s", shed.priority, shed.reason)
+            if not intervened:
+                no_pings = discord.AllowedMentions(everyone=False, users=True, roles=False, replied_user=False)
+                await message.channel.send(i18n.t("busy"), allowed_mentions=no_pings)
+            return
+        gen_ms = (time.perf_counter() - gen_started) * 1000.0
+        chain_mode = "chained" if prev_id is not None else "full"
+        if input_tokens or output_tokens:
+            sent = chain_msgs if prev_id is not None else convo
+            CHAIN_STATS.observe(chain_mode, sum(estimate_tokens(str(m.get("content", ""))) for m in sent), input_tokens, gen_ms)
+
         # Optional moderation (persona listen setting)
         if intervened and personality.listen.moderation_enabled:
-            from .openai_client import moderate_text
-
-            allowed = moderate_text(cfg.openai_api_key, personality.listen.moderation_model, final_text)
+            allowed = await moderate_text_async(cfg.openai_api_key, personality.listen.moderation_model, final_text)
             if not allowed:
                 # Skip sending content (already sent if streaming; in that case, this should be disabled or pre-moderated)
                 # For simplicity, do nothing extra here.
                 pass
 
         # Update memory after completion
-        ctx.turns += 1
+        store.increment_turns(channel_id)
         # Persist the sanitized final text in memory for context dumps
         final_text = _strip_leading_self_mention(final_text)
-        ctx.messages.append({"role": "assistant", "content": final_text})
+        store.append_message(channel_id, {"role": "assistant", "content": final_text, "ts": time.time()})
+        if chain_on:
+            cur = store.get(channel_id)
+            commit_chain(
+                cur, response_ids[-1] if response_ids else None, chain_k, sent_upto, cur.messages.last.seq, chained=prev_id is not None
+            )
+        if summarizer is not None:
+            summarizer.maybe_schedule(channel_id)
         # Mark intervention cooldown if applicable
         if intervened and message.guild:
-            gs = store.guild_settings(message.guild.id)
-            mark_intervened(gs, message.channel.id, int(getattr(message.author, "id", 0) or 0))
+            store.mark_intervened(message.guild.id, message.channel.id, int(getattr(message.author, "id", 0) or 0))
 
         # Cost tracking (per-bot) and alerts
         try:
-            bcur = store.billing_for(getattr(bot.user, "id", 0)) if bot.user else store.billing
-            rollover_if_needed(bcur)
             used_model = gen_model if "gen_model" in locals() else cfg.openai_model
             cost = usd_cost(used_model, input_tokens, output_tokens, cached_tokens)
-            bcur.daily_usd += cost
-            bcur.monthly_usd += cost
-            tier = used_model
-            bcur.by_model[tier] = bcur.by_model.get(tier, 0.0) + cost
             feat = "listen" if intervened else "mention_or_dm"
-            bcur.by_feature[feat] = bcur.by_feature.get(feat, 0.0) + cost
-            store.save()
+            store.add_cost(getattr(bot.user, "id", 0) if bot.user else None, used_model, feat, cost)
+            for h_model, h_usage in hedge_usage:
+                h_cost = usd_cost(h_model, *h_usage)
+                store.add_cost(getattr(bot.user, "id", 0) if bot.user else None, h_model, "hedge", h_cost)
+                logger.info("usage hedge model=%s input=%d output=%d cost=$%.4f (estimated)", h_model, h_usage[0], h_usage[1], h_cost)
+            store.mark_dirty()
             logger.info(
-                "usage model=%s input=%d output=%d cached=%d cost=$%.4f feature=%s channel=%s guild=%s",
+                "usage model=%s input=%d output=%d cached=%d cost=$%.4f feature=%s channel=%s guild=%s summary_saved=%s"
+                " context=%s latency_ms=%d",
                 used_model,
                 input_tokens,
                 output_tokens,
@@ -518,12 +802,21 @@ def run(cfg: Config, personality: Personality, *, stream: bool = True) -> None:
                 feat,
                 getattr(message.channel, "id", None),
                 getattr(message.guild, "id", None),
+                summarizer.stats.last_saved if (summarizer is not None and summary) else "-",
+                chain_mode,
+                gen_ms,
             )
             await _maybe_alert_owner(bot, cfg, store, i18n)
         except Exception:
             pass
 
-        store.save()
+        store.mark_dirty()
 
     register_commands(bot, store, cfg, i18n, personality, effective_prefix)
-    bot.run(cfg.discord_token)
+    try:
+        bot.run(cfg.discord_token)
+    finally:
+        if publisher is not None:
+            publisher.detach()
+        store.close()
+        CLIENTS.close()
@@ -0,0 +1,425 @@
+"""Streaming export of a context store as JSONL or CSV.
+
+`export_store` walks one backend's files directly (it never builds a
+`MemoryStore`) and holds at most one channel document in memory at a time,
+so it can run against a live bot's store:
+
+- `json`: the document is parsed incrementally; sealed and active journal
+  records are overlaid per channel (journals are bounded by compaction).
+- `sqlite`: a read-only connection inside one read transaction (WAL readers
+  never block the writer); messages stream from a cursor.
+- `sharded` / `binary`: one channel shard or snapshot entry at a time.
+
+Archived messages (evicted from the retention window) are exported before the
+retained ones and flagged `archived`. Each row is a dict whose `type` is
+`channel`, `message`, `guild`, or `billing`.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import chain
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import read_json
+from .dedup import message_body
+from .history import DEFAULT_HISTORY_MAX, REPEATED_PLACEHOLDER
+from .journal import apply_record, journal_path_for, sealed_path_for
+from .snapshot import SnapshotReader
+
+KINDS = ("channels", "messages", "guilds", "billing")
+CSV_FIELDS = ("type", "guild", "channel", "seq", "ts", "role", "author", "addressed", "archived", "content", "data")
+
+# Journal ops scoped to one channel (overlaid per channel during a JSON export)
+_CHANNEL_OPS = ("msg", "trim", "unref", "turns", "summary", "channel", "reset")
+
+# Originals remembered per channel to expand duplicate references (`ref`)
+_REF_WINDOW = 4096
+
+# Source events: ("channel", (key, doc, messages)) with messages as (archived, record) pairs, then ("meta", raw)
+Event = Tuple[str, object]
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse an epoch number or ISO 8601 date/time (naive values are UTC)."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+@dataclass
+class ExportFilter:
+    """Which rows to export. Empty sets mean no restriction; times bound message `ts` as [since, until)."""
+
+    guilds: Set[str] = field(default_factory=set)
+    channels: Set[str] = field(default_factory=set)
+    since: Optional[float] = None
+    until: Optional[float] = None
+    kinds: Tuple[str, ...] = KINDS
+
+    def channel_ok(self, key: str, guild: str) -> bool:
+        if self.channels and key not in self.channels:
+            return False
+        return not self.guilds or guild in self.guilds
+
+    def ts_ok(self, ts: Optional[float]) -> bool:
+        if self.since is None and self.until is None:
+            return True
+        if ts is None:
+            return False
+        if self.since is not None and ts < self.since:
+            return False
+        return self.until is None or ts < self.until
+
+
+class _JsonStream:
+    """Incremental reader for one JSON document, value by value."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, fh: IO[str], chunk: int = 1 << 16) -> None:
+        self.fh = fh
+        self.chunk = chunk
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Grow reads geometrically so a large value is not re-parsed once per chunk
+        more = self.fh.read(max(self.chunk, len(self.buf) - self.pos))
+        if not more:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + more
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} in JSON store")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buf) and self._fill():  # a number may continue in the next chunk
+                continue
+            self.pos = end
+            return v
+
+    def members(self) -> Iterator[str]:
+        """Yield an object's keys; the caller consumes each value before resuming."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            nxt = self.peek()
+            self.pos += 1
+            if nxt == "}":
+                return
+            if nxt != ",":
+                raise ValueError("malformed object in JSON store")
+
+
+def _archive_records(archive_dir: Path, key: str) -> Iterator[dict]:
+    from .storage import _safe_name
+
+    try:
+        fh = (archive_dir / f"{_safe_name(key)}.jsonl").open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with fh:
+        for line in fh:
+            if line.endswith("\n"):  # skip a line still being appended
+                yield json.loads(line)
+
+
+def _channel(key: str, doc: dict, archive_dir: Optional[Path]) -> Event:
+    msgs = doc.pop("messages", None) or []
+    first_seq = int(doc.get("first_seq", 0) or 0)
+    archived = ((True, m) for m in _archive_records(archive_dir, key)) if archive_dir is not None else iter(())
+    retained = ((False, dict(m, seq=m.get("seq", first_seq + i))) for i, m in enumerate(msgs) if isinstance(m, dict))
+    return "channel", (key, doc, chain(archived, retained))
+
+
+def _open_consistent(paths: List[Path]) -> List[Optional[IO[str]]]:
+    """Open `paths` together, retrying while a live compaction renames or replaces them."""
+
+    def state() -> tuple:
+        out = []
+        for p in paths:
+            try:
+                out.append(os.stat(p).st_ino)
+            except FileNotFoundError:
+                out.append(None)
+        return tuple(out)
+
+    for _ in range(10):
+        before = state()
+        handles: List[Optional[IO[str]]] = []
+        for p in paths:
+            try:
+                handles.append(p.open("r", encoding="utf-8"))
+            except FileNotFoundError:
+                handles.append(None)
+        if state() == before:
+            return handles
+        for h in handles:
+            if h is not None:
+                h.close()
+    raise RuntimeError("store files kept changing while opening them; retry the export")
+
+
+def _read_journal(fh: Optional[IO[str]]) -> Iterator[dict]:
+    if fh is None:
+        return
+    with fh:
+        for line in fh:
+            if not line.endswith("\n"):
+                return
+            try:
+                yield json.loads(line)
+            except Exception:
+                continue
+
+
+def _json_source(path: Path, history_max: int) -> Iterator[Event]:
+    store_fh, sealed_fh, active_fh = _open_consistent([path, sealed_path_for(path), journal_path_for(path)])
+    records = list(chain(_read_journal(sealed_fh), _read_journal(active_fh)))
+    # Channel records before the last reset_all are moot; other records update the meta
+    last_reset = max((i for i, r in enumerate(records) if r.get("op") == "reset_all"), default=-1)
+    by_channel: Dict[str, List[dict]] = OrderedDict()
+    for i, rec in enumerate(records):
+        if rec.get("op") in _CHANNEL_OPS and i > last_reset:
+            by_channel.setdefault(str(rec["ch"]), []).append(rec)
+    archive_dir = path.with_suffix(".archive")
+
+    def overlay(key: str, doc: Optional[dict]) -> Optional[dict]:
+        raw = {"chats": {key: doc} if doc is not None else {}}
+        for rec in by_channel.pop(key, ()):
+            apply_record(raw, rec)
+        return raw["chats"].get(key)
+
+    head: dict = {}
+    try:
+        stream = _JsonStream(store_fh) if store_fh is not None else None
+        if stream is not None and stream.peek():
+            for top in stream.members():
+                if top != "chats":
+                    head[top] = stream.value()
+                    continue
+                for key in stream.members():
+                    doc = stream.value()
+                    if last_reset < 0 and isinstance(doc, dict):
+                        doc = overlay(str(key), doc)
+                        if doc is not None:
+                            yield _channel(str(key), doc, archive_dir)
+    finally:
+        if store_fh is not None:
+            store_fh.close()
+    for key in list(by_channel):
+        doc = overlay(key, None)
+        if doc is not None:
+            yield _channel(key, doc, archive_dir)
+    head.pop("chats", None)
+    for rec in records:
+        if rec.get("op") not in _CHANNEL_OPS and rec.get("op") != "reset_all":
+            apply_record(head, rec)
+    yield "meta", head
+
+
+def _sqlite_source(path: Path, history_max: int) -> Iterator[Event]:
+    from .storage import _message_from_row
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, isolation_level=None)
+    try:
+        conn.execute("BEGIN")  # one consistent read snapshot for the whole export
+        has_meta = "meta" in {r[1] for r in conn.execute("PRAGMA table_info(channels)")}
+        query = "SELECT channel_id, turns, " + ("meta" if has_meta else "NULL") + " FROM channels ORDER BY channel_id"
+        for key, turns, cmeta in conn.cursor().execute(query):
+            doc: dict = json.loads(cmeta) if cmeta else {}
+            doc["turns"] = int(turns or 0)
+            # Rows older than the retention window are the archive tier
+            (n,) = conn.execute("SELECT COUNT(*) FROM channel_messages WHERE channel_id = ?", (key,)).fetchone()
+            cut = n - history_max
+            rows = conn.cursor().execute("SELECT seq, role, content, extra FROM channel_messages WHERE channel_id = ? ORDER BY seq", (key,))
+            msgs = ((i < cut, dict(_message_from_row(role, content, extra), seq=seq)) for i, (seq, role, content, extra) in enumerate(rows))
+            yield "channel", (key, doc, msgs)
+        raw: dict = {"guild_settings": {}, "billing_by_bot": {}}
+        for gid, data in conn.execute("SELECT guild_id, data FROM guild_settings"):
+            raw["guild_settings"][gid] = json.loads(data)
+        for bot_id, data in conn.execute("SELECT bot_id, data FROM billing"):
+            if bot_id == "":
+                raw["billing"] = json.loads(data)
+            else:
+                raw["billing_by_bot"][bot_id] = json.loads(data)
+        yield "meta", raw
+    finally:
+        conn.close()
+
+
+def _sharded_source(path: Path, history_max: int) -> Iterator[Event]:
+    from .storage import _safe_name
+
+    manifest = read_json(path / "manifest.json")
+    for key in sorted(map(str, manifest.get("channels", []) or [])):
+        doc = read_json(path / "channels" / f"{_safe_name(key)}.json")
+        if doc:
+            yield _channel(key, doc, path / "archive")
+    raw = read_json(path / "state.json")
+    raw["guild_settings"] = {str(g): read_json(path / "guilds" / f"{_safe_name(str(g))}.json") for g in manifest.get("guilds", []) or []}
+    yield "meta", raw
+
+
+def _binary_source(path: Path, history_max: int) -> Iterator[Event]:
+    reader = SnapshotReader(path)
+    try:
+        for key in reader.keys():
+            yield _channel(key, reader.channel(key) or {}, path.with_suffix(".archive"))
+        yield "meta", dict(reader.meta)
+    finally:
+        reader.close()
+
+
+SOURCES: Dict[str, Callable[[Path, int], Iterator[Event]]] = {
+    "json": _json_source,
+    "sqlite": _sqlite_source,
+    "sharded": _sharded_source,
+    "binary": _binary_source,
+}
+
+
+def _message_row(key: str, guild: str, archived: bool, m: dict, originals: "OrderedDict[int, Tuple[str, str]]") -> dict:
+    author = m.get("author")
+    content = m.get("content") or ""
+    ref = m.get("ref")
+    if ref is not None and not content:
+        # Expand a duplicate reference the way `ChannelHistory` does on load
+        orig = originals.get(int(ref))
+        if orig is not None and orig[1] == (author or ""):
+            content = orig[0]
+        else:
+            body = message_body(orig[0], orig[1] or None) if orig is not None else REPEATED_PLACEHOLDER
+            content = f"{author}: {body}" if author else body
+    elif m.get("role") == "user":
+        originals[int(m["seq"])] = (content, author or "")
+        if len(originals) > _REF_WINDOW:
+            originals.popitem(last=False)
+    row = {
+        "type": "message",
+        "guild": guild,
+        "channel": key,
+        "seq": m.get("seq"),
+        "ts": m.get("ts"),
+        "role": m.get("role", "user"),
+        "author": author,
+        "addressed": bool(m.get("addressed", False)),
+        "archived": archived,
+        "content": content,
+    }
+    row.update({k: v for k, v in m.items() if k not in row and k not in ("tok", "ref")})
+    return row
+
+
+def iter_rows(kind: str, path: Path, flt: Optional[ExportFilter] = None, *, history_max: int = DEFAULT_HISTORY_MAX) -> Iterator[dict]:
+    """Yield export rows for the store at `path` (backend `kind`), streaming channel by channel."""
+    flt = flt or ExportFilter()
+    source = SOURCES.get(kind)
+    if source is None:
+        raise ValueError(f"unknown store backend {kind!r}")
+    for event, payload in source(path, max(1, int(history_max))):
+        if event == "channel":
+            key, doc, msgs = payload  # type: ignore[misc]
+            guild = str(doc.get("guild") or "")
+            if not flt.channel_ok(key, guild):
+                continue
+            if "channels" in flt.kinds:
+                summary = doc.get("summary") or {}
+                yield {
+                    "type": "channel",
+                    "guild": guild,
+                    "channel": key,
+                    "turns": int(doc.get("turns", 0) or 0),
+                    "summary": summary.get("text", "") if isinstance(summary, dict) else "",
+                }
+            if "messages" in flt.kinds:
+                originals: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+                for archived, m in msgs:
+                    row = _message_row(key, guild, archived, m, originals)
+                    if flt.ts_ok(row["ts"]):
+                        yield row
+            continue
+        raw = payload if isinstance(payload, dict) else {}
+        if "guilds" in flt.kinds:
+            for gid, settings in (raw.get("guild_settings") or {}).items():
+                if not flt.guilds or str(gid) in flt.guilds:
+                    yield {"type": "guild", "guild": str(gid), "settings": settings}
+        if "billing" in flt.kinds:
+            if raw.get("billing"):
+                yield dict(raw["billing"], type="billing", bot="")
+            for bot_id, b in (raw.get("billing_by_bot") or {}).items():
+                yield dict(b, type="billing", bot=str(bot_id))
+
+
+def export_store(
+    kind: str,
+    path: Path,
+    out: IO[str],
+    *,
+    fmt: str = "jsonl",
+    flt: Optional[ExportFilter] = None,
+    history_max: int = DEFAULT_HISTORY_MAX,
+) -> Dict[str, int]:
+    """Write rows as JSONL or CSV to `out`; return row counts per type.
+
+    CSV uses the fixed `CSV_FIELDS` columns; type-specific fields go to `data` as JSON.
+    """
+    counts: Dict[str, int] = {}
+    rows: Iterable[dict] = iter_rows(kind, path, flt, history_max=history_max)
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            flat = {k: row.get(k) for k in CSV_FIELDS if k != "data"}
+            extra = {k: v for k, v in row.items() if k not in CSV_FIELDS}
+            flat["data"] = json.dumps(extra, ensure_ascii=False) if extra else ""
+            writer.writerow(flat)
+            counts[row["type"]] = counts.get(row["type"], 0) + 1
+    else:
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            counts[row["type"]] = counts.get(row["type"], 0) + 1
+    return counts
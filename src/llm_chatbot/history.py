@@ -0,0 +1,414 @@
+"""Bounded per-channel message history.
+
+`ChannelHistory` is a ring buffer of compact `MessageRecord` objects with a
+configurable retention cap. It maintains a secondary index of the entries
+that matter when non-addressed chatter is excluded (assistant replies and
+user messages addressed to the bot), so context selection costs O(n) in the
+number of messages requested rather than in the size of the history.
+
+Records behave like the plain dicts used previously (`m["role"]`,
+`m.get("addressed")`) so prompt builders and tests keep working unchanged.
+Each record carries a token estimate computed once on append and persisted
+as `tok`, so context can be packed against a token budget cheaply.
+
+With near-duplicate suppression enabled (see `dedup.py`), a user message that
+repeats a retained original is persisted as `{"ref": <seq>}` without its text;
+the text is rebuilt from the original on load. When an original leaves the
+ring, its duplicates are released back to full records.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Union
+
+from .dedup import NearDuplicateDetector, message_body
+from .retrieval import BM25Index
+
+DEFAULT_HISTORY_MAX = 200
+
+_FIELDS = ("role", "content", "author", "addressed", "ts", "ref")
+
+# Rough per-record overhead (slotted object, small ints/floats, deque slot)
+_RECORD_OVERHEAD = 120
+
+# Per-message framing tokens added by the APIs (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Text used when a duplicate's original is no longer available
+REPEATED_PLACEHOLDER = "[repeated message]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _intern(s: Any) -> Optional[str]:
+    if s is None:
+        return None
+    return sys.intern(str(s))
+
+
+class MessageRecord:
+    """One stored chat message (slotted; role and author strings are interned)."""
+
+    __slots__ = ("seq", "role", "content", "author", "addressed", "ts", "extra", "tokens", "ref")
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        *,
+        author: Optional[str] = None,
+        addressed: bool = False,
+        ts: Optional[float] = None,
+        seq: int = 0,
+        extra: Optional[dict] = None,
+        tokens: Optional[int] = None,
+        ref: Optional[int] = None,
+    ) -> None:
+        self.seq = seq
+        self.role = _intern(role or "user")
+        self.content = content if isinstance(content, str) else str(content)
+        self.author = _intern(author)
+        self.addressed = bool(addressed)
+        self.ts = ts
+        self.extra = extra or None
+        self.tokens = int(tokens) if tokens is not None else estimate_tokens(self.content)
+        self.ref = int(ref) if ref is not None else None
+
+    @classmethod
+    def from_dict(cls, d: dict, seq: int = 0) -> "MessageRecord":
+        extra = {k: v for k, v in d.items() if k not in _FIELDS and k not in ("seq", "tok")}
+        return cls(
+            d.get("role", "user"),
+            d.get("content", ""),
+            author=d.get("author"),
+            addressed=bool(d.get("addressed", False)),
+            ts=d.get("ts"),
+            seq=int(d.get("seq", seq)),
+            extra=extra,
+            tokens=d.get("tok"),
+            ref=d.get("ref"),
+        )
+
+    def to_dict(self, *, tokens: bool = True, compact: bool = True) -> dict:
+        """Return the persisted dict form, omitting default-valued fields.
+
+        Duplicates are written as a `ref` without content unless `compact` is False.
+        """
+        if self.ref is not None and compact:
+            d: dict = {"role": self.role, "ref": self.ref}
+        else:
+            d = {"role": self.role, "content": self.content}
+        if tokens:
+            d["tok"] = self.tokens
+        if self.author is not None:
+            d["author"] = self.author
+        if self.addressed:
+            d["addressed"] = True
+        if self.ts is not None:
+            d["ts"] = self.ts
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    # Mapping-style access for compatibility with dict-based callers
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELDS:
+            v = getattr(self, key)
+            if key == "addressed":
+                return v if v else default
+            return default if v is None else v
+        if key == "seq":
+            return self.seq
+        if key == "tok":
+            return self.tokens
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        sentinel = object()
+        v = self.get(key, sentinel)
+        if v is sentinel:
+            raise KeyError(key)
+        return v
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(str(key), None) is not None
+
+    def __eq__(self, other: object) -> bool:
+        # Token estimates are derived data and do not affect equality
+        if isinstance(other, MessageRecord):
+            return self.to_dict(tokens=False) == other.to_dict(tokens=False)
+        if isinstance(other, dict):
+            return self.to_dict(tokens=False) == {k: v for k, v in other.items() if k != "tok"}
+        return NotImplemented
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size in bytes (content plus fixed overhead)."""
+        return _RECORD_OVERHEAD + len(self.content)
+
+    def __repr__(self) -> str:
+        return f"MessageRecord(seq={self.seq}, role={self.role!r}, content={self.content[:40]!r})"
+
+
+def _with_author(body: str, author: Optional[str]) -> str:
+    return f"{author}: {body}" if author else body
+
+
+def _link(rec: MessageRecord, orig: MessageRecord) -> None:
+    """Point `rec` at `orig`, sharing its text (re-attributed when the author differs)."""
+    rec.ref = orig.seq
+    if orig.author == rec.author:
+        rec.content = orig.content
+    else:
+        rec.content = _with_author(message_body(orig.content, orig.author), rec.author)
+
+
+def _is_indexed(rec: MessageRecord) -> bool:
+    return rec.role == "assistant" or (rec.role == "user" and rec.addressed)
+
+
+class ChannelHistory:
+    """Ring buffer of `MessageRecord` with an addressed/assistant index."""
+
+    def __init__(
+        self,
+        messages: Optional[Iterable[Union[dict, MessageRecord]]] = None,
+        *,
+        maxlen: int = DEFAULT_HISTORY_MAX,
+        first_seq: int = 0,
+        dedup_threshold: Optional[float] = None,
+    ) -> None:
+        self.maxlen = max(1, int(maxlen))
+        self._buf: Deque[MessageRecord] = deque(maxlen=self.maxlen)
+        self._index: Deque[MessageRecord] = deque(maxlen=self.maxlen)
+        self.next_seq = int(first_seq or 0)
+        self.nbytes = 0  # approximate resident size, maintained incrementally
+        self._search: Optional[BM25Index] = None  # built on first `search()`
+        # Near-duplicate suppression (None = disabled); the detector is built on first use
+        self.dedup_threshold = dedup_threshold
+        self._dedup: Optional[NearDuplicateDetector] = None
+        self._refs: Dict[int, List[MessageRecord]] = {}  # original seq -> retained duplicates
+        self._released: List[MessageRecord] = []
+        for m in messages or ():
+            self._push(self._coerce(m))
+
+    def _coerce(self, m: Union[dict, MessageRecord]) -> MessageRecord:
+        if isinstance(m, MessageRecord):
+            rec = m
+        else:
+            rec = MessageRecord.from_dict(m, seq=self.next_seq)
+        if rec.seq < self.next_seq:
+            rec.seq = self.next_seq
+        if rec.ref is not None and not rec.content:
+            orig = self._by_seq(rec.ref)
+            if orig is None:
+                rec.ref = None
+                rec.content = _with_author(REPEATED_PLACEHOLDER, rec.author)
+            else:
+                _link(rec, orig)
+            if not rec.tokens:
+                rec.tokens = estimate_tokens(rec.content)
+        return rec
+
+    def _find_duplicate(self, rec: MessageRecord) -> Optional[MessageRecord]:
+        if self._dedup is None:
+            self._dedup = NearDuplicateDetector(threshold=float(self.dedup_threshold or 0.85))
+            for r in self._buf:
+                if r.role == "user" and r.ref is None:
+                    self._dedup.add(r.seq, message_body(r.content, r.author))
+        body = message_body(rec.content, rec.author)
+        seq = self._dedup.find(body)
+        orig = self._by_seq(seq) if seq is not None and seq >= self.first_seq else None
+        if orig is None or orig.ref is not None:
+            self._dedup.add(rec.seq, body)
+            return None
+        return orig
+
+    def append(self, m: Union[dict, MessageRecord]) -> Optional[MessageRecord]:
+        """Append a message; return the record evicted from the ring, if any.
+
+        With dedup enabled, a user message repeating a retained original is
+        linked to it through `ref` and takes the original's text.
+        """
+        rec = self._coerce(m)
+        if self.dedup_threshold is not None and rec.role == "user" and rec.ref is None:
+            orig = self._find_duplicate(rec)
+            if orig is not None:
+                _link(rec, orig)
+                rec.tokens = estimate_tokens(rec.content)
+        return self._push(rec)
+
+    def _push(self, rec: MessageRecord) -> Optional[MessageRecord]:
+        self.next_seq = rec.seq + 1
+        evicted = self._buf[0] if len(self._buf) == self.maxlen else None
+        if evicted is not None:
+            self.nbytes -= evicted.nbytes
+            if self._search is not None:
+                self._search.remove(evicted.seq, evicted.content)
+            if evicted.ref is not None:
+                deps = self._refs.get(evicted.ref)
+                if deps is not None and evicted in deps:
+                    deps.remove(evicted)
+            # Duplicates of an evicted original become full records again
+            for dep in self._refs.pop(evicted.seq, ()):
+                dep.ref = None
+                self._released.append(dep)
+        self.nbytes += rec.nbytes
+        self._buf.append(rec)
+        if rec.ref is not None:
+            self._refs.setdefault(rec.ref, []).append(rec)
+        if self._search is not None:
+            self._search.add(rec.seq, rec.content)
+        if _is_indexed(rec):
+            self._index.append(rec)
+        return evicted
+
+    def take_released(self) -> List[MessageRecord]:
+        """Return (and forget) duplicates whose original was evicted since the last call."""
+        out, self._released = self._released, []
+        return out
+
+    def extend(self, items: Iterable[Union[dict, MessageRecord]]) -> List[MessageRecord]:
+        evicted = []
+        for m in items:
+            e = self.append(m)
+            if e is not None:
+                evicted.append(e)
+        return evicted
+
+    @property
+    def last(self) -> Optional[MessageRecord]:
+        return self._buf[-1] if self._buf else None
+
+    @property
+    def first_seq(self) -> int:
+        return self._buf[0].seq if self._buf else self.next_seq
+
+    def tail(self, n: int) -> List[MessageRecord]:
+        """Return the last `n` records in chronological order (O(n))."""
+        if n <= 0:
+            return []
+        out = list(islice(reversed(self._buf), n))
+        out.reverse()
+        return out
+
+    def tail_addressed(self, n: int) -> List[MessageRecord]:
+        """Return the last `n` assistant or addressed-user records (O(n))."""
+        if n <= 0:
+            return []
+        floor = self.first_seq
+        out = []
+        for rec in reversed(self._index):
+            if rec.seq < floor:
+                break
+            out.append(rec)
+            if len(out) >= n:
+                break
+        out.reverse()
+        return out
+
+    def select(self, n: int, *, include_non_addressed: bool = True, token_budget: Optional[int] = None) -> List[MessageRecord]:
+        """Context selection used by the runtime: recent tail, optionally addressed-only.
+
+        With `token_budget`, records are packed newest-first until the next one
+        would exceed the budget (the newest record is always included).
+        """
+        if token_budget is None:
+            return self.tail(n) if include_non_addressed else self.tail_addressed(n)
+        source = reversed(self._buf) if include_non_addressed else reversed(self._index)
+        floor = self.first_seq
+        out: List[MessageRecord] = []
+        used = 0
+        for rec in source:
+            if len(out) >= n or rec.seq < floor:
+                break
+            cost = rec.tokens + MESSAGE_OVERHEAD_TOKENS
+            if out and used + cost > token_budget:
+                break
+            out.append(rec)
+            used += cost
+        out.reverse()
+        return out
+
+    def _by_seq(self, seq: int) -> Optional[MessageRecord]:
+        i = seq - self.first_seq
+        if 0 <= i < len(self._buf) and self._buf[i].seq == seq:
+            return self._buf[i]
+        return next((r for r in self._buf if r.seq == seq), None)
+
+    def search(self, query: str, k: int, *, before_seq: Optional[int] = None, include_non_addressed: bool = True) -> List[MessageRecord]:
+        """Return up to `k` older records most relevant to `query` (BM25), in chronological order.
+
+        The index is built on first use and then maintained on append and
+        eviction, so it covers exactly the retained history.
+        """
+        if k <= 0 or not self._buf:
+            return []
+        if self._search is None:
+            self._search = BM25Index()
+            for r in self._buf:
+                self._search.add(r.seq, r.content)
+        # Over-fetch when filtering out non-addressed chatter
+        want = k if include_non_addressed else k * 4
+        out = []
+        for seq, _score in self._search.search(query, want, exclude_from=before_seq):
+            rec = self._by_seq(seq)
+            if rec is None or not (include_non_addressed or _is_indexed(rec)):
+                continue
+            out.append(rec)
+            if len(out) >= k:
+                break
+        out.sort(key=lambda r: r.seq)
+        return out
+
+    def tokens(self, records: Optional[Iterable[MessageRecord]] = None) -> int:
+        """Estimated prompt tokens for `records` (default: the whole history)."""
+        return sum(r.tokens + MESSAGE_OVERHEAD_TOKENS for r in (self._buf if records is None else records))
+
+    def to_list(self) -> List[dict]:
+        return [r.to_dict() for r in self._buf]
+
+    def clear(self) -> None:
+        self._buf.clear()
+        self._index.clear()
+        self.nbytes = 0
+        self._search = None
+        self._dedup = None
+        self._refs.clear()
+        self._released.clear()
+
+    # List-style compatibility
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def __bool__(self) -> bool:
+        return bool(self._buf)
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        return iter(self._buf)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Any:
+        if isinstance(idx, slice):
+            start, stop, step = idx.start, idx.stop, idx.step
+            if stop is None and step is None and isinstance(start, int) and start < 0:
+                return self.tail(-start)
+            return list(self._buf)[idx]
+        return self._buf[idx]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ChannelHistory):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return len(other) == len(self._buf) and all(a == b for a, b in zip(self._buf, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ChannelHistory(len={len(self._buf)}, maxlen={self.maxlen}, next_seq={self.next_seq})"
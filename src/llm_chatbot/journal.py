@@ -0,0 +1,236 @@
+"""Append-only mutation journal for `MemoryStore` (write-ahead mode).
+
+Each mutation is one small JSON line appended to `<store>.journal` instead of a
+full rewrite of the store file. A compactor periodically seals the active
+journal and folds it into the JSON snapshot off the event loop; startup loads
+the snapshot and replays sealed plus active journal records on top.
+
+Records operate on the raw snapshot layout so that the same `apply_record`
+function serves both startup replay and background compaction.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .config import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Rate-window timestamps older than this are dropped when folding (longest
+# persona windows are minutes; a day is a generous margin).
+RATE_EVENT_RETENTION_SECONDS = 86400
+
+
+def journal_path_for(store_path: Path) -> Path:
+    """Return the active journal path next to the store snapshot."""
+    return store_path.with_suffix(".journal")
+
+
+def sealed_path_for(store_path: Path) -> Path:
+    """Return the sealed (being compacted) journal path next to the snapshot."""
+    return store_path.with_suffix(".journal.sealed")
+
+
+def _new_billing() -> dict:
+    return {"daily_usd": 0.0, "daily_key": "", "monthly_usd": 0.0, "monthly_key": "", "by_model": {}, "by_feature": {}}
+
+
+def apply_record(raw: dict, rec: dict) -> None:
+    """Apply one journal record to a raw snapshot dict in place."""
+    op = rec.get("op")
+    chats = raw.setdefault("chats", {})
+    if op == "msg":
+        ch = chats.setdefault(str(rec["ch"]), {"turns": 0, "messages": []})
+        msgs = ch.setdefault("messages", [])
+        # Skip a record replayed twice (e.g., re-queued by a promoted standby)
+        if rec.get("seq") is not None and int(rec["seq"]) < int(ch.get("first_seq", 0) or 0) + len(msgs):
+            return
+        msgs.append(rec["m"])
+    elif op == "trim":
+        ch = chats.get(str(rec["ch"]))
+        if ch is not None:
+            msgs = ch.get("messages", [])
+            keep = max(0, int(rec.get("keep", len(msgs))))
+            if len(msgs) > keep:
+                ch["first_seq"] = int(ch.get("first_seq", 0) or 0) + len(msgs) - keep
+                ch["messages"] = msgs[len(msgs) - keep :]
+    elif op == "unref":
+        ch = chats.get(str(rec["ch"]))
+        if ch is not None:
+            msgs = ch.get("messages", [])
+            i = int(rec["seq"]) - int(ch.get("first_seq", 0) or 0)
+            if 0 <= i < len(msgs):
+                msgs[i] = rec["m"]
+    elif op == "turns":
+        ch = chats.setdefault(str(rec["ch"]), {"turns": 0, "messages": []})
+        ch["turns"] = int(rec.get("n", 0))
+    elif op == "summary":
+        ch = chats.setdefault(str(rec["ch"]), {"turns": 0, "messages": []})
+        ch["summary"] = {"text": rec.get("text", ""), "upto": int(rec.get("upto", 0))}
+    elif op == "channel":
+        ch = chats.setdefault(str(rec["ch"]), {"turns": 0, "messages": []})
+        ch["guild"] = rec.get("g", "")
+    elif op == "reset":
+        chats.pop(str(rec["ch"]), None)
+    elif op == "reset_all":
+        chats.clear()
+    elif op == "guild":
+        raw.setdefault("guild_settings", {})[str(rec["g"])] = rec.get("s", {})
+    elif op == "cooldown":
+        gs = raw.setdefault("guild_settings", {}).setdefault(str(rec["g"]), {})
+        gs.setdefault("last_channel_ts", {})[str(rec["ch"])] = rec["ts"]
+        if rec.get("u") is not None:
+            gs.setdefault("last_user_ts", {})[str(rec["u"])] = rec["ts"]
+    elif op == "billing":
+        if rec.get("bot") is None:
+            raw["billing"] = rec.get("b", {})
+        else:
+            raw.setdefault("billing_by_bot", {})[str(rec["bot"])] = rec.get("b", {})
+    elif op == "cost":
+        if rec.get("bot") is None:
+            b = raw.setdefault("billing", _new_billing())
+        else:
+            b = raw.setdefault("billing_by_bot", {}).setdefault(str(rec["bot"]), _new_billing())
+        if b.get("daily_key") != rec.get("day"):
+            b["daily_key"] = rec.get("day")
+            b["daily_usd"] = 0.0
+        if b.get("monthly_key") != rec.get("month"):
+            b["monthly_key"] = rec.get("month")
+            b["monthly_usd"] = 0.0
+        usd = float(rec.get("usd", 0.0))
+        b["daily_usd"] = float(b.get("daily_usd", 0.0)) + usd
+        b["monthly_usd"] = float(b.get("monthly_usd", 0.0)) + usd
+        bm = b.setdefault("by_model", {})
+        bm[rec.get("model", "")] = bm.get(rec.get("model", ""), 0.0) + usd
+        bf = b.setdefault("by_feature", {})
+        bf[rec.get("feature", "")] = bf.get(rec.get("feature", ""), 0.0) + usd
+    elif op == "rate":
+        windows = raw.setdefault("rate_windows_by_bot", {}).setdefault(str(rec["bot"]), {})
+        windows.setdefault(rec["dim"], {}).setdefault(str(rec["key"]), []).append(rec["ts"])
+    else:
+        logger.debug("journal: unknown op=%r ignored", op)
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Yield records from a journal file, stopping at a torn trailing line."""
+    try:
+        fh = path.open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with fh:
+        for line in fh:
+            if not line.endswith("\n"):
+                logger.warning("journal: ignoring torn record at end of %s", path)
+                return
+            try:
+                yield json.loads(line)
+            except Exception:
+                logger.warning("journal: ignoring corrupt record in %s", path)
+
+
+def _prune_rate_windows(raw: dict, now_ts: float) -> None:
+    cutoff = now_ts - RATE_EVENT_RETENTION_SECONDS
+    for windows in (raw.get("rate_windows_by_bot") or {}).values():
+        for dim in list(windows.keys()):
+            keys = windows[dim]
+            for key in list(keys.keys()):
+                kept = [t for t in keys[key] if t >= cutoff]
+                if kept:
+                    keys[key] = kept
+                else:
+                    del keys[key]
+
+
+def load_with_journal(store_path: Path) -> dict:
+    """Return the snapshot at `store_path` with sealed and active journals replayed."""
+    raw = read_json(store_path)
+    if not isinstance(raw, dict):
+        raw = {}
+    for p in (sealed_path_for(store_path), journal_path_for(store_path)):
+        for rec in read_records(p):
+            apply_record(raw, rec)
+    return raw
+
+
+def fold_journal(store_path: Path, now_ts: float) -> int:
+    """Fold the sealed journal into the snapshot; return the number of records folded.
+
+    Runs without touching live store state so it is safe in a worker thread.
+    """
+    sealed = sealed_path_for(store_path)
+    if not sealed.exists():
+        return 0
+    raw = read_json(store_path)
+    if not isinstance(raw, dict):
+        raw = {}
+    n = 0
+    for rec in read_records(sealed):
+        apply_record(raw, rec)
+        n += 1
+    _prune_rate_windows(raw, now_ts)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    write_json(store_path, raw)
+    sealed.unlink()
+    return n
+
+
+class Journal:
+    """Line-oriented append-only writer for store mutations."""
+
+    def __init__(self, store_path: Path, *, fsync: bool = False) -> None:
+        self.store_path = store_path
+        self.path = journal_path_for(store_path)
+        self.fsync = fsync
+        self.records = 0
+        self._fh: Optional[object] = None
+        self._pending: List[str] = []
+
+    def _open(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.path.open("a", encoding="utf-8")
+        return self._fh
+
+    def append(self, rec: dict) -> None:
+        """Buffer one record; it reaches disk on the next `flush()`."""
+        self._pending.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.records += 1
+
+    def flush(self, fsync: Optional[bool] = None) -> None:
+        """Write buffered records to the active journal file."""
+        if not self._pending:
+            return
+        fh = self._open()
+        fh.write("".join(self._pending))  # type: ignore[attr-defined]
+        self._pending.clear()
+        fh.flush()  # type: ignore[attr-defined]
+        if self.fsync if fsync is None else fsync:
+            os.fsync(fh.fileno())  # type: ignore[attr-defined]
+
+    def seal(self) -> bool:
+        """Rotate the active journal into the sealed slot for compaction.
+
+        Returns False when a previous sealed journal has not been folded yet or
+        there is nothing to seal.
+        """
+        self.flush()
+        sealed = sealed_path_for(self.store_path)
+        if sealed.exists() or not self.path.exists():
+            return False
+        self.close()
+        self.path.replace(sealed)
+        self.records = 0
+        return True
+
+    def close(self) -> None:
+        self.flush()
+        if self._fh is not None:
+            try:
+                self._fh.close()  # type: ignore[attr-defined]
+            finally:
+                self._fh = None
@@ -0,0 +1,187 @@
+"""Judge strategy layer for listen interventions.
+
+A borderline verdict from the cheap judge (`band <= conf < threshold`) is
+escalated to a stronger model. Run one after the other, an escalated
+decision costs two round trips. `JudgeRunner` tracks how often each channel
+escalates and, when escalation is likely, starts the escalation judge
+alongside the cheap one; the escalation call is cancelled as soon as the
+cheap verdict is decisive. The chosen strategy and decision latency are
+recorded per persona in `JudgeStats`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+Verdict = Tuple[bool, str, float]
+JudgeFn = Callable[[str, List[dict]], Awaitable[Verdict]]
+
+STRATEGIES = ("single", "sequential", "concurrent")
+
+
+@dataclass
+class JudgeDecision:
+    """Outcome of one judge decision."""
+
+    accepted: bool
+    intent: str
+    confidence: float
+    strategy: str  # single | sequential | concurrent
+    model: str  # model whose verdict was used
+    latency_ms: float
+    escalated: bool = False
+
+
+class JudgeStats:
+    """Per-persona strategy counts, decision latency and escalation history."""
+
+    def __init__(self, window: int = 200, alpha: float = 0.2) -> None:
+        self.window = int(window)
+        self.alpha = float(alpha)
+        self.counts: Dict[str, int] = {s: 0 for s in STRATEGIES}
+        self.latency_ms: Dict[str, Deque[float]] = {s: deque(maxlen=self.window) for s in STRATEGIES}
+        self.escalations = 0
+        self.wasted = 0  # concurrent escalation calls cancelled or unused
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._channel_rate: Dict[int, float] = {}
+
+    def record(self, decision: JudgeDecision) -> None:
+        self.counts[decision.strategy] = self.counts.get(decision.strategy, 0) + 1
+        self.latency_ms.setdefault(decision.strategy, deque(maxlen=self.window)).append(decision.latency_ms)
+        if decision.escalated:
+            self.escalations += 1
+
+    def observe(self, channel_id: Optional[int], needed_escalation: bool) -> None:
+        """Record whether the cheap verdict (in `channel_id`) was borderline."""
+        self._outcomes.append(needed_escalation)
+        if channel_id is None:
+            return
+        x = 1.0 if needed_escalation else 0.0
+        prev = self._channel_rate.get(channel_id)
+        self._channel_rate[channel_id] = x if prev is None else prev + self.alpha * (x - prev)
+
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    def escalation_rate(self, channel_id: Optional[int] = None) -> float:
+        """Smoothed escalation rate for a channel, else the persona-wide rate."""
+        if channel_id is not None and channel_id in self._channel_rate:
+            return self._channel_rate[channel_id]
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def quantile(self, strategy: str, q: float) -> Optional[float]:
+        xs = self.latency_ms.get(strategy)
+        if not xs:
+            return None
+        ordered = sorted(xs)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "strategies": {
+                s: {"n": self.counts.get(s, 0), "p50_ms": self.quantile(s, 0.5), "p90_ms": self.quantile(s, 0.9)} for s in STRATEGIES
+            },
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalation_rate(), 3),
+            "wasted": self.wasted,
+        }
+
+
+_STATS: Dict[str, JudgeStats] = {}
+
+
+def judge_stats(persona: str) -> JudgeStats:
+    """Return the process-wide `JudgeStats` for `persona`."""
+    return _STATS.setdefault(persona, JudgeStats())
+
+
+class JudgeRunner:
+    """Pick and run a judge strategy for one persona.
+
+    `judge(model, messages)` returns `(accepted, intent, confidence)` and must
+    not raise. `strategy` is `auto` (concurrent once the predicted escalation
+    rate reaches `concurrent_above` over at least `min_samples` decisions),
+    `sequential` or `concurrent`.
+    """
+
+    def __init__(
+        self,
+        persona: str,
+        judge: JudgeFn,
+        *,
+        model: str,
+        threshold: float,
+        escalate_model: Optional[str] = "gpt-5-mini",
+        band: float = 0.4,
+        strategy: str = "auto",
+        concurrent_above: float = 0.5,
+        min_samples: int = 10,
+        stats: Optional[JudgeStats] = None,
+    ) -> None:
+        self.persona = persona
+        self.judge = judge
+        self.model = model
+        self.threshold = float(threshold)
+        self.escalate_model = escalate_model
+        self.band = float(band)
+        self.strategy = strategy
+        self.concurrent_above = float(concurrent_above)
+        self.min_samples = int(min_samples)
+        self.stats = stats or judge_stats(persona)
+
+    def can_escalate(self) -> bool:
+        # Only a nano judge escalates (to a stronger model), as before
+        return bool(self.escalate_model) and self.escalate_model != self.model and "nano" in self.model
+
+    def borderline(self, verdict: Verdict) -> bool:
+        accepted, _intent, conf = verdict
+        return not accepted and self.band <= conf < self.threshold
+
+    def choose(self, channel_id: Optional[int] = None) -> str:
+        if not self.can_escalate():
+            return "single"
+        if self.strategy in ("sequential", "concurrent"):
+            return self.strategy
+        if self.stats.samples() < self.min_samples:
+            return "sequential"
+        return "concurrent" if self.stats.escalation_rate(channel_id) >= self.concurrent_above else "sequential"
+
+    async def decide(self, messages: List[dict], channel_id: Optional[int] = None) -> JudgeDecision:
+        strategy = self.choose(channel_id)
+        started = time.perf_counter()
+        escalation: Optional["asyncio.Future[Any]"] = None
+        escalated = False
+        if strategy == "concurrent":
+            escalation = asyncio.ensure_future(self.judge(self.escalate_model or self.model, messages))
+        try:
+            verdict = await self.judge(self.model, messages)
+            model, escalated = self.model, False
+            if strategy != "single":
+                needed = self.borderline(verdict)
+                self.stats.observe(channel_id, needed)
+                if needed:
+                    model, escalated = self.escalate_model or self.model, True
+                    verdict = await escalation if escalation is not None else await self.judge(model, messages)
+        finally:
+            if escalation is not None:
+                escalation.cancel()  # no-op once it has finished
+                if not escalated:
+                    self.stats.wasted += 1
+        accepted, intent, conf = verdict
+        decision = JudgeDecision(
+            accepted=accepted,
+            intent=intent,
+            confidence=conf,
+            strategy=strategy,
+            model=model,
+            latency_ms=round((time.perf_counter() - started) * 1000.0, 1),
+            escalated=escalated,
+        )
+        self.stats.record(decision)
+        return decision
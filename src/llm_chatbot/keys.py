@@ -0,0 +1,232 @@
+"""Pool of OpenAI API keys with per-key request and token budgets.
+
+A bot normally sends everything with `OPENAI_API_KEY`, so all its traffic
+shares one project's rate limits. With a pool configured (`OPENAI_API_KEYS`,
+typically project keys from different projects) each request attempt
+leases the least-loaded key: load is the larger of the key's requests and
+tokens over the last minute (in-flight calls included) relative to its RPM
+and TPM budgets. A key that answers 429 is drained, skipped until
+`Retry-After` or an exponentially growing drain period has passed, so the
+retry goes out on another key. Cost accounting is unchanged: usage is still
+billed to the bot, whichever key served the call.
+
+The lease of the current attempt is held in a context variable; the shared
+client lookup (`clients.get_async_client`) swaps the bot's key for it, so
+call sites keep passing `cfg.openai_api_key`.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KeySpec:
+    """One API key and its budgets (0: no budget of that kind)."""
+
+    api_key: str
+    tpm: int = 0  # tokens per minute
+    rpm: int = 0  # requests per minute
+
+
+@dataclass
+class KeyPoolConfig:
+    """Keys and drain policy; an empty key list disables the pool."""
+
+    keys: List[KeySpec] = field(default_factory=list)
+    drain_seconds: float = 30.0  # first drain after a 429 without Retry-After
+    max_drain: float = 600.0  # also used for exhausted quota
+    window: float = 60.0  # seconds of history budgets are measured over
+
+
+def mask(api_key: str) -> str:
+    """Printable key label: never more than the last four characters."""
+    return f"…{api_key[-4:]}" if len(api_key) > 8 else "…"
+
+
+class _KeyState:
+    def __init__(self, spec: KeySpec, name: str) -> None:
+        self.spec = spec
+        self.name = name
+        self.events: Deque[Tuple[float, int]] = deque()  # (started, tokens) per request in the window
+        self.in_flight = 0
+        self.avg_tokens = 0.0  # tokens per request (EMA), charged to in-flight calls
+        self.drained_until = 0.0
+        self.drains = 0  # consecutive drains, for the backoff
+        self.requests = 0
+        self.tokens = 0
+        self.throttled = 0
+
+    def prune(self, now: float, window: float) -> None:
+        while self.events and now - self.events[0][0] > window:
+            self.events.popleft()
+
+    def usage(self) -> Tuple[int, int]:
+        """(requests, tokens) in the window, in-flight calls included."""
+        reqs = len(self.events) + self.in_flight
+        toks = sum(t for _s, t in self.events) + int(self.in_flight * self.avg_tokens)
+        return reqs, toks
+
+    def load(self) -> float:
+        reqs, toks = self.usage()
+        fractions = [0.0]
+        if self.spec.rpm > 0:
+            fractions.append(reqs / self.spec.rpm)
+        if self.spec.tpm > 0:
+            fractions.append(toks / self.spec.tpm)
+        return max(fractions)
+
+
+class KeyLease:
+    """One attempt's use of a pool key; `tokens` is filled in by `note_usage`."""
+
+    __slots__ = ("state", "started", "tokens")
+
+    def __init__(self, state: _KeyState, started: float) -> None:
+        self.state = state
+        self.started = started
+        self.tokens = 0
+
+    @property
+    def api_key(self) -> str:
+        return self.state.spec.api_key
+
+    @property
+    def name(self) -> str:
+        return self.state.name
+
+
+class KeyPool:
+    """Thread-safe least-loaded key selection with 429 draining."""
+
+    def __init__(self, config: Optional[KeyPoolConfig] = None, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys: List[_KeyState] = []
+        self.configure(config or KeyPoolConfig())
+
+    def configure(self, config: KeyPoolConfig) -> None:
+        with self._lock:
+            self.config = config
+            self._keys = [_KeyState(s, f"key{i + 1} {mask(s.api_key)}") for i, s in enumerate(config.keys) if s.api_key]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._keys)
+
+    def api_keys(self) -> List[str]:
+        return [k.spec.api_key for k in self._keys]
+
+    def available(self) -> int:
+        """Keys not currently drained."""
+        now = self._clock()
+        return sum(1 for k in self._keys if k.drained_until <= now)
+
+    def acquire(self) -> Optional[KeyLease]:
+        """Lease the least-loaded key, or None when the pool is disabled.
+
+        Drained keys are skipped; if every key is drained the one that
+        recovers first is used rather than failing without a request.
+        """
+        if not self._keys:
+            return None
+        now = self._clock()
+        with self._lock:
+            for k in self._keys:
+                k.prune(now, self.config.window)
+            ready = [k for k in self._keys if k.drained_until <= now]
+            if ready:
+                best = min(ready, key=lambda k: (k.load(), k.in_flight, len(k.events)))
+            else:
+                best = min(self._keys, key=lambda k: k.drained_until)
+            best.in_flight += 1
+            best.requests += 1
+            return KeyLease(best, now)
+
+    def release(self, lease: KeyLease, *, throttled: bool = False, quota: bool = False, retry_in: Optional[float] = None) -> None:
+        """End a lease; a throttled (429) attempt drains its key."""
+        k, c = lease.state, self.config
+        with self._lock:
+            k.in_flight = max(0, k.in_flight - 1)
+            k.events.append((lease.started, lease.tokens))
+            k.tokens += lease.tokens
+            if lease.tokens:
+                k.avg_tokens = lease.tokens if not k.avg_tokens else 0.8 * k.avg_tokens + 0.2 * lease.tokens
+            if not throttled:
+                k.drains = 0
+                return
+            k.throttled += 1
+            if quota:
+                drain = c.max_drain
+            else:
+                drain = min(c.max_drain, max(retry_in or 0.0, c.drain_seconds * (2**k.drains)))
+            k.drains += 1
+            k.drained_until = max(k.drained_until, self._clock() + drain)
+        logger.warning("openai-keys: drained %s for %.0fs (%s)", k.name, drain, "quota exhausted" if quota else "rate limited")
+
+    def snapshot(self) -> List[dict]:
+        now = self._clock()
+        out = []
+        with self._lock:
+            for k in self._keys:
+                k.prune(now, self.config.window)
+                reqs, toks = k.usage()
+                out.append(
+                    {
+                        "name": k.name,
+                        "load": round(k.load(), 2),
+                        "rpm": reqs,
+                        "rpm_budget": k.spec.rpm,
+                        "tpm": toks,
+                        "tpm_budget": k.spec.tpm,
+                        "in_flight": k.in_flight,
+                        "requests": k.requests,
+                        "tokens": k.tokens,
+                        "throttled": k.throttled,
+                        "drained_s": round(max(0.0, k.drained_until - now), 1),
+                    }
+                )
+        return out
+
+
+KEYS = KeyPool()
+
+
+def configure_keys(config: KeyPoolConfig) -> None:
+    """Apply the key list and drain policy to the process-wide pool."""
+    KEYS.configure(config)
+
+
+_LEASE: contextvars.ContextVar[Optional[KeyLease]] = contextvars.ContextVar("llm_chatbot_key_lease", default=None)
+
+
+@contextmanager
+def key_scope(lease: Optional[KeyLease]) -> Iterator[Optional[KeyLease]]:
+    """Make `lease` the current attempt's key for the block."""
+    token = _LEASE.set(lease)
+    try:
+        yield lease
+    finally:
+        _LEASE.reset(token)
+
+
+def current_key(api_key: str) -> str:
+    """The leased key for the current attempt, else `api_key`."""
+    lease = _LEASE.get()
+    return lease.api_key if lease is not None else api_key
+
+
+def note_usage(usage: Tuple[int, ...]) -> None:
+    """Charge an (input, output, ...) usage tuple to the current lease's key."""
+    lease = _LEASE.get()
+    if lease is not None and usage:
+        lease.tokens += int(usage[0]) + int(usage[1] if len(usage) > 1 else 0)
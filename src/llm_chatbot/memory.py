@@ -1,118 +1,397 @@
-"""In-memory state with JSON persistence for channels, guilds, and billing."""
+"""In-memory state with pluggable persistence for channels, guilds, and billing."""
 
 from __future__ import annotations
 
+import copy
+import json
+import logging
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
-from .config import read_json, write_json
-from .costs import Billing
+from .context_cache import ContextCache
+from .costs import Billing, rollover_if_needed
+from .history import DEFAULT_HISTORY_MAX, ChannelHistory
+from .listener import mark_intervened
+from .storage import JsonBackend, StorageBackend, WriteBatch, _message_row, write_batch
 
-Message = dict  # {"role": "user"|"assistant"|"system", "content": str}
+logger = logging.getLogger(__name__)
+
+Message = dict  # {"role": "user"|"assistant"|"system", "content": str, "author"?: str, "addressed"?: bool, "ts"?: float}
 
 
 @dataclass
 class ChannelContext:
-    """Conversation state for a specific Discord channel."""
+    """Conversation state for a specific Discord channel.
+
+    `messages` is a bounded `ChannelHistory`; plain lists are accepted and
+    converted for convenience. `summary` condenses every message with
+    `seq < summary_upto` (see `summarizer.py`). `guild` is the owning guild ID
+    ("" for DMs or channels not seen since it was introduced). The
+    `response_*` fields hold the server-side reply chain (see `chain.py`);
+    they are not persisted, so a restart resends the full context once.
+    """
 
     turns: int = 0
-    messages: List[Message] = field(default_factory=list)
+    messages: ChannelHistory = field(default_factory=ChannelHistory)
+    summary: str = ""
+    summary_upto: int = 0
+    guild: str = ""
+    response_id: str = ""
+    response_key: str = ""
+    response_seq: int = 0  # first message seq the chained response has not seen
+    response_turns: int = 0
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.messages, ChannelHistory):
+            self.messages = ChannelHistory(self.messages or [])
+
+
+def _context_meta(ctx: ChannelContext) -> dict:
+    """Small per-channel state persisted next to the history."""
+    meta: dict = {}
+    if ctx.summary:
+        meta["summary"] = {"text": ctx.summary, "upto": ctx.summary_upto}
+    if ctx.guild:
+        meta["guild"] = ctx.guild
+    return meta
+
+
+def _freeze_context(ctx: ChannelContext) -> tuple:
+    """Cheap immutable capture of a context: scalars plus references to its records.
+
+    Records are not modified once stored (a duplicate losing its `ref` keeps
+    its text), so the tuple can be turned into a document on another thread.
+    """
+    return ctx.turns, ctx.messages.first_seq, tuple(ctx.messages), _context_meta(ctx)
+
+
+def _frozen_to_doc(frozen: tuple) -> dict:
+    turns, first_seq, records, meta = frozen
+    doc = {"turns": turns, "first_seq": first_seq, "messages": [r.to_dict() for r in records]}
+    doc.update(meta)
+    return doc
+
+
+def _context_to_doc(ctx: ChannelContext) -> dict:
+    return _frozen_to_doc(_freeze_context(ctx))
+
+
+def _billing_from_dict(b: dict) -> Billing:
+    return Billing(
+        daily_usd=b.get("daily_usd", 0.0),
+        daily_key=b.get("daily_key", ""),
+        monthly_usd=b.get("monthly_usd", 0.0),
+        monthly_key=b.get("monthly_key", ""),
+        by_model=b.get("by_model", {}),
+        by_feature=b.get("by_feature", {}),
+        budget_daily_usd=b.get("budget_daily_usd"),
+        budget_monthly_usd=b.get("budget_monthly_usd"),
+        thresholds=tuple(b.get("thresholds", (0.5, 0.8, 1.0))),
+        hard_stop=bool(b.get("hard_stop", True)),
+        last_daily_alert=float(b.get("last_daily_alert", 0.0)),
+        last_monthly_alert=float(b.get("last_monthly_alert", 0.0)),
+    )
+
+
+def _billing_to_dict(b: Billing) -> dict:
+    return {
+        "daily_usd": b.daily_usd,
+        "daily_key": b.daily_key,
+        "monthly_usd": b.monthly_usd,
+        "monthly_key": b.monthly_key,
+        "by_model": dict(b.by_model),
+        "by_feature": dict(b.by_feature),
+        "budget_daily_usd": b.budget_daily_usd,
+        "budget_monthly_usd": b.budget_monthly_usd,
+        "thresholds": list(b.thresholds),
+        "hard_stop": b.hard_stop,
+        "last_daily_alert": b.last_daily_alert,
+        "last_monthly_alert": b.last_monthly_alert,
+    }
 
 
 class MemoryStore:
-    """Holds channel contexts, guild settings, and billing, persisted to JSON."""
+    """Holds channel contexts, guild settings, and billing, persisted via a backend.
+
+    Mutations made through the store methods (`append_message`,
+    `increment_turns`, `add_cost`, `mark_intervened`, rate-window events,
+    `touch_guild`/`touch_billing`) are recorded and handed to the storage
+    backend as one `WriteBatch` on `save()`. The default `JsonBackend` rewrites
+    the whole document (or, with `journal=True`, only appends the records);
+    `SqliteBackend` turns them into row-level upserts and loads channels lazily.
+
+    Channel contexts live in a `ContextCache`; with `max_resident`,
+    `max_resident_bytes` or `idle_ttl` set, idle contexts are compressed into
+    a cold tier and faulted back in on the next `get`.
+
+    Every recorded mutation gets a log sequence number (`lsn`) and is also
+    passed to `subscribe()`d listeners, which is how `replication.py` streams
+    changes to a warm standby. `initial` seeds the store from such a replica
+    instead of reading the backend's state.
+    """
 
-    def __init__(self, path: Path):
+    def __init__(
+        self,
+        path: Path,
+        *,
+        journal: bool = False,
+        journal_fsync: bool = False,
+        backend: Optional[StorageBackend] = None,
+        history_max: int = DEFAULT_HISTORY_MAX,
+        max_resident: int = 0,
+        max_resident_bytes: int = 0,
+        idle_ttl: float = 0.0,
+        cold_codec: str = "zlib",
+        dedup_threshold: Optional[float] = None,
+        initial: Optional[dict] = None,
+    ):
         self.path = path
-        self._data: Dict[str, ChannelContext] = {}
+        self.history_max = max(1, int(history_max))
+        self.dedup_threshold = dedup_threshold
+        self._backend: StorageBackend = backend or JsonBackend(path, journal=journal, journal_fsync=journal_fsync)
+        self._data = ContextCache(
+            _context_to_doc,
+            self._context_from_raw,
+            sizeof=lambda c: c.messages.nbytes,
+            max_channels=max_resident,
+            max_bytes=max_resident_bytes,
+            idle_ttl=idle_ttl,
+            codec=cold_codec,
+        )
         self._guild_settings: Dict[str, dict] = {}
         self._billing: Billing = Billing()
         self._billing_by_bot: Dict[str, Billing] = {}
         self._rate_windows_by_bot: Dict[str, Dict[str, Dict[str, list]]] = {}
-        self._load()
+        self._pending: List[dict] = []
+        # Records evicted from channel ring buffers, spilled to the archive tier on save
+        self._archived: Dict[str, List[dict]] = {}
+        self._reset_all_pending = False
+        # After reset_all on a lazy backend, never fault stale channels back in
+        self._backend_cleared = False
+        self._writer: Any = None
+        self._lsn = 0
+        self._listeners: List[Callable[[int, dict], None]] = []
+        self.replication: Any = None  # publisher or promoted replica, for status reporting
+        self._load(initial)
 
-    def _load(self) -> None:
-        raw = read_json(self.path)
+    def _load(self, initial: Optional[dict] = None) -> None:
+        if initial is not None:
+            if self._backend.lazy:
+                self._backend.load()  # lazy backends only read small eager state here
+            raw = initial
+        else:
+            raw = self._backend.load()
         chats = raw.get("chats", {}) if isinstance(raw, dict) else raw
         for k, v in chats.items():
-            self._data[k] = ChannelContext(turns=v.get("turns", 0), messages=v.get("messages", []))
+            self._data[k] = self._context_from_raw(v)
         self._guild_settings = raw.get("guild_settings", {}) if isinstance(raw, dict) else {}
         b = raw.get("billing", {}) if isinstance(raw, dict) else {}
         if b:
-            self._billing = Billing(
-                daily_usd=b.get("daily_usd", 0.0),
-                daily_key=b.get("daily_key", ""),
-                monthly_usd=b.get("monthly_usd", 0.0),
-                monthly_key=b.get("monthly_key", ""),
-                by_model=b.get("by_model", {}),
-                by_feature=b.get("by_feature", {}),
-                budget_daily_usd=b.get("budget_daily_usd"),
-                budget_monthly_usd=b.get("budget_monthly_usd"),
-                thresholds=tuple(b.get("thresholds", (0.5, 0.8, 1.0))),
-                hard_stop=bool(b.get("hard_stop", True)),
-                last_daily_alert=float(b.get("last_daily_alert", 0.0)),
-                last_monthly_alert=float(b.get("last_monthly_alert", 0.0)),
-            )
+            self._billing = _billing_from_dict(b)
         bb = raw.get("billing_by_bot", {}) if isinstance(raw, dict) else {}
         if isinstance(bb, dict):
             for bot_id, vb in bb.items():
-                self._billing_by_bot[bot_id] = Billing(
-                    daily_usd=vb.get("daily_usd", 0.0),
-                    daily_key=vb.get("daily_key", ""),
-                    monthly_usd=vb.get("monthly_usd", 0.0),
-                    monthly_key=vb.get("monthly_key", ""),
-                    by_model=vb.get("by_model", {}),
-                    by_feature=vb.get("by_feature", {}),
-                    budget_daily_usd=vb.get("budget_daily_usd"),
-                    budget_monthly_usd=vb.get("budget_monthly_usd"),
-                    thresholds=tuple(vb.get("thresholds", (0.5, 0.8, 1.0))),
-                    hard_stop=bool(vb.get("hard_stop", True)),
-                    last_daily_alert=float(vb.get("last_daily_alert", 0.0)),
-                    last_monthly_alert=float(vb.get("last_monthly_alert", 0.0)),
-                )
+                self._billing_by_bot[bot_id] = _billing_from_dict(vb)
         self._rate_windows_by_bot = raw.get("rate_windows_by_bot", {}) if isinstance(raw, dict) else {}
 
-    def save(self) -> None:
-        """Persist the current state to disk atomically."""
-        raw = {
-            "chats": {k: {"turns": v.turns, "messages": v.messages} for k, v in self._data.items()},
-            "guild_settings": self._guild_settings,
-            "billing": {
-                "daily_usd": self._billing.daily_usd,
-                "daily_key": self._billing.daily_key,
-                "monthly_usd": self._billing.monthly_usd,
-                "monthly_key": self._billing.monthly_key,
-                "by_model": self._billing.by_model,
-                "by_feature": self._billing.by_feature,
-                "budget_daily_usd": self._billing.budget_daily_usd,
-                "budget_monthly_usd": self._billing.budget_monthly_usd,
-                "thresholds": list(self._billing.thresholds),
-                "hard_stop": self._billing.hard_stop,
-                "last_daily_alert": self._billing.last_daily_alert,
-                "last_monthly_alert": self._billing.last_monthly_alert,
-            },
-            "billing_by_bot": {
-                k: {
-                    "daily_usd": v.daily_usd,
-                    "daily_key": v.daily_key,
-                    "monthly_usd": v.monthly_usd,
-                    "monthly_key": v.monthly_key,
-                    "by_model": v.by_model,
-                    "by_feature": v.by_feature,
-                    "budget_daily_usd": v.budget_daily_usd,
-                    "budget_monthly_usd": v.budget_monthly_usd,
-                    "thresholds": list(v.thresholds),
-                    "hard_stop": v.hard_stop,
-                    "last_daily_alert": v.last_daily_alert,
-                    "last_monthly_alert": v.last_monthly_alert,
-                }
-                for k, v in self._billing_by_bot.items()
-            },
-            "rate_windows_by_bot": self._rate_windows_by_bot,
+    def _capture_snapshot(self) -> Callable[[], dict]:
+        """Capture a consistent snapshot on the loop; return the function that builds it.
+
+        Only record references, cold blobs and small copied settings are taken
+        here; message dicts, cold-tier decompression and encoding happen when
+        the returned builder runs (on the writer thread for write-behind saves).
+        """
+        hot, cold = self._data.capture(_freeze_context)
+        rest = {
+            "guild_settings": copy.deepcopy(self._guild_settings),
+            "billing": _billing_to_dict(self._billing),
+            "billing_by_bot": {k: _billing_to_dict(v) for k, v in self._billing_by_bot.items()},
+            "rate_windows_by_bot": copy.deepcopy(self._rate_windows_by_bot),
         }
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        write_json(self.path, raw)
+        cold_doc = self._data.cold_doc
+
+        def build() -> dict:
+            chats = {k: _frozen_to_doc(f) for k, f in hot.items()}
+            chats.update((k, cold_doc(blob)) for k, blob in cold.items())
+            return {"chats": chats, **rest}
+
+        return build
+
+    def _consistent_snapshot(self) -> dict:
+        return self._capture_snapshot()()
+
+    def _take_batch(self, *, fsync: bool = False) -> WriteBatch:
+        """Drain recorded mutations into a `WriteBatch` with serialized rows."""
+        records, self._pending = self._pending, []
+        batch = WriteBatch(records=records, reset_all=self._reset_all_pending, fsync=fsync)
+        batch.archived, self._archived = self._archived, {}
+        if self._backend.needs_snapshot:
+            batch.snapshot = self._capture_snapshot()
+        self._reset_all_pending = False
+        if self._listeners:
+            lsn = self._lsn
+            batch.on_written = lambda: self._emit({"op": "saved", "lsn": lsn})
+        for rec in records:
+            op = rec.get("op")
+            if op in ("msg", "unref"):
+                batch.messages.setdefault(rec["ch"], []).append(_message_row(rec["seq"], rec["m"]))
+                batch.channels.setdefault(rec["ch"], 0)
+            elif op in ("turns", "trim", "summary", "channel"):
+                batch.channels.setdefault(rec["ch"], 0)
+            elif op == "reset":
+                batch.deleted.append(rec["ch"])
+                batch.channels.pop(rec["ch"], None)
+                batch.messages.pop(rec["ch"], None)
+            elif op == "reset_all":
+                batch.deleted.clear()
+                batch.channels.clear()
+                batch.messages.clear()
+            elif op in ("guild", "cooldown"):
+                batch.guilds[rec["g"]] = ""
+            elif op in ("billing", "cost"):
+                batch.billing["" if rec.get("bot") is None else rec["bot"]] = ""
+            elif op == "rate":
+                batch.rate_events.append((rec["bot"], rec["dim"], rec["key"], rec["ts"]))
+        for key in list(batch.channels):
+            ctx = self._data.peek(key)
+            if ctx is None:
+                del batch.channels[key]
+                continue
+            batch.channels[key] = ctx.turns
+            meta = _context_meta(ctx)
+            batch.channel_meta[key] = json.dumps(meta, ensure_ascii=False) if meta else None
+            if self._backend.needs_channel_docs:
+                batch.channel_docs[key] = _context_to_doc(ctx)
+        for gid in batch.guilds:
+            batch.guilds[gid] = json.dumps(self._guild_settings.get(gid, {}), ensure_ascii=False)
+        for bot_key in batch.billing:
+            b = self._billing if bot_key == "" else self._billing_by_bot.get(bot_key, Billing())
+            batch.billing[bot_key] = json.dumps(_billing_to_dict(b), ensure_ascii=False)
+        if self._backend.needs_channel_docs and (batch.billing or batch.rate_events):
+            batch.meta = {
+                "billing": _billing_to_dict(self._billing),
+                "billing_by_bot": {k: _billing_to_dict(v) for k, v in self._billing_by_bot.items()},
+                "rate_windows_by_bot": copy.deepcopy(self._rate_windows_by_bot),
+            }
+        return batch
+
+    @property
+    def backend(self) -> StorageBackend:
+        return self._backend
+
+    # Context cache
+    @property
+    def cache(self) -> ContextCache:
+        return self._data
+
+    def sweep_cache(self) -> int:
+        """Move idle or over-budget channel contexts to the cold tier; return how many moved."""
+        return self._data.enforce()
+
+    def attach_writer(self, writer: Any) -> None:
+        """Route `mark_dirty()` through a write-behind scheduler."""
+        self._writer = writer
+
+    @property
+    def writer(self) -> Any:
+        return self._writer
+
+    def mark_dirty(self) -> None:
+        """Request a save; coalesced by the write-behind scheduler when attached.
+
+        Without a running scheduler this saves synchronously.
+        """
+        w = self._writer
+        if w is not None and w.running:
+            w.notify()
+        else:
+            self.save()
+
+    def save(self) -> None:
+        """Persist pending changes through the storage backend synchronously.
+
+        The JSON backend rewrites the document atomically (or, in journal
+        mode, only appends pending records); SQLite queues row upserts.
+        """
+        write_batch(self._backend, self._take_batch())
+
+    def flush(self) -> None:
+        """Save and wait until the backend has durably written everything."""
+        write_batch(self._backend, self._take_batch(fsync=True))
+        self._backend.flush()
+
+    def close(self) -> None:
+        """Stop the writer, flush pending changes, and release backend resources."""
+        if self._writer is not None:
+            self._writer.close()
+        self.flush()
+        self._backend.close()
+
+    # Journal (write-ahead mode of the JSON backend)
+    @property
+    def journaled(self) -> bool:
+        return getattr(self._backend, "journal", None) is not None
+
+    def _record(self, rec: dict) -> None:
+        self._lsn += 1
+        self._pending.append(rec)
+        if self._listeners:
+            self._emit(rec)
+
+    # Change stream (see `replication.py`)
+    @property
+    def lsn(self) -> int:
+        """Sequence number of the latest recorded mutation."""
+        return self._lsn
+
+    def subscribe(self, fn: Callable[[int, dict], None]) -> None:
+        """Call `fn(lsn, record)` for each recorded mutation, channel load, and completed write."""
+        self._listeners.append(fn)
+
+    def unsubscribe(self, fn: Callable[[int, dict], None]) -> None:
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _emit(self, rec: dict) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn(self._lsn, rec)
+            except Exception:
+                logger.exception("store: change listener failed")
+
+    def replication_snapshot(self) -> dict:
+        """Return the full state plus the `lsn` it reflects, for a standby to start from."""
+        return {"lsn": self._lsn, "cleared": self._backend_cleared, "raw": self._consistent_snapshot()}
+
+    def restore_unsaved(self, records: List[dict], archived: Dict[str, List[dict]], *, backend_cleared: bool = False) -> None:
+        """Queue mutations a failed primary had not yet written, so the next save persists them."""
+        self._pending = list(records) + self._pending
+        self._lsn += len(records)
+        for key, msgs in archived.items():
+            self._archived.setdefault(key, [])[:0] = msgs
+        if any(r.get("op") == "reset_all" for r in records):
+            self._reset_all_pending = True
+        self._backend_cleared = self._backend_cleared or backend_cleared
+
+    def journal_records(self) -> int:
+        """Return the number of journal records written since the last seal."""
+        fn = getattr(self._backend, "journal_records", None)
+        return int(fn()) if fn else 0
+
+    def seal_journal(self) -> bool:
+        """Rotate the active journal for compaction (call from the writer thread)."""
+        fn = getattr(self._backend, "seal_journal", None)
+        return bool(fn()) if fn else False
+
+    def fold_journal(self) -> int:
+        """Fold the sealed journal into the snapshot file (safe in a worker thread)."""
+        fn = getattr(self._backend, "fold_journal", None)
+        return int(fn()) if fn else 0
+
+    def compact_journal(self) -> int:
+        """Seal and fold the journal; run serialized with writes (writer thread)."""
+        return self.fold_journal() if self.seal_journal() else 0
 
     def billing_for(self, bot_id: str) -> Billing:
         key = str(bot_id)
@@ -134,29 +413,108 @@ class MemoryStore:
                 last_monthly_alert=base.last_monthly_alert,
             )
             self._billing_by_bot[key] = b
+            self._record({"op": "billing", "bot": key, "b": _billing_to_dict(b)})
         return b
 
     def rate_windows_for(self, bot_id: str) -> Dict[str, Dict[str, list]]:
         key = str(bot_id)
         return self._rate_windows_by_bot.setdefault(key, {})
 
+    def rate_event_hook(self, bot_id: str) -> Callable[[str, str, float], None]:
+        """Return a limiter callback that records accepted rate-window events."""
+        key = str(bot_id)
+
+        def _hook(dim: str, k: str, ts: float) -> None:
+            self._record({"op": "rate", "bot": key, "dim": dim, "key": str(k), "ts": ts})
+
+        return _hook
+
     def get(self, channel_id: int) -> ChannelContext:
-        """Return the channel context, creating a new one if needed."""
+        """Return the channel context, loading or creating it if needed."""
         key = str(channel_id)
-        if key not in self._data:
-            self._data[key] = ChannelContext()
-        return self._data[key]
+        ctx = self._data.get(key)
+        if ctx is None:
+            v = self._backend.load_channel(key, self.history_max) if (self._backend.lazy and not self._backend_cleared) else None
+            ctx = self._context_from_raw(v or {})
+            self._data[key] = ctx
+            if v and self._listeners:
+                # A standby only sees channels the primary has loaded
+                self._emit({"op": "load", "ch": key, "doc": _context_to_doc(ctx)})
+        return ctx
+
+    def _context_from_raw(self, v: dict) -> ChannelContext:
+        msgs = v.get("messages", []) or []
+        first_seq = int(v.get("first_seq", 0) or 0)
+        # Older stores may hold more than the retention cap: keep the tail only
+        if len(msgs) > self.history_max:
+            first_seq += len(msgs) - self.history_max
+            msgs = msgs[-self.history_max :]
+        summary = v.get("summary") or {}
+        return ChannelContext(
+            turns=v.get("turns", 0),
+            messages=ChannelHistory(msgs, maxlen=self.history_max, first_seq=first_seq, dedup_threshold=self.dedup_threshold),
+            summary=summary.get("text", "") or "",
+            summary_upto=int(summary.get("upto", 0) or 0),
+            guild=str(v.get("guild") or ""),
+        )
+
+    def append_message(self, channel_id: int, message: Message) -> None:
+        """Append a message to the channel history, spilling the oldest past the cap."""
+        key = str(channel_id)
+        ctx = self.get(channel_id)
+        evicted = ctx.messages.append(message)
+        rec = ctx.messages.last
+        self._record({"op": "msg", "ch": key, "seq": rec.seq, "m": rec.to_dict()})
+        if evicted is not None:
+            d = evicted.to_dict(compact=False)
+            d["seq"] = evicted.seq
+            self._archived.setdefault(key, []).append(d)
+            self._record({"op": "trim", "ch": key, "keep": ctx.messages.maxlen})
+        for dup in ctx.messages.take_released():
+            # Its original left the ring: persist the full text in place of the reference
+            self._record({"op": "unref", "ch": key, "seq": dup.seq, "m": dup.to_dict()})
+        if self._data.max_bytes:
+            self._data.enforce()  # the context just grew
+
+    def set_summary(self, channel_id: int, text: str, upto: int) -> None:
+        """Replace the channel's rolling summary (covers messages with `seq < upto`)."""
+        ctx = self.get(channel_id)
+        ctx.summary = text
+        ctx.summary_upto = int(upto)
+        self._record({"op": "summary", "ch": str(channel_id), "text": text, "upto": ctx.summary_upto})
+
+    def set_channel_guild(self, channel_id: int, guild_id: int | str | None) -> None:
+        """Remember which guild a channel belongs to (recorded only when it changes)."""
+        ctx = self.get(channel_id)
+        g = str(guild_id or "")
+        if ctx.guild != g:
+            ctx.guild = g
+            self._record({"op": "channel", "ch": str(channel_id), "g": g})
+
+    def increment_turns(self, channel_id: int) -> int:
+        """Increment and return the channel's turn counter."""
+        ctx = self.get(channel_id)
+        ctx.turns += 1
+        self._record({"op": "turns", "ch": str(channel_id), "n": ctx.turns})
+        return ctx.turns
 
     def reset(self, channel_id: int) -> None:
         """Clear the context for a specific channel and persist."""
         key = str(channel_id)
         self._data.pop(key, None)
-        self.save()
+        if self._backend.lazy:
+            # Keep an empty resident context so stale rows are not faulted back in
+            self._data[key] = self._context_from_raw({})
+        self._record({"op": "reset", "ch": key})
+        self.mark_dirty()
 
     def reset_all(self) -> None:
         """Clear all channel contexts and persist."""
         self._data.clear()
-        self.save()
+        self._backend_cleared = True
+        self._reset_all_pending = True
+        self._record({"op": "reset_all"})
+        self.mark_dirty()
 
     # Guild settings
     def guild_settings(self, guild_id: int) -> dict:
@@ -174,15 +532,57 @@ class MemoryStore:
             self._guild_settings[key] = gs
         return gs
 
+    def touch_guild(self, guild_id: int) -> None:
+        """Record that guild settings were mutated in place (journal mode)."""
+        key = str(guild_id)
+        if key in self._guild_settings:
+            self._record({"op": "guild", "g": key, "s": copy.deepcopy(self._guild_settings[key])})
+
+    def mark_intervened(self, guild_id: int, channel_id: int, author_id: int | None = None) -> None:
+        """Record an intervention cooldown mark for the channel (and user)."""
+        gs = self.guild_settings(guild_id)
+        mark_intervened(gs, channel_id, author_id)
+        ts = gs["last_channel_ts"][str(channel_id)]
+        self._record({"op": "cooldown", "g": str(guild_id), "ch": str(channel_id), "u": author_id, "ts": ts})
+
     # Billing accessors
     @property
     def billing(self) -> Billing:
         return self._billing
 
+    def touch_billing(self, bot_id: str | None = None) -> None:
+        """Record that billing settings were mutated in place (journal mode)."""
+        if bot_id is None:
+            self._record({"op": "billing", "bot": None, "b": _billing_to_dict(self._billing)})
+        else:
+            self._record({"op": "billing", "bot": str(bot_id), "b": _billing_to_dict(self.billing_for(bot_id))})
+
+    def add_cost(self, bot_id: str | None, model: str, feature: str, usd: float) -> Billing:
+        """Add a cost delta to a bot's billing (rolling over day/month first)."""
+        b = self.billing_for(bot_id) if bot_id is not None else self._billing
+        rollover_if_needed(b)
+        b.daily_usd += usd
+        b.monthly_usd += usd
+        b.by_model[model] = b.by_model.get(model, 0.0) + usd
+        b.by_feature[feature] = b.by_feature.get(feature, 0.0) + usd
+        self._record(
+            {
+                "op": "cost",
+                "bot": str(bot_id) if bot_id is not None else None,
+                "usd": usd,
+                "model": model,
+                "feature": feature,
+                "day": b.daily_key,
+                "month": b.monthly_key,
+            }
+        )
+        return b
+
     def set_budgets(self, daily_usd: float | None, monthly_usd: float | None) -> None:
         """Update budgets in the billing state and persist."""
         if daily_usd is not None:
             self._billing.budget_daily_usd = daily_usd
         if monthly_usd is not None:
             self._billing.budget_monthly_usd = monthly_usd
-        self.save()
+        self.touch_billing(None)
+        self.mark_dirty()
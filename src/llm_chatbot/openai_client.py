@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
+from .breaker import BREAKERS
+from .clients import get_async_client, run_sync
+from .keys import note_usage
 from .logging_setup import get_trace_openai_mode
+from .resilience import DeadlineExceeded, call_with_retry
+from .scheduler import Shed
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 """Minimal wrappers around OpenAI SDK usage for this bot.
 
 Highlights
@@ -16,6 +24,8 @@ Highlights
 - Guarding of `reasoning` and `text.verbosity` to the supported models only.
 - Compact helpers to translate chat messages to Responses input and extract
   usage information consistently across SDK variants.
+- Async variants (`*_async`) on pooled `AsyncOpenAI` clients; the plain
+  names are blocking wrappers for threads and scripts.
 """
 
 
@@ -195,11 +205,14 @@ def _build_responses_kwargs(
     reasoning: Optional[Dict[str, Any]] = None,
     verbosity: Optional[str] = None,
     truncation: Optional[str] = None,
+    max_output_tokens: Optional[int] = None,
+    previous_response_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Build kwargs for `client.responses.create()` consistently.
 
     Adds `reasoning` and `text.verbosity` only for GPT‑5 models (but not
-    `gpt-5-chat-latest`). Adds `truncation` when provided.
+    `gpt-5-chat-latest`). Adds `truncation`, `max_output_tokens` and
+    `previous_response_id` when provided.
     """
     kwargs: Dict[str, Any] = {"model": model, "input": input_items}
     if _supports_gpt5_reasoning_and_verbosity(model):
@@ -209,69 +222,132 @@ def _build_responses_kwargs(
             kwargs["text"] = {"format": {"type": "text"}, "verbosity": verbosity}
     if truncation:
         kwargs["truncation"] = truncation
+    if max_output_tokens:
+        kwargs["max_output_tokens"] = int(max_output_tokens)
+    if previous_response_id:
+        kwargs["previous_response_id"] = previous_response_id
     return kwargs
 
 
-def chat_complete_with_usage(
+async def _chat_responses(
+    client: Any,
+    model: str,
+    messages: List[dict],
+    reasoning: Optional[Dict[str, Any]],
+    verbosity: Optional[str],
+    truncation: Optional[str],
+    max_output_tokens: Optional[int],
+    previous_response_id: Optional[str] = None,
+    on_response_id: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, Tuple[int, int, int]]:
+    rkw = _build_responses_kwargs(
+        model,
+        _messages_to_responses_payload(messages),
+        reasoning=reasoning,
+        verbosity=verbosity,
+        truncation=truncation,
+        max_output_tokens=max_output_tokens,
+        previous_response_id=previous_response_id,
+    )
+    _t0 = time.perf_counter()
+    resp = await client.responses.create(**rkw)
+    if on_response_id is not None and getattr(resp, "id", None):
+        on_response_id(str(resp.id))
+    out = _extract_responses_output(resp) or ""
+    usage = extract_usage(resp)
+    note_usage(usage)
+    try:
+        _trace_meta("responses.create", model, _t0, resp, usage, phase="chat")
+        _trace_full("responses.create", model, inputs=rkw, outputs=out, phase="chat")
+    except Exception:
+        pass
+    return out, usage
+
+
+async def _chat_completions(
+    client: Any, model: str, messages: List[dict], max_output_tokens: Optional[int]
+) -> Tuple[str, Tuple[int, int, int]]:
+    ck: Dict[str, Any] = {"model": model, "messages": messages}
+    if max_output_tokens:
+        ck["max_completion_tokens"] = int(max_output_tokens)
+    _t1 = time.perf_counter()
+    resp = await client.chat.completions.create(**ck)
+    out = resp.choices[0].message.content or ""
+    usage = extract_usage(resp)
+    note_usage(usage)
+    try:
+        _trace_meta("chat.completions.create", model, _t1, resp, usage, phase="chat")
+        _trace_full("chat.completions.create", model, inputs=ck, outputs=out, phase="chat")
+    except Exception:
+        pass
+    return out, usage
+
+
+async def chat_complete_with_usage_async(
     api_key: str,
     model: str,
     messages: List[dict],
     reasoning: Optional[Dict[str, Any]] = None,
     verbosity: Optional[str] = None,
     truncation: Optional[str] = None,
+    timeout: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    *,
+    previous_response_id: Optional[str] = None,
+    on_response_id: Optional[Callable[[str], None]] = None,
 ) -> Tuple[str, Tuple[int, int, int]]:
-    """Return assistant text and token usage.
+    """Return assistant text and token usage without blocking the event loop.
+
+    `timeout` (seconds) overrides the shared client's default for this call;
+    `max_output_tokens` bounds generation (`max_completion_tokens` on the fallback).
+    A path whose circuit breaker is open is skipped (see `breaker.py`).
+    With `previous_response_id`, `messages` only extends that stored response
+    (see `chain.py`), so Chat Completions is not tried. `on_response_id`
+    receives the Responses `id` of the reply.
 
     Returns
     -------
     tuple[str, tuple[int, int, int]]
         (text, (input_tokens, output_tokens, cached_input_tokens))
     """
-    # Try new Responses API
-    try:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=api_key)
-        input_items = _messages_to_responses_payload(messages)
-        rkw: Dict[str, Any] = {"model": model, "input": input_items}
-        if _supports_gpt5_reasoning_and_verbosity(model):
-            if reasoning is not None:
-                rkw["reasoning"] = reasoning
-            if verbosity is not None:
-                rkw["text"] = {"format": {"type": "text"}, "verbosity": verbosity}
-        if truncation:
-            rkw["truncation"] = truncation
-        _t0 = time.perf_counter()
-        resp = client.responses.create(**rkw)
-        out = _extract_responses_output(resp) or ""
-        usage = extract_usage(resp)
-        try:
-            _trace_meta("responses.create", model, _t0, resp, usage, phase="chat")
-            _trace_full("responses.create", model, inputs=rkw, outputs=out, phase="chat")
-        except Exception:
-            pass
-        return out, usage
-    except Exception as e:
-        last_err = e
+    last_err: Optional[BaseException] = None
+    # Responses first, Chat Completions as fallback; paths with an open breaker are skipped
+    endpoints = ("responses",) if previous_response_id else BREAKERS.route(model, ("responses", "chat"))
+    for endpoint in endpoints:
+
+        def once(t: float, endpoint: str = endpoint) -> Awaitable[Tuple[str, Tuple[int, int, int]]]:
+            client = get_async_client(api_key, timeout=t)
+            if endpoint == "responses":
+                return _chat_responses(
+                    client, model, messages, reasoning, verbosity, truncation, max_output_tokens, previous_response_id, on_response_id
+                )
+            return _chat_completions(client, model, messages, max_output_tokens)
 
-    # Fallback new chat completions
-    try:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=api_key)
-        ck = {"model": model, "messages": messages}
-        _t1 = time.perf_counter()
-        resp = client.chat.completions.create(**ck)
-        out = resp.choices[0].message.content or ""
-        usage = extract_usage(resp)
         try:
-            _trace_meta("chat.completions.create", model, _t1, resp, usage, phase="chat")
-            _trace_full("chat.completions.create", model, inputs=ck, outputs=out, phase="chat")
-        except Exception:
-            pass
-        return out, usage
-    except Exception as e:
-        raise RuntimeError(f"OpenAI request failed: {e if e else last_err}")
+            result = await call_with_retry(once, phase="chat", timeout=timeout, label=f"chat {endpoint} model={model}")
+        except (DeadlineExceeded, Shed):
+            raise
+        except Exception as e:
+            BREAKERS.failure(model, endpoint, e)
+            last_err = e
+            continue
+        BREAKERS.success(model, endpoint)
+        return result
+    raise RuntimeError(f"OpenAI request failed: {last_err}")
+
+
+def chat_complete_with_usage(
+    api_key: str,
+    model: str,
+    messages: List[dict],
+    reasoning: Optional[Dict[str, Any]] = None,
+    verbosity: Optional[str] = None,
+    truncation: Optional[str] = None,
+    timeout: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+) -> Tuple[str, Tuple[int, int, int]]:
+    """Blocking wrapper around `chat_complete_with_usage_async`."""
+    return run_sync(chat_complete_with_usage_async(api_key, model, messages, reasoning, verbosity, truncation, timeout, max_output_tokens))
 
 
 def extract_usage(resp: Any) -> Tuple[int, int, int]:
@@ -300,8 +376,98 @@ def extract_usage(resp: Any) -> Tuple[int, int, int]:
         return 0, 0, 0
 
 
-def judge_intervention(api_key: str, model: str, context_messages: List[Dict[str, str]], threshold: float) -> Tuple[bool, str, float]:
-    """Decide if the bot should intervene cheaply with a small model.
+_JUDGE_INSTRUCTION = (
+    "You are a strict classifier for a Discord bot. Decide if the bot should proactively intervene. "
+    'Return ONLY compact JSON: {"intervene": true|false, "intent": "help|joke|snark", "confidence": 0..1}.'
+)
+JUDGE_FALLBACK_MODEL = "gpt-5-nano"
+
+
+def _parse_judge_json(s: str) -> Tuple[bool, str, float]:
+    try:
+        data = json.loads(s.strip().strip("`"))
+    except Exception:
+        return False, "help", 0.0
+    intervene = bool(data.get("intervene", False))
+    intent = str(data.get("intent", "help"))
+    conf = float(data.get("confidence", 0.0))
+    return intervene, intent, conf
+
+
+async def _judge_responses(client: Any, model: str, items: List[Dict[str, Any]], phase: str) -> Tuple[bool, str, float]:
+    kwargs = _build_responses_kwargs(
+        model,
+        items,
+        reasoning={"effort": "minimal"},
+        verbosity="low",
+        truncation=None,
+    )
+    started = _now()
+    resp = await client.responses.create(**kwargs)
+    out = _extract_responses_output(resp) or "{}"
+    usage = extract_usage(resp)
+    note_usage(usage)
+    try:
+        _trace_meta("responses.create", model, started, resp, usage, phase=phase)
+        _trace_full("responses.create", model, inputs=kwargs, outputs=out, phase=phase)
+    except Exception:
+        pass
+    return _parse_judge_json(out)
+
+
+async def _judge_chat(client: Any, model: str, context_messages: List[Dict[str, str]]) -> Tuple[bool, str, float]:
+    prompt = [{"role": "system", "content": _JUDGE_INSTRUCTION}]
+    prompt.extend(context_messages[-5:])
+    # Omit temperature to satisfy models that only allow the default (1)
+    started = _now()
+    resp = await client.chat.completions.create(model=model, messages=prompt)
+    txt = resp.choices[0].message.content or "{}"
+    usage = extract_usage(resp)
+    note_usage(usage)
+    try:
+        _trace_meta("chat.completions.create", model, started, resp, usage, phase="judge")
+        _trace_full("chat.completions.create", model, inputs={"model": model, "messages": prompt}, outputs=txt, phase="judge")
+    except Exception:
+        pass
+    return _parse_judge_json(txt)
+
+
+async def first_success(*aws: Awaitable[T]) -> T:
+    """Run `aws` concurrently; return the first result that does not raise.
+
+    Remaining tasks are cancelled as soon as one succeeds. If every
+    awaitable fails, the last error is raised.
+    """
+    pending = {asyncio.ensure_future(a) for a in aws}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    return t.result()
+                error = t.exception()
+        raise error if error is not None else RuntimeError("no awaitables")
+    finally:
+        for t in pending:
+            t.cancel()
+
+
+async def judge_intervention_async(
+    api_key: str,
+    model: str,
+    context_messages: List[Dict[str, str]],
+    threshold: float,
+    *,
+    timeout: Optional[float] = None,
+    race: bool = False,
+) -> Tuple[bool, str, float]:
+    """Decide if the bot should intervene cheaply with a small model (async).
+
+    Tries the Responses API with `model`; on failure falls back to
+    chat.completions with `model`, then Responses with `gpt-5-nano`. With
+    `race=True` the two fallbacks run concurrently and the loser is cancelled.
+    Paths whose circuit breaker is open (see `breaker.py`) are skipped.
 
     Returns
     -------
@@ -310,89 +476,54 @@ def judge_intervention(api_key: str, model: str, context_messages: List[Dict[str
     """
     logger = logging.getLogger(__name__)
 
-    # Strategy: Prefer Responses API; if model is invalid or unsupported, fallback to a small widely-available model.
-    # Always try to return a parsed decision rather than failing silently.
-    def _parse_json(s: str) -> Tuple[bool, str, float]:
-        try:
-            data = json.loads(s.strip().strip("`"))
-        except Exception:
-            return False, "help", 0.0
-        intervene = bool(data.get("intervene", False))
-        intent = str(data.get("intent", "help"))
-        conf = float(data.get("confidence", 0.0))
-        return intervene, intent, conf
-
     try:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=api_key)
-        instruction = (
-            "You are a strict classifier for a Discord bot. Decide if the bot should proactively intervene. "
-            'Return ONLY compact JSON: {"intervene": true|false, "intent": "help|joke|snark", "confidence": 0..1}.'
-        )
-        judge_msgs = [{"role": "developer", "content": instruction}] + context_messages[-5:]
+        judge_msgs = [{"role": "developer", "content": _JUDGE_INSTRUCTION}] + context_messages[-5:]
         items = _messages_to_responses_payload(judge_msgs)
 
-        # First try with given model via Responses API
-        try:
-            kwargs = _build_responses_kwargs(
-                model,
-                items,
-                reasoning={"effort": "minimal"},
-                verbosity="low",
-                truncation=None,
-            )
-            started = _now()
-            resp = client.responses.create(**kwargs)
-            out = _extract_responses_output(resp) or "{}"
+        def once(endpoint: str, m: str, t: float) -> Awaitable[Tuple[bool, str, float]]:
+            client = get_async_client(api_key, timeout=t)
+            if endpoint == "chat":
+                return _judge_chat(client, m, context_messages)
+            return _judge_responses(client, m, items, "judge" if m == model else "judge-fallback")
+
+        async def attempt(endpoint: str, m: str) -> Tuple[bool, str, float]:
             try:
-                _trace_meta("responses.create", model, started, resp, extract_usage(resp), phase="judge")
-                _trace_full("responses.create", model, inputs=kwargs, outputs=out, phase="judge")
-            except Exception:
-                pass
-            intervene, intent, conf = _parse_json(out)
+                verdict = await call_with_retry(
+                    lambda t: once(endpoint, m, t), phase="judge", timeout=timeout, label=f"judge {endpoint} model={m}", priority="judge"
+                )
+            except Exception as e:
+                BREAKERS.failure(m, endpoint, e)
+                logger.info("listen-judge: %s failed for model=%s err=%s", endpoint, m, e)
+                raise
+            BREAKERS.success(m, endpoint)
+            return verdict
+
+        # Responses with the given model, then chat.completions with it, then a small widely-available
+        # model; paths whose breaker is open are skipped
+        attempts = [(e, model) for e in BREAKERS.route(model, ("responses", "chat"))]
+        attempts += [(e, JUDGE_FALLBACK_MODEL) for e in BREAKERS.route(JUDGE_FALLBACK_MODEL, ("responses",))]
+        try:
+            intervene, intent, conf = await attempt(*attempts[0])
             return (intervene and conf >= threshold), intent, conf
-        except Exception as e_responses:
-            logger.info("listen-judge: responses failed for model=%s err=%s", model, e_responses)
-            # Try chat.completions with the same model (may still fail if model unsupported there)
-            try:
-                prompt = [{"role": "system", "content": instruction}]
-                prompt.extend(context_messages[-5:])
-                # Omit temperature to satisfy models that only allow the default (1)
-                started_cc = _now()
-                resp_cc = client.chat.completions.create(model=model, messages=prompt)
-                txt = resp_cc.choices[0].message.content or "{}"
+        except Exception:
+            pass
+        rest = attempts[1:]
+        try:
+            if race and len(rest) > 1:
+                intervene, intent, conf = await first_success(*(attempt(e, m) for e, m in rest))
+                logger.info("listen-judge: raced fallbacks for model=%s", model)
+                return (intervene and conf >= threshold), intent, conf
+            err: Optional[BaseException] = None
+            for e, m in rest:
                 try:
-                    _trace_meta("chat.completions.create", model, started_cc, resp_cc, extract_usage(resp_cc), phase="judge")
-                    _trace_full("chat.completions.create", model, inputs={"model": model, "messages": prompt}, outputs=txt, phase="judge")
-                except Exception:
-                    pass
-                intervene, intent, conf = _parse_json(txt)
+                    intervene, intent, conf = await attempt(e, m)
+                except Exception as exc:
+                    err = exc
+                    continue
+                if m != model:
+                    logger.info("listen-judge: fallback model=%s used", m)
                 return (intervene and conf >= threshold), intent, conf
-            except Exception as e_cc:
-                logger.info("listen-judge: chat.completions failed for model=%s err=%s", model, e_cc)
-
-        # Fallback to a small widely-available model
-        fallback_model = "gpt-5-nano"
-        try:
-            kwargs_fb = _build_responses_kwargs(
-                fallback_model,
-                items,
-                reasoning={"effort": "minimal"},
-                verbosity="low",
-                truncation=None,
-            )
-            started_fb = _now()
-            resp_fb = client.responses.create(**kwargs_fb)
-            out_fb = _extract_responses_output(resp_fb) or "{}"
-            try:
-                _trace_meta("responses.create", fallback_model, started_fb, resp_fb, extract_usage(resp_fb), phase="judge-fallback")
-                _trace_full("responses.create", fallback_model, inputs=kwargs_fb, outputs=out_fb, phase="judge-fallback")
-            except Exception:
-                pass
-            intervene, intent, conf = _parse_json(out_fb)
-            logger.info("listen-judge: fallback model=%s used", fallback_model)
-            return (intervene and conf >= threshold), intent, conf
+            raise err if err is not None else RuntimeError("no judge path left")
         except Exception as e_fb:
             logger.warning("listen-judge: all judge attempts failed err=%s", e_fb)
             return False, "help", 0.0
@@ -401,14 +532,57 @@ def judge_intervention(api_key: str, model: str, context_messages: List[Dict[str
         return False, "help", 0.0
 
 
-def moderate_text(api_key: str, model: str, text: str) -> bool:
-    """Return True if the text is allowed, False if it should be blocked."""
-    try:
-        from openai import OpenAI
+def judge_intervention(
+    api_key: str,
+    model: str,
+    context_messages: List[Dict[str, str]],
+    threshold: float,
+    *,
+    timeout: Optional[float] = None,
+    race: bool = False,
+) -> Tuple[bool, str, float]:
+    """Blocking wrapper around `judge_intervention_async`."""
+    return run_sync(judge_intervention_async(api_key, model, context_messages, threshold, timeout=timeout, race=race))
 
-        client = OpenAI(api_key=api_key)
+
+def summarize_conversation(
+    api_key: str,
+    model: str,
+    previous: str,
+    messages: List[Dict[str, str]],
+    *,
+    max_chars: int = 1500,
+    language: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[str, Tuple[int, int, int]]:
+    """Fold `messages` into the running summary `previous` with a small model.
+
+    Returns the new summary text and token usage. Raises on failure so the
+    caller can keep the previous summary.
+    """
+    lang = f" Write in {language}." if language else ""
+    instruction = (
+        "You maintain a running summary of a Discord conversation for a chatbot. "
+        "Merge the previous summary with the new messages into one concise summary: keep names, facts, decisions, "
+        f"open questions and the bot's commitments; drop chit-chat. Stay under {int(max_chars)} characters.{lang} "
+        "Return only the summary text."
+    )
+    transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages)
+    user = (f"Previous summary:\n{previous}\n\n" if previous else "") + f"New messages:\n{transcript}"
+    msgs = [{"role": "developer", "content": instruction}, {"role": "user", "content": user}]
+    return chat_complete_with_usage(api_key, model, msgs, reasoning={"effort": "minimal"}, verbosity="low", timeout=timeout)
+
+
+async def moderate_text_async(api_key: str, model: str, text: str, *, timeout: Optional[float] = None) -> bool:
+    """Return True if the text is allowed, False if it should be blocked (async)."""
+    try:
         started = _now()
-        resp = client.moderations.create(model=model, input=text)
+        resp = await call_with_retry(
+            lambda t: get_async_client(api_key, timeout=t).moderations.create(model=model, input=text),
+            phase="judge",
+            timeout=timeout,
+            label="moderation",
+        )
         try:
             _trace_meta("moderations.create", model, started, resp, extract_usage(resp), phase="moderate")
             _trace_full("moderations.create", model, inputs={"model": model, "input": text}, outputs=None, phase="moderate")
@@ -420,3 +594,8 @@ def moderate_text(api_key: str, model: str, text: str) -> bool:
     except Exception:
         # Fail open (allow) if moderation endpoint not available
         return True
+
+
+def moderate_text(api_key: str, model: str, text: str, *, timeout: Optional[float] = None) -> bool:
+    """Blocking wrapper around `moderate_text_async`."""
+    return run_sync(moderate_text_async(api_key, model, text, timeout=timeout))
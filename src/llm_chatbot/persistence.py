@@ -0,0 +1,195 @@
+"""Write-behind persistence scheduler for `MemoryStore`.
+
+Callers mark the store dirty instead of saving synchronously. The scheduler
+coalesces those marks and writes at most once per `max_delay` seconds (sooner
+when `max_pending` mutations have accumulated). Each write drains the store's
+pending changes into a consistent `WriteBatch` on the event loop and hands it
+to a single worker thread for serialization and file I/O, so the loop never
+blocks on `json.dumps` or disk.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .storage import write_batch
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "batched", "never")
+
+
+@dataclass
+class WriteStats:
+    """Counters exposed for monitoring the write-behind scheduler."""
+
+    requested: int = 0  # mark_dirty() calls
+    writes: int = 0  # backend writes performed
+    fsyncs: int = 0
+    failures: int = 0
+    last_write_ms: float = 0.0
+    max_write_ms: float = 0.0
+    total_write_ms: float = 0.0
+
+    @property
+    def coalesced(self) -> int:
+        """Saves that were absorbed into another write."""
+        return max(0, self.requested - self.writes)
+
+    @property
+    def avg_write_ms(self) -> float:
+        return self.total_write_ms / self.writes if self.writes else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requested": self.requested,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "fsyncs": self.fsyncs,
+            "failures": self.failures,
+            "last_write_ms": round(self.last_write_ms, 2),
+            "avg_write_ms": round(self.avg_write_ms, 2),
+            "max_write_ms": round(self.max_write_ms, 2),
+        }
+
+
+class WriteBehindScheduler:
+    """Coalesce store saves and perform them on a background writer thread.
+
+    Parameters
+    ----------
+    store: MemoryStore
+        Store whose pending changes are written.
+    max_delay: float
+        Upper bound in seconds between the first dirty mark and the write.
+    max_pending: int
+        Write immediately once this many dirty marks have accumulated.
+    fsync: str
+        `always` (every write), `batched` (at most every `fsync_interval`
+        seconds), or `never`.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        *,
+        max_delay: float = 2.0,
+        max_pending: int = 100,
+        fsync: str = "batched",
+        fsync_interval: float = 5.0,
+    ) -> None:
+        self.store = store
+        self.max_delay = max(0.0, float(max_delay))
+        self.max_pending = max(1, int(max_pending))
+        self.fsync = fsync if fsync in FSYNC_POLICIES else "batched"
+        self.fsync_interval = float(fsync_interval)
+        self.stats = WriteStats()
+        self._pending = 0
+        self._last_fsync = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-chatbot-store")
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start the background writer task on the running (or given) loop."""
+        if self.running:
+            return
+        self._loop = loop or asyncio.get_event_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def notify(self) -> None:
+        """Record one dirty mark; wakes the writer immediately past `max_pending`."""
+        self.stats.requested += 1
+        self._pending += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    def _want_fsync(self) -> bool:
+        if self.fsync == "always":
+            return True
+        if self.fsync == "never":
+            return False
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_interval:
+            self._last_fsync = now
+            return True
+        return False
+
+    def _write_sync(self, batch: Any, after: Optional[Callable[[], Any]] = None) -> Any:
+        started = time.perf_counter()
+        try:
+            write_batch(self.store.backend, batch)
+            if batch.fsync:
+                self.store.backend.flush()
+        finally:
+            dur = (time.perf_counter() - started) * 1000.0
+            self.stats.last_write_ms = dur
+            self.stats.total_write_ms += dur
+            self.stats.max_write_ms = max(self.stats.max_write_ms, dur)
+        return after() if after is not None else None
+
+    async def _write_once(self, after: Optional[Callable[[], Any]] = None) -> Any:
+        self._pending = 0
+        fsync = self._want_fsync()
+        batch = self.store._take_batch(fsync=fsync)
+        loop = asyncio.get_running_loop()
+        try:
+            res = await loop.run_in_executor(self._executor, self._write_sync, batch, after)
+            self.stats.writes += 1
+            if fsync:
+                self.stats.fsyncs += 1
+            return res
+        except Exception:
+            self.stats.failures += 1
+            logger.exception("store: write-behind save failed")
+            return None
+
+    async def _run(self) -> None:
+        assert self._wake is not None
+        while not self._closed:
+            await self._wake.wait()
+            # Coalesce: wait up to max_delay unless the pending cap is reached
+            deadline = time.monotonic() + self.max_delay
+            while self._pending < self.max_pending and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            self._wake.clear()
+            if self._pending:
+                await self._write_once()
+
+    async def flush(self) -> None:
+        """Write any pending changes now (awaitable, off-loop I/O)."""
+        await self._write_once()
+
+    async def run_exclusive(self, fn: Callable[[], Any]) -> Any:
+        """Write pending changes, then run `fn` on the writer thread (e.g., compaction)."""
+        return await self._write_once(after=fn)
+
+    def close(self) -> None:
+        """Stop the writer task and wait for in-flight writes (final flush is the caller's)."""
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            try:
+                self._task.cancel()
+            except RuntimeError:
+                pass  # loop already closed
+        self._executor.shutdown(wait=True)
+        logger.info("store: write-behind stats %s", self.stats.as_dict())
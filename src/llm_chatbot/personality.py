@@ -25,6 +25,19 @@ class ContextConfig:
     include_last_n: int = 10
     include_non_addressed_messages: bool = True
     scope: Optional[str] = "channel"
+    # Pack history newest-first up to this many estimated input tokens (None = count-based only)
+    input_token_budget: Optional[int] = None
+    # Add up to this many older messages relevant to the new message (BM25 over retained history; 0 = off)
+    retrieval_top_k: int = 0
+    # Rolling summary of older messages (see `summarizer.py`)
+    summary_enabled: bool = False
+    summary_trigger: int = 30
+    summary_keep_last: int = 10
+    summary_model: Optional[str] = None  # defaults to the listen judge model
+    summary_max_chars: int = 1500
+    # Send only new messages plus previous_response_id (see `chain.py`)
+    chain_responses: bool = False
+    chain_max_turns: int = 20
 
 
 @dataclass
@@ -46,6 +59,11 @@ class ListenConfig:
     judge_model: str = "gpt-5-nano"
     judge_threshold: float = 0.6
     judge_max_context_messages: int = 5
+    # Borderline cheap verdicts (escalate_band <= conf < threshold) go to escalate_model
+    judge_escalate_model: Optional[str] = "gpt-5-mini"
+    judge_escalate_band: float = 0.4
+    judge_strategy: str = "auto"  # auto | sequential | concurrent
+    judge_concurrent_above: float = 0.5  # predicted escalation rate that switches auto to concurrent
     # Generation overrides for interventions
     generation_model_override: Optional[str] = None
     response_max_chars: int = 600
@@ -93,6 +111,13 @@ class Personality:
     stream_rate_hz: float | None = None
     stream_min_first: int | None = None
     stream_min_next: int | None = None
+    # Hedged streaming (opt-in): seconds without a first delta before a second request, or "auto" (p90 TTFT)
+    stream_hedge_after: float | str | None = None
+    stream_hedge_model: str | None = None
+    # Reply length cap for mentions/DMs (interventions use `listen.response_max_chars`); also bounds
+    # generation via `max_output_tokens`. `max_output_tokens` overrides the derived token cap.
+    response_max_chars: int | None = None
+    max_output_tokens: int | None = None
     # Command prefix override (per-persona)
     command_prefix: str | None = None
     # Optional environment context templates
@@ -125,6 +150,14 @@ def _rl_list(obj) -> Optional[List[RateLimitDim]]:
     return out or None
 
 
+def _hedge_after(v) -> float | str | None:
+    if v is None or v is False:
+        return None
+    if isinstance(v, str) and v.strip().lower() == "auto":
+        return "auto"
+    return float(v)
+
+
 DEFAULT_PERSONALITY = Personality(
     name="base",
     system_prompt=(
@@ -160,6 +193,10 @@ def load_personality(path: str | Path) -> Personality:
         judge_model=_listen.get("judge_model", "gpt-5-nano"),
         judge_threshold=float(_listen.get("judge_threshold", 0.6)),
         judge_max_context_messages=int(_listen.get("judge_max_context_messages", 5)),
+        judge_escalate_model=_listen.get("judge_escalate_model", "gpt-5-mini"),
+        judge_escalate_band=float(_listen.get("judge_escalate_band", 0.4)),
+        judge_strategy=str(_listen.get("judge_strategy", "auto")).lower(),
+        judge_concurrent_above=float(_listen.get("judge_concurrent_above", 0.5)),
         generation_model_override=_listen.get("generation_model_override"),
         response_max_chars=int(_listen.get("response_max_chars", 600)),
         joke_bias=float(_listen.get("joke_bias", 0.5)),
@@ -189,10 +226,20 @@ def load_personality(path: str | Path) -> Personality:
     )
 
     _ctx = data.get("context", {}) or {}
+    _summary = _ctx.get("summary", {}) or {}
     context = ContextConfig(
         include_last_n=int(_ctx.get("include_last_n", 10)),
         include_non_addressed_messages=bool(_ctx.get("include_non_addressed_messages", True)),
         scope=_ctx.get("scope", "channel"),
+        input_token_budget=(int(_ctx["input_token_budget"]) if _ctx.get("input_token_budget") else None),
+        retrieval_top_k=int(_ctx.get("retrieval_top_k", 0) or 0),
+        summary_enabled=bool(_summary.get("enabled", False)),
+        summary_trigger=int(_summary.get("trigger", 30)),
+        summary_keep_last=int(_summary.get("keep_last", 10)),
+        summary_model=_summary.get("model"),
+        summary_max_chars=int(_summary.get("max_chars", 1500)),
+        chain_responses=bool(_ctx.get("chain_responses", False)),
+        chain_max_turns=int(_ctx.get("chain_max_turns", 20) or 0),
     )
 
     return Personality(
@@ -204,6 +251,10 @@ def load_personality(path: str | Path) -> Personality:
         stream_rate_hz=streaming.get("rate_hz"),
         stream_min_first=streaming.get("min_first"),
         stream_min_next=streaming.get("min_next"),
+        stream_hedge_after=_hedge_after(streaming.get("hedge_after")),
+        stream_hedge_model=streaming.get("hedge_model"),
+        response_max_chars=(int(data["response_max_chars"]) if data.get("response_max_chars") else None),
+        max_output_tokens=(int(data["max_output_tokens"]) if data.get("max_output_tokens") else None),
         command_prefix=data.get("command_prefix"),
         env_guild_template=environment.get("guild_template"),
         env_dm_template=environment.get("dm_template"),
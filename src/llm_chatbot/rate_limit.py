@@ -12,10 +12,13 @@ class MultiKeySlidingWindow:
         caps: Dict[str, List[Window]],
         buckets: Dict[str, Dict[str, List[float]]] | None = None,
         now_func: Callable[[], float] | None = None,
+        on_event: Callable[[str, str, float], None] | None = None,
     ) -> None:
         self.caps = {dim: [(int(w), int(m)) for (w, m) in caps_list] for dim, caps_list in (caps or {}).items()}
         self.buckets = buckets if buckets is not None else {}
         self.now = now_func or time.time
+        # Optional observer for accepted events (e.g., store journaling)
+        self.on_event = on_event
 
     def _bucket_for(self, dim: str, key: str) -> List[float]:
         d = self.buckets.setdefault(dim, {})
@@ -33,7 +36,9 @@ class MultiKeySlidingWindow:
     def allow(self, dim: str, key: str) -> bool:
         if dim not in self.caps:
             ts = self._bucket_for(dim, key)
-            ts.append(self.now())
+            now_ts = self.now()
+            ts.append(now_ts)
+            self._emit(dim, key, now_ts)
             return True
         now_ts = self.now()
         ts = self._bucket_for(dim, key)
@@ -42,4 +47,12 @@ class MultiKeySlidingWindow:
             if len(ts) >= max_events:
                 return False
         ts.append(now_ts)
+        self._emit(dim, key, now_ts)
         return True
+
+    def _emit(self, dim: str, key: str, now_ts: float) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(dim, str(key), now_ts)
+            except Exception:
+                pass
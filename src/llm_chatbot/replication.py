@@ -0,0 +1,326 @@
+"""Warm-standby replication of `MemoryStore` over a Unix socket.
+
+The primary runs a `ReplicationPublisher`. Each standby that connects first
+receives a full snapshot, then every mutation the store records (context
+appends and trims, turns, summaries, guild settings, cooldowns, billing and
+cost deltas, rate-window events) as one JSON line, plus channel loads,
+completed-write markers, and heartbeats.
+
+A standby keeps a `Replica` in memory by applying those lines with the same
+`apply_record` used for journal replay. When the primary goes away (socket
+EOF or missed heartbeats) `follow()` returns and the standby promotes the
+replica into a `MemoryStore` without reading the store file, re-queuing the
+mutations the primary had not written yet, then connects to Discord.
+`FailoverStats` measures each step from the primary's last sign of life.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .journal import apply_record
+
+logger = logging.getLogger(__name__)
+
+# Drop a standby whose unsent backlog exceeds this; it reconnects and resyncs from a snapshot
+MAX_SUBSCRIBER_BUFFER = 16 * 1024 * 1024
+# Longest line a standby reads; the snapshot is one line as large as the whole store
+MAX_LINE = 1024 * 1024 * 1024
+
+
+def _line(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class ReplicationPublisher:
+    """Serve the store's change stream to standbys on a Unix socket.
+
+    Parameters
+    ----------
+    store: MemoryStore
+        Store whose mutations are published.
+    path: Path
+        Unix socket path (a stale socket file is replaced).
+    heartbeat: float
+        Seconds between heartbeats; standbys treat several missed ones as a failure.
+    """
+
+    def __init__(self, store: Any, path: Path, *, heartbeat: float = 1.0) -> None:
+        self.store = store
+        self.path = Path(path)
+        self.heartbeat = max(0.05, float(heartbeat))
+        self.failover: Optional["FailoverStats"] = None  # set when this process was promoted
+        self._subscribers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._hb_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    async def start(self) -> None:
+        if self._server is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self.path.exists():
+            self.path.unlink()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._on_client, path=str(self.path))
+        os.chmod(self.path, 0o600)
+        self.store.subscribe(self._on_change)
+        self.store.replication = self
+        self._hb_task = self._loop.create_task(self._heartbeats())
+        logger.info("replication: publishing changes on %s", self.path)
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Snapshot and registration happen without yielding, so no record falls in between
+        writer.write(_line({"op": "snapshot", **self.store.replication_snapshot()}))
+        self._subscribers.add(writer)
+        logger.info("replication: standby connected (%d total) lsn=%d", len(self._subscribers), self.store.lsn)
+        try:
+            await reader.read()  # standbys never send; returns on disconnect
+        except Exception:
+            pass
+        finally:
+            self._drop(writer)
+
+    def _drop(self, writer: asyncio.StreamWriter) -> None:
+        if writer in self._subscribers:
+            self._subscribers.discard(writer)
+            logger.info("replication: standby disconnected (%d left)", len(self._subscribers))
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    def _broadcast(self, data: bytes) -> None:
+        for w in list(self._subscribers):
+            if w.is_closing():
+                self._drop(w)
+                continue
+            if w.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                logger.warning("replication: standby too slow; dropping it to resync")
+                self.dropped += 1
+                self._drop(w)
+                continue
+            w.write(data)
+        self.sent += 1
+
+    def _on_change(self, lsn: int, rec: dict) -> None:
+        if not self._subscribers:
+            return
+        msg = rec if rec.get("op") in ("load", "saved") else {"lsn": lsn, "r": rec}
+        data = _line(msg)
+        # Write completions are reported from backend worker threads
+        if threading.get_ident() != self._loop_thread and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._broadcast, data)
+            except RuntimeError:  # loop closed during shutdown
+                pass
+        else:
+            self._broadcast(data)
+
+    async def _heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if self._subscribers:
+                self._broadcast(_line({"op": "hb", "lsn": self.store.lsn}))
+
+    def status(self) -> dict:
+        d: Dict[str, Any] = {"role": "primary", "standbys": len(self._subscribers), "lsn": self.store.lsn, "dropped": self.dropped}
+        if self.failover is not None:
+            d["failover"] = self.failover.as_dict()
+        return d
+
+    def detach(self) -> None:
+        """Stop publishing without the event loop (e.g., after it has closed); standbys see EOF."""
+        self.store.unsubscribe(self._on_change)
+        for w in list(self._subscribers):
+            try:
+                w.transport.abort()
+            except Exception:
+                pass
+        self._subscribers.clear()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    async def close(self) -> None:
+        self.store.unsubscribe(self._on_change)
+        if self._hb_task is not None:
+            self._hb_task.cancel()
+        for w in list(self._subscribers):
+            self._drop(w)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+@dataclass
+class FailoverStats:
+    """Failover timings, in ms from the primary's last message (or heartbeat)."""
+
+    detect_ms: float = 0.0  # failure noticed (EOF or heartbeat timeout)
+    promote_ms: float = 0.0  # replica turned into a ready MemoryStore
+    ready_ms: float = 0.0  # Discord connection ready
+    lsn: int = 0
+    unsaved: int = 0  # mutations re-queued because the primary had not written them
+    reason: str = ""
+
+    def as_dict(self) -> dict:
+        return {
+            "detect_ms": round(self.detect_ms, 1),
+            "promote_ms": round(self.promote_ms, 1),
+            "ready_ms": round(self.ready_ms, 1),
+            "lsn": self.lsn,
+            "unsaved": self.unsaved,
+            "reason": self.reason,
+        }
+
+
+@dataclass
+class Replica:
+    """Hot in-memory copy of a primary's store state, in the raw snapshot layout."""
+
+    raw: dict = field(default_factory=dict)
+    lsn: int = 0
+    cleared: bool = False
+    synced: bool = False
+    last_contact: float = 0.0  # monotonic time of the last line from the primary
+    applied: int = 0
+    resyncs: int = 0
+    # Mutations (and the messages their trims evicted) the primary has not reported written
+    _unsaved: List[Tuple[int, dict]] = field(default_factory=list)
+    _unsaved_archive: List[Tuple[int, str, dict]] = field(default_factory=list)
+    stats: FailoverStats = field(default_factory=FailoverStats)
+
+    def apply(self, ev: dict) -> None:
+        """Apply one line of the change stream."""
+        self.last_contact = time.monotonic()
+        op = ev.get("op")
+        if op == "snapshot":
+            self.raw = ev.get("raw") or {}
+            self.lsn = int(ev.get("lsn", 0))
+            self.cleared = bool(ev.get("cleared"))
+            self._unsaved.clear()
+            self._unsaved_archive.clear()
+            self.resyncs += int(self.synced)
+            self.synced = True
+        elif op == "load":
+            self.raw.setdefault("chats", {})[str(ev["ch"])] = ev.get("doc") or {}
+        elif op == "saved":
+            upto = int(ev.get("lsn", 0))
+            self._unsaved = [(n, r) for n, r in self._unsaved if n > upto]
+            self._unsaved_archive = [(n, k, m) for n, k, m in self._unsaved_archive if n > upto]
+        elif op == "hb":
+            pass
+        elif "r" in ev:
+            lsn, rec = int(ev["lsn"]), ev["r"]
+            if lsn <= self.lsn:
+                return
+            self._capture_trim(lsn, rec)
+            apply_record(self.raw, rec)
+            if rec.get("op") == "reset":
+                # Keep an empty channel so a lazy backend's stale rows are not faulted back in
+                self.raw.setdefault("chats", {})[str(rec["ch"])] = {"turns": 0, "messages": []}
+            elif rec.get("op") == "reset_all":
+                self.cleared = True
+            self.lsn = lsn
+            self.applied += 1
+            self._unsaved.append((lsn, rec))
+
+    def _capture_trim(self, lsn: int, rec: dict) -> None:
+        if rec.get("op") != "trim":
+            return
+        ch = (self.raw.get("chats") or {}).get(str(rec["ch"]))
+        if ch is None:
+            return
+        msgs = ch.get("messages") or []
+        first_seq = int(ch.get("first_seq", 0) or 0)
+        for i in range(max(0, len(msgs) - int(rec.get("keep", len(msgs))))):
+            self._unsaved_archive.append((lsn, str(rec["ch"]), dict(msgs[i], seq=first_seq + i)))
+
+    def unsaved(self) -> Tuple[List[dict], Dict[str, List[dict]]]:
+        """Return `(records, archived)` not yet written by the primary."""
+        archived: Dict[str, List[dict]] = {}
+        for _n, key, m in self._unsaved_archive:
+            archived.setdefault(key, []).append(m)
+        return [r for _n, r in self._unsaved], archived
+
+    def promote(self, make_store: Callable[[dict], Any]) -> Any:
+        """Build the live store from the replica (`make_store(initial_raw)`) and re-queue unsaved mutations."""
+        started = time.monotonic()
+        store = make_store(self.raw)
+        records, archived = self.unsaved()
+        store.restore_unsaved(records, archived, backend_cleared=self.cleared)
+        self.stats.lsn = self.lsn
+        self.stats.unsaved = len(records)
+        self.stats.promote_ms = self.stats.detect_ms + (time.monotonic() - started) * 1000.0
+        return store
+
+    def status(self) -> dict:
+        return {"role": "promoted", "standbys": 0, "lsn": self.lsn, "dropped": 0, "failover": self.stats.as_dict()}
+
+    def mark_ready(self) -> None:
+        """Record the time the promoted process became ready (e.g., Discord `on_ready`)."""
+        self.stats.ready_ms = (time.monotonic() - self.last_contact) * 1000.0
+
+
+async def follow(path: Path, replica: Replica, *, timeout: float = 5.0, grace: float = 1.0, retry: float = 0.2) -> Replica:
+    """Tail the primary at `path` until it fails; return the up-to-date replica.
+
+    Waits for a primary to appear first. After a disconnect the standby tries
+    to reconnect for `grace` seconds (a restarted primary resyncs it) before
+    declaring failover; `timeout` seconds of silence also count as a failure.
+    """
+    path = Path(path)
+    while True:
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(path), limit=MAX_LINE)
+        except OSError:
+            if replica.synced and time.monotonic() - replica.last_contact > grace:
+                replica.stats.reason = "primary gone"
+                break
+            await asyncio.sleep(retry)
+            continue
+        reason = "eof"
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                if not line:
+                    break
+                replica.apply(json.loads(line))
+        except asyncio.TimeoutError:
+            reason = "heartbeat timeout"
+        except (OSError, ValueError) as e:
+            reason = f"stream error: {e}"
+        finally:
+            writer.close()
+        logger.warning("replication: lost primary (%s) lsn=%d", reason, replica.lsn)
+        if reason == "heartbeat timeout":
+            replica.stats.reason = reason
+            break
+        replica.stats.reason = reason
+        if reason.startswith("stream error"):
+            await asyncio.sleep(retry)  # a bad stream would fail again at once; don't spin on it
+    replica.stats.detect_ms = (time.monotonic() - replica.last_contact) * 1000.0
+    return replica
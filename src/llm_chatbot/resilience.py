@@ -0,0 +1,330 @@
+"""Retries, per-phase timeouts and reply deadlines for OpenAI calls.
+
+Request/response calls go through `call_with_retry`, which bounds each
+attempt by the phase's timeout (judge, chat) and by the remaining reply
+deadline, and retries transient errors (429, 408, 409, 5xx, timeouts,
+dropped connections) with capped exponential backoff and full jitter,
+honouring `Retry-After`. Streams bound each event with `wait_phase` (first
+token, idle) and retry via `retry_delay` until the first delta arrives. The
+SDK's own retries are disabled on the shared clients
+(`ClientPoolConfig.max_retries`) so this is the only layer.
+
+Pacing for rate limits (`throttle.py`) is decided in the request hook but
+taken here: inside a `pacing_scope` the hook raises `Paced` instead of
+sleeping, and the caller waits with no admission slot, key lease or attempt
+timeout held, then sends again.
+
+`deadline_scope(seconds)` starts an end-to-end deadline for the current task
+(a context variable, so tasks it spawns inherit it); every later stage
+shrinks its timeouts to fit and gives up with `DeadlineExceeded` once it
+has passed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from .keys import KEYS, key_scope
+from .scheduler import Shed, admission
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PHASES = ("judge", "chat", "first_token", "idle")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The reply deadline passed before the call could complete."""
+
+
+class Paced(Exception):
+    """The rate-limit hook wants the request sent `wait` seconds later (see `pacing_scope`)."""
+
+    def __init__(self, wait: float) -> None:
+        super().__init__(f"paced for {wait:.2f}s")
+        self.wait = wait
+
+
+@dataclass
+class ResilienceConfig:
+    """Retry policy and per-phase timeouts (seconds)."""
+
+    attempts: int = 3  # total tries per call, including the first
+    backoff_base: float = 0.5
+    backoff_cap: float = 8.0
+    judge_timeout: float = 10.0
+    chat_timeout: float = 60.0
+    first_token_timeout: float = 20.0  # stream open until the first delta
+    idle_timeout: float = 30.0  # longest gap between stream events
+    reply_deadline: float = 90.0  # per message, end to end (0 disables)
+
+    def phase_timeout(self, phase: str) -> float:
+        return float(getattr(self, f"{phase}_timeout"))
+
+
+SETTINGS = ResilienceConfig()
+
+
+def configure_resilience(config: ResilienceConfig) -> None:
+    """Apply retry and timeout settings process-wide."""
+    global SETTINGS
+    SETTINGS = config
+
+
+class Deadline:
+    """Absolute point in (monotonic) time a reply must be finished by."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = float(seconds)
+        self.at = time.monotonic() + self.seconds
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_DEADLINE: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("llm_chatbot_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Run the block under a reply deadline (`None` or `<= 0`: no deadline)."""
+    dl = Deadline(seconds) if seconds and seconds > 0 else None
+    token = _DEADLINE.set(dl)
+    try:
+        yield dl
+    finally:
+        _DEADLINE.reset(token)
+
+
+def start_deadline(seconds: Optional[float]) -> Optional[Deadline]:
+    """Set the reply deadline for the rest of the current task.
+
+    Discord runs each event handler in its own task, so the deadline ends
+    with the handler without an explicit reset.
+    """
+    dl = Deadline(seconds) if seconds and seconds > 0 else None
+    _DEADLINE.set(dl)
+    return dl
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _DEADLINE.get()
+
+
+_PACING: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("llm_chatbot_pacing", default=None)
+
+
+@contextmanager
+def pacing_scope() -> Iterator[dict]:
+    """Let the rate-limit hook hand its pause to the caller of this block.
+
+    The yielded dict is the hook's scratch space: it records the budget it
+    already reserved so the resent request is not charged twice.
+    """
+    token = _PACING.set({})
+    try:
+        yield _PACING.get()
+    finally:
+        _PACING.reset(token)
+
+
+def current_pacing() -> Optional[dict]:
+    return _PACING.get()
+
+
+def paced_wait(err: BaseException) -> Optional[float]:
+    """The pause a `Paced` error asks for, also when the SDK wrapped it; else None."""
+    e: Optional[BaseException] = err
+    for _ in range(4):
+        if e is None:
+            break
+        if isinstance(e, Paced):
+            return e.wait
+        e = e.__cause__ or e.__context__
+    return None
+
+
+def phase_timeout(phase: str, override: Optional[float] = None) -> float:
+    """Timeout for one attempt of `phase`, shrunk to the remaining deadline.
+
+    Raises `DeadlineExceeded` if the deadline has already passed.
+    """
+    t = float(override) if override is not None else SETTINGS.phase_timeout(phase)
+    dl = _DEADLINE.get()
+    if dl is not None:
+        left = dl.remaining()
+        if left <= 0:
+            raise DeadlineExceeded(f"reply deadline of {dl.seconds:.0f}s passed before {phase}")
+        t = min(t, left)
+    return t
+
+
+def _status(err: BaseException) -> Optional[int]:
+    status = getattr(err, "status_code", None)
+    if status is None:
+        status = getattr(getattr(err, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(err: BaseException) -> bool:
+    """True for errors worth retrying: rate limits, server errors, timeouts, dropped connections."""
+    if isinstance(err, DeadlineExceeded):
+        return False
+    status = _status(err)
+    if status is not None:
+        if status == 429:
+            return "insufficient_quota" not in str(err)  # quota exhaustion does not clear by waiting
+        return status in (408, 409) or status >= 500
+    if isinstance(err, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    name = type(err).__name__
+    return name in ("APITimeoutError", "APIConnectionError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "ReadError")
+
+
+def retry_after(err: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (`retry-after-ms` / `Retry-After`), if any."""
+    headers = getattr(getattr(err, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return max(0.0, float(ms) / 1000.0)
+        ra = headers.get("retry-after")
+        if ra is None:
+            return None
+        try:
+            return max(0.0, float(ra))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(ra).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def backoff(attempt: int, config: Optional[ResilienceConfig] = None) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    c = config or SETTINGS
+    return random.uniform(0.0, min(c.backoff_cap, c.backoff_base * (2**attempt)))
+
+
+@asynccontextmanager
+async def admitted(priority: Optional[str] = None) -> AsyncIterator[None]:
+    """Hold an admission slot (see `scheduler.py`), queueing no longer than the reply deadline."""
+    dl = _DEADLINE.get()
+    try:
+        async with admission(priority, timeout=dl.remaining() if dl is not None else None):
+            yield
+    except Shed:
+        if dl is not None and dl.expired:
+            raise DeadlineExceeded(f"reply deadline of {dl.seconds:.0f}s passed while queued") from None
+        raise
+
+
+@contextmanager
+def leased() -> Iterator[None]:
+    """Use a key from the pool (see `keys.py`) for the block; a 429 drains that key."""
+    lease = KEYS.acquire()
+    if lease is None:
+        yield
+        return
+    with key_scope(lease):
+        try:
+            yield
+        except BaseException as e:
+            throttled = _status(e) == 429
+            KEYS.release(lease, throttled=throttled, quota=throttled and "insufficient_quota" in str(e), retry_in=retry_after(e))
+            raise
+        KEYS.release(lease)
+
+
+def _rerouted(err: BaseException) -> bool:
+    """True when a 429 drained a pool key and another one can take the retry now."""
+    return _status(err) == 429 and KEYS.available() > 0
+
+
+def retry_delay(err: BaseException, failures: int) -> Optional[float]:
+    """Seconds to wait before retrying after `failures` failed tries, or None to give up.
+
+    Gives up on non-transient errors, once `attempts` is reached, and when
+    the wait would outlast the reply deadline. A rate limit with another
+    pool key ready is retried at once.
+    """
+    if failures >= max(1, int(SETTINGS.attempts)) or not is_retryable(err):
+        return None
+    if _rerouted(err):
+        return 0.0
+    wait = retry_after(err)
+    wait = backoff(failures - 1) if wait is None else min(wait, SETTINGS.backoff_cap * 4)
+    dl = _DEADLINE.get()
+    if dl is not None and wait >= dl.remaining():
+        logger.info("openai-retry: retry in %.1fs would pass the reply deadline; giving up", wait)
+        return None
+    return wait
+
+
+async def call_with_retry(
+    fn: Callable[[float], Awaitable[T]],
+    *,
+    phase: str,
+    timeout: Optional[float] = None,
+    label: str = "",
+    priority: Optional[str] = None,
+) -> T:
+    """Await `fn(timeout)` with retries on transient errors.
+
+    Each attempt first takes an admission slot (`priority`, default: the
+    current message's class) and a pool key (`leased`). `fn` receives the timeout for that attempt
+    (phase timeout, or `timeout`, capped by the reply deadline) and should
+    pass it to the client; the attempt is also cancelled if it overruns.
+    A rate-limit pause (`Paced`) is waited out with the slot released and
+    does not count as a failure.
+    """
+    failures = 0
+    with pacing_scope():
+        while True:
+            try:
+                async with admitted(priority):
+                    t = phase_timeout(phase, timeout)
+                    with leased():
+                        return await asyncio.wait_for(fn(t), timeout=t + 1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                pause = paced_wait(e)
+                if pause is not None:
+                    await asyncio.sleep(pause)
+                    continue
+                failures += 1
+                wait = retry_delay(e, failures)
+                if wait is None:
+                    raise
+                logger.info("openai-retry: %s attempt %d failed; retrying in %.2fs err=%s", label or phase, failures, wait, e)
+                await asyncio.sleep(wait)
+
+
+async def wait_phase(aw: Awaitable[Any], phase: str, timeout: Optional[float] = None) -> Any:
+    """Await `aw` within the phase timeout (or `timeout`) and the deadline; overruns raise `TimeoutError`."""
+    try:
+        t = phase_timeout(phase, timeout)
+    except DeadlineExceeded:
+        close = getattr(aw, "close", None)
+        if close is not None:
+            close()  # never awaited
+        raise
+    try:
+        return await asyncio.wait_for(aw, timeout=max(0.0, t))
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"no {phase.replace('_', ' ')} event within {t:.1f}s") from None
@@ -0,0 +1,92 @@
+"""Lexical (BM25) retrieval over a channel's retained history.
+
+`BM25Index` is a small pure-Python inverted index keyed by message `seq`.
+`ChannelHistory` builds one on first search and then keeps it in step with
+appends and ring-buffer evictions, so it never holds more documents than the
+history itself.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Very common English/French words that carry no retrieval signal
+STOPWORDS = frozenset("""
+    a an and are as at be but by do for from has have he her his i if in is it its me my no not of on or our she so
+    that the their them they this to up was we were what when which who will with you your
+    au aux avec ce ces dans de des du elle en est et il ils je la le les leur lui ma mais me mes moi mon ne nous on ou
+    par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+    """.split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, dropping one-character tokens and stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class BM25Index:
+    """Incremental BM25 inverted index over documents keyed by integer id."""
+
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def terms(self) -> int:
+        return len(self._postings)
+
+    def add(self, doc_id: int, text: str) -> None:
+        if doc_id in self._lengths:
+            self.remove(doc_id)
+        toks = tokenize(text)
+        self._lengths[doc_id] = len(toks)
+        self._total += len(toks)
+        for term, tf in Counter(toks).items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: int, text: Optional[str] = None) -> None:
+        """Drop a document; pass its `text` to avoid scanning every posting list."""
+        n = self._lengths.pop(doc_id, None)
+        if n is None:
+            return
+        self._total -= n
+        terms: Iterable[str] = set(tokenize(text)) if text is not None else list(self._postings)
+        for term in terms:
+            plist = self._postings.get(term)
+            if plist is not None and plist.pop(doc_id, None) is not None and not plist:
+                del self._postings[term]
+
+    def search(self, query: str, k: int, *, exclude_from: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return up to `k` `(doc_id, score)` pairs, best first.
+
+        Documents with `doc_id >= exclude_from` are skipped (e.g., the recency
+        window already in the prompt).
+        """
+        if k <= 0 or not self._lengths:
+            return []
+        n = len(self._lengths)
+        avgdl = self._total / n if n else 0.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            plist = self._postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1.0 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for doc_id, tf in plist.items():
+                if exclude_from is not None and doc_id >= exclude_from:
+                    continue
+                dl = self._lengths[doc_id]
+                norm = tf * (self.k1 + 1.0) / (tf + self.k1 * (1.0 - self.b + self.b * dl / avgdl if avgdl else 1.0))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))[:k]
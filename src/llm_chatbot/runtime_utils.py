@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Tuple
+import math
+from typing import Any, Optional, Tuple
 
 # Optional dependency: discord.py. Guard import for test environments.
 try:  # pragma: no cover - exercised implicitly by imports
@@ -101,26 +102,72 @@ def _effective_model_and_params(
     return model, reasoning, verbosity
 
 
+# Output tokens reserved for reasoning by effort (GPT-5 counts reasoning against `max_output_tokens`)
+REASONING_HEADROOM = {"minimal": 256, "low": 1024, "medium": 4096, "high": 16384}
+# Conservative characters per token when turning a character cap into a token cap
+CAP_CHARS_PER_TOKEN = 3.0
+
+
+def _effective_reply_cap(personality: Personality, intervened: bool) -> Optional[int]:
+    """Return the reply character cap for this generation (None when uncapped)."""
+    cap = personality.listen.response_max_chars if intervened else personality.response_max_chars
+    return int(cap) if cap else None
+
+
+def _max_output_tokens(max_chars: Optional[int], reasoning: dict | None, override: Optional[int] = None) -> Optional[int]:
+    """Translate a reply character cap into a Responses `max_output_tokens` value.
+
+    Adds headroom for reasoning tokens so a capped reply is not cut off
+    before any visible text. `override` (persona `max_output_tokens`) wins.
+    """
+    if override:
+        return max(16, int(override))
+    if not max_chars:
+        return None
+    visible = math.ceil(int(max_chars) / CAP_CHARS_PER_TOKEN) + 16
+    effort = (reasoning or {}).get("effort")
+    return visible + REASONING_HEADROOM.get(effort, 0)
+
+
 async def _maybe_alert_owner(bot: Any, cfg: Config, store: MemoryStore, i18n: Any) -> None:
+    """DM the owner when spend crosses a budget threshold not yet alerted.
+
+    Billing is only re-recorded when an alert was sent (the per-period
+    last-alert marks changed); a reply with nothing to report writes nothing.
+    """
+    changed = False
     try:
         owner_id = cfg.owner_id
         if not owner_id:
             return
+        b = store.billing
+        thresholds = b.thresholds or (0.5, 0.8, 1.0)
+        due = []  # (locale key, threshold, spent, last-alert field)
+        if b.budget_daily_usd:
+            ratio = b.daily_usd / b.budget_daily_usd
+            due += [
+                ("cost_alert_daily", float(t), b.daily_usd, "last_daily_alert")
+                for t in thresholds
+                if ratio >= t and b.last_daily_alert < float(t)
+            ]
+        if b.budget_monthly_usd:
+            ratio = b.monthly_usd / b.budget_monthly_usd
+            due += [
+                ("cost_alert_monthly", float(t), b.monthly_usd, "last_monthly_alert")
+                for t in thresholds
+                if ratio >= t and b.last_monthly_alert < float(t)
+            ]
+        if not due:
+            return
         user = await bot.fetch_user(int(owner_id))
         if not user:
             return
-        thresholds = store.billing.thresholds or (0.5, 0.8, 1.0)
-        if store.billing.budget_daily_usd:
-            ratio = store.billing.daily_usd / store.billing.budget_daily_usd
-            for t in thresholds:
-                if ratio >= t and store.billing.last_daily_alert < float(t):
-                    await user.send(i18n.t("cost_alert_daily", ratio=int(t * 100), spent=f"${store.billing.daily_usd:.2f}"))
-                    store.billing.last_daily_alert = float(t)
-        if store.billing.budget_monthly_usd:
-            ratio = store.billing.monthly_usd / store.billing.budget_monthly_usd
-            for t in thresholds:
-                if ratio >= t and store.billing.last_monthly_alert < float(t):
-                    await user.send(i18n.t("cost_alert_monthly", ratio=int(t * 100), spent=f"${store.billing.monthly_usd:.2f}"))
-                    store.billing.last_monthly_alert = float(t)
+        for key, t, spent, field_name in due:
+            await user.send(i18n.t(key, ratio=int(t * 100), spent=f"${spent:.2f}"))
+            setattr(b, field_name, t)
+            changed = True
     except Exception:
         pass
+    finally:
+        if changed:
+            store.touch_billing(None)
@@ -0,0 +1,247 @@
+"""Admission scheduler for outbound LLM requests.
+
+All OpenAI calls acquire a slot from `SCHEDULER` before they are sent. At
+most `max_concurrency` run at once; the rest wait in per-priority queues:
+
+    direct (DMs, mentions) > trigger (word triggers) > listen > judge > background
+
+Classes are served strictly in that order. Within a class, flows (one per
+guild, or per DM peer) share the slots by weighted fair queuing: each
+request gets a virtual finish tag `max(vtime, flow_finish) + 1 / weight`
+and the smallest tag goes first, so one noisy guild cannot starve the
+others. Under overload the lowest-priority waiters are shed first (`Shed`),
+either when the queue is full or when they exceed their class's max wait.
+
+The priority and flow of the current message are carried in a context
+variable (`set_work`), so calls made while handling it are classed without
+threading arguments through every helper.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("direct", "trigger", "listen", "judge", "background")
+
+
+class Shed(Exception):
+    """A request was dropped by admission control (overload)."""
+
+    def __init__(self, priority: str, reason: str) -> None:
+        super().__init__(f"{priority} request shed: {reason}")
+        self.priority = priority
+        self.reason = reason
+
+
+def _default_max_wait() -> Dict[str, float]:
+    # Seconds a request may queue before it is shed (0: only the caller's timeout applies)
+    return {"direct": 0.0, "trigger": 30.0, "listen": 10.0, "judge": 5.0, "background": 30.0}
+
+
+@dataclass
+class SchedulerConfig:
+    """Concurrency cap, queue bound and fairness weights."""
+
+    max_concurrency: int = 0  # 0 disables admission control (calls go straight out)
+    max_queue: int = 64
+    max_wait: Dict[str, float] = field(default_factory=_default_max_wait)
+    weights: Dict[str, float] = field(default_factory=dict)  # flow -> weight (default 1.0)
+
+
+class _Ticket:
+    __slots__ = ("priority", "flow", "tag", "future", "enqueued")
+
+    def __init__(self, priority: int, flow: str, tag: float, future: "asyncio.Future[None]") -> None:
+        self.priority = priority
+        self.flow = flow
+        self.tag = tag
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class AdmissionScheduler:
+    """Strict-priority, weighted-fair admission with a global concurrency cap.
+
+    Bound to the first event loop that uses it; calls from other loops (CLI
+    helpers on the background runner) pass through unscheduled.
+    """
+
+    def __init__(self, config: Optional[SchedulerConfig] = None, window: int = 500) -> None:
+        self.config = config or SchedulerConfig()
+        self._queues: List[List[Tuple[float, int, _Ticket]]] = [[] for _ in PRIORITIES]
+        self._finish: Dict[str, float] = {}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.admitted: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self.shed: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self.max_depth = 0
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=window) for p in PRIORITIES}
+
+    def configure(self, config: SchedulerConfig) -> None:
+        self.config = config
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.max_concurrency > 0
+
+    def _live(self, p: int) -> List[_Ticket]:
+        return [t for _tag, _seq, t in self._queues[p] if not t.future.done()]
+
+    def depth(self) -> Dict[str, int]:
+        return {name: len(self._live(i)) for i, name in enumerate(PRIORITIES)}
+
+    def _record_wait(self, priority: str, seconds: float) -> None:
+        self._waits[priority].append(seconds * 1000.0)
+
+    def _shed(self, t: _Ticket, reason: str) -> None:
+        name = PRIORITIES[t.priority]
+        self.shed[name] += 1
+        if not t.future.done():
+            t.future.set_exception(Shed(name, reason))
+        logger.info("llm-sched: shed priority=%s flow=%s reason=%s", name, t.flow, reason)
+
+    def _make_room(self, p: int) -> bool:
+        """Evict the newest waiter of the lowest class below `p`; False if there is none."""
+        for q in range(len(PRIORITIES) - 1, p, -1):
+            live = self._live(q)
+            if live:
+                self._shed(max(live, key=lambda t: t.tag), "queue full")
+                return True
+        return False
+
+    def _dispatch(self) -> None:
+        cap = self.config.max_concurrency
+        for p, heap in enumerate(self._queues):
+            while heap and self.in_flight < cap:
+                _tag, _seq, t = heapq.heappop(heap)
+                if t.future.done():
+                    continue  # shed or cancelled while waiting
+                self.in_flight += 1
+                self._vtime = max(self._vtime, t.tag)
+                self.admitted[PRIORITIES[p]] += 1
+                self._record_wait(PRIORITIES[p], time.perf_counter() - t.enqueued)
+                t.future.set_result(None)
+            if self.in_flight >= cap:
+                return
+
+    async def acquire(self, priority: str, flow: str, timeout: Optional[float] = None) -> bool:
+        """Wait for a slot; returns False when admission control is bypassed.
+
+        Raises `Shed` if the request is dropped (queue full, or it waited
+        longer than its class's max wait or `timeout`).
+        """
+        if not self.enabled:
+            return False
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            return False
+        p = PRIORITIES.index(priority) if priority in PRIORITIES else len(PRIORITIES) - 1
+        name = PRIORITIES[p]
+        if self.in_flight < self.config.max_concurrency and not any(self._live(q) for q in range(p + 1)):
+            self.in_flight += 1
+            self.admitted[name] += 1
+            self._record_wait(name, 0.0)
+            return True
+        queued = sum(self.depth().values())
+        if queued >= self.config.max_queue and not self._make_room(p):
+            self.shed[name] += 1
+            logger.info("llm-sched: shed priority=%s flow=%s reason=queue full", name, flow)
+            raise Shed(name, "queue full")
+        weight = max(1e-6, float(self.config.weights.get(flow, 1.0)))
+        tag = max(self._vtime, self._finish.get(flow, 0.0)) + 1.0 / weight
+        self._finish[flow] = tag
+        t = _Ticket(p, flow, tag, loop.create_future())
+        heapq.heappush(self._queues[p], (tag, next(self._seq), t))
+        self.max_depth = max(self.max_depth, queued + 1)
+        limits = [x for x in (self.config.max_wait.get(name, 0.0), timeout) if x]
+        try:
+            await asyncio.wait_for(asyncio.shield(t.future), timeout=min(limits) if limits else None)
+        except asyncio.TimeoutError:
+            if t.future.done() and t.future.exception() is None:
+                return True  # admitted just as the wait ran out
+            t.future.cancel()
+            self.shed[name] += 1
+            logger.info("llm-sched: shed priority=%s flow=%s reason=waited %.1fs", name, flow, time.perf_counter() - t.enqueued)
+            raise Shed(name, "max wait") from None
+        except asyncio.CancelledError:
+            if t.future.done() and not t.future.cancelled() and t.future.exception() is None:
+                self.release()  # admitted, but the caller is gone
+            else:
+                t.future.cancel()
+            raise
+        return True
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        self._dispatch()
+
+    def _quantile(self, priority: str, q: float) -> Optional[float]:
+        xs = self._waits[priority]
+        if not xs:
+            return None
+        ordered = sorted(xs)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    def snapshot(self) -> dict:
+        depth = self.depth()
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.config.max_concurrency,
+            "max_depth": self.max_depth,
+            "classes": {
+                p: {
+                    "queued": depth[p],
+                    "admitted": self.admitted[p],
+                    "shed": self.shed[p],
+                    "wait_p50_ms": self._quantile(p, 0.5),
+                    "wait_p90_ms": self._quantile(p, 0.9),
+                }
+                for p in PRIORITIES
+            },
+        }
+
+
+SCHEDULER = AdmissionScheduler()
+
+
+def configure_scheduler(config: SchedulerConfig) -> None:
+    """Apply concurrency and fairness settings to the process-wide scheduler."""
+    SCHEDULER.configure(config)
+
+
+_WORK: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar("llm_chatbot_work", default=None)
+
+
+def set_work(priority: str, flow: str) -> None:
+    """Class the current task's LLM calls (see `start_deadline` for the task scoping)."""
+    _WORK.set((priority, flow))
+
+
+@asynccontextmanager
+async def admission(priority: Optional[str] = None, flow: Optional[str] = None, *, timeout: Optional[float] = None) -> AsyncIterator[None]:
+    """Hold a scheduler slot for the block; priority/flow default to `set_work`'s."""
+    work = _WORK.get()
+    p = priority or (work[0] if work else "background")
+    f = flow or (work[1] if work else "-")
+    held = await SCHEDULER.acquire(p, f, timeout)
+    try:
+        yield
+    finally:
+        if held:
+            SCHEDULER.release()
@@ -0,0 +1,258 @@
+"""Binary, memory-mapped snapshot format for the context store.
+
+Layout (little-endian)::
+
+    header   magic "LCKB", u16 version, u16 reserved,
+             u64 meta_off, u64 meta_len, u64 index_off, u64 index_len, u32 channels
+    records  per channel, consecutive `u32 length + UTF-8 JSON` message records
+    meta     JSON object: guild_settings, billing, billing_by_bot, rate_windows_by_bot,
+             and channel_meta (small per-channel state such as summaries and guild IDs)
+    index    per channel: u16 key length, key, u64 offset, u64 length,
+             u32 count, u32 turns, u64 first_seq
+
+`SnapshotReader` maps the file and parses only the header, meta, and index up
+front; a channel's records are decoded when it is first requested. Unchanged
+channels are copied byte-for-byte when a snapshot is rewritten.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+MAGIC = b"LCKB"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHQQQQI")
+_LEN = struct.Struct("<I")
+_ENTRY = struct.Struct("<QQIIQ")
+_KEYLEN = struct.Struct("<H")
+
+META_KEYS = ("guild_settings", "billing", "billing_by_bot", "rate_windows_by_bot")
+# Channel document fields kept in the meta block rather than the record stream
+CHANNEL_META_KEYS = ("summary", "guild")
+
+
+class IndexEntry(NamedTuple):
+    offset: int
+    length: int
+    count: int
+    turns: int
+    first_seq: int
+
+
+def is_snapshot(path: Path) -> bool:
+    """Return True when `path` starts with the binary snapshot magic."""
+    try:
+        with path.open("rb") as fh:
+            return fh.read(4) == MAGIC
+    except OSError:
+        return False
+
+
+def _encode_messages(messages: Iterable[dict]) -> Tuple[bytes, int]:
+    parts: List[bytes] = []
+    n = 0
+    for m in messages:
+        b = json.dumps(m, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        parts.append(_LEN.pack(len(b)))
+        parts.append(b)
+        n += 1
+    return b"".join(parts), n
+
+
+class SnapshotReader:
+    """Read-only view of a binary snapshot through `mmap`."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fh = path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._fh.close()
+            raise ValueError(f"empty snapshot: {path}")
+        magic, version, _r, meta_off, meta_len, index_off, index_len, n = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"not a context snapshot (v{VERSION}): {path}")
+        self.meta: dict = json.loads(self._mm[meta_off : meta_off + meta_len]) if meta_len else {}
+        self.index: Dict[str, IndexEntry] = {}
+        pos, end = index_off, index_off + index_len
+        while pos < end and len(self.index) < n:
+            (klen,) = _KEYLEN.unpack_from(self._mm, pos)
+            pos += _KEYLEN.size
+            key = self._mm[pos : pos + klen].decode("utf-8")
+            pos += klen
+            self.index[key] = IndexEntry(*_ENTRY.unpack_from(self._mm, pos))
+            pos += _ENTRY.size
+
+    def keys(self) -> List[str]:
+        return list(self.index)
+
+    def channel_meta(self, key: str) -> Optional[dict]:
+        return (self.meta.get("channel_meta") or {}).get(key)
+
+    def raw_records(self, key: str) -> bytes:
+        """Return the encoded record bytes for `key` (for verbatim copying)."""
+        e = self.index[key]
+        return self._mm[e.offset : e.offset + e.length]
+
+    def channel(self, key: str, limit: Optional[int] = None) -> Optional[dict]:
+        """Decode one channel (`turns`, `first_seq`, `messages`); only the last `limit` records are parsed."""
+        e = self.index.get(key)
+        if e is None:
+            return None
+        spans: List[Tuple[int, int]] = []
+        pos, end = e.offset, e.offset + e.length
+        while pos < end:
+            (ln,) = _LEN.unpack_from(self._mm, pos)
+            spans.append((pos + _LEN.size, ln))
+            pos += _LEN.size + ln
+        first_seq = e.first_seq
+        if limit is not None and len(spans) > limit:
+            first_seq += len(spans) - limit
+            spans = spans[len(spans) - limit :]
+        msgs = [json.loads(self._mm[p : p + ln]) for p, ln in spans]
+        doc = {"turns": e.turns, "first_seq": first_seq, "messages": msgs}
+        doc.update(self.channel_meta(key) or {})
+        return doc
+
+    def to_raw(self) -> dict:
+        """Decode everything into the JSON store layout."""
+        raw = {k: self.meta.get(k) or {} for k in META_KEYS}
+        raw["chats"] = {k: self.channel(k) for k in self.index}
+        return raw
+
+    def close(self) -> None:
+        try:
+            if getattr(self, "_mm", None) is not None:
+                self._mm.close()
+        finally:
+            self._mm = None  # type: ignore[assignment]
+            self._fh.close()
+
+
+ChannelSource = Union[dict, Tuple[bytes, IndexEntry, Optional[dict]]]
+
+
+def write_snapshot(path: Path, meta: dict, channels: Iterable[Tuple[str, ChannelSource]], *, fsync: bool = False) -> None:
+    """Atomically write a snapshot.
+
+    `channels` yields `(key, doc)` with a channel document, or
+    `(key, (record_bytes, entry, channel_meta))` to copy an unchanged channel verbatim.
+    """
+    temp = path.with_suffix(".tmp")
+    entries: List[Tuple[str, IndexEntry]] = []
+    channel_meta: Dict[str, dict] = {}
+    with temp.open("wb") as fh:
+        fh.write(b"\0" * _HEADER.size)
+        pos = _HEADER.size
+        for key, src in channels:
+            if isinstance(src, dict):
+                data, count = _encode_messages(src.get("messages") or [])
+                turns, first_seq = int(src.get("turns", 0) or 0), int(src.get("first_seq", 0) or 0)
+                cm = {k: src[k] for k in CHANNEL_META_KEYS if src.get(k)}
+            else:
+                data, old, cm = src
+                count, turns, first_seq = old.count, old.turns, old.first_seq
+            if cm:
+                channel_meta[str(key)] = cm
+            fh.write(data)
+            entries.append((str(key), IndexEntry(pos, len(data), count, turns, first_seq)))
+            pos += len(data)
+        meta_d = {k: meta.get(k) or {} for k in META_KEYS}
+        meta_d["channel_meta"] = channel_meta
+        meta_b = json.dumps(meta_d, ensure_ascii=False).encode("utf-8")
+        meta_off = pos
+        fh.write(meta_b)
+        pos += len(meta_b)
+        index_off = pos
+        idx = bytearray()
+        for key, e in entries:
+            kb = key.encode("utf-8")
+            idx += _KEYLEN.pack(len(kb)) + kb + _ENTRY.pack(*e)
+        fh.write(idx)
+        fh.seek(0)
+        fh.write(_HEADER.pack(MAGIC, VERSION, 0, meta_off, len(meta_b), index_off, len(idx), len(entries)))
+        if fsync:
+            fh.flush()
+            os.fsync(fh.fileno())
+    temp.replace(path)
+
+
+def json_to_snapshot(src: Path, dst: Path) -> int:
+    """Convert a JSON context store into a binary snapshot; return the channel count."""
+    raw = json.loads(src.read_text())
+    chats = raw.get("chats") or {}
+    write_snapshot(dst, raw, ((k, v) for k, v in chats.items()))
+    return len(chats)
+
+
+def snapshot_to_json(src: Path, dst: Path) -> int:
+    """Convert a binary snapshot back into the JSON store layout; return the channel count."""
+    from .config import write_json
+
+    reader = SnapshotReader(src)
+    try:
+        raw = reader.to_raw()
+    finally:
+        reader.close()
+    write_json(dst, raw)
+    return len(raw["chats"])
+
+
+_BENCH_CHILD = """
+import json, resource, sys, time, tracemalloc
+from pathlib import Path
+from llm_chatbot.config import read_json
+from llm_chatbot.snapshot import SnapshotReader
+kind, path, key = sys.argv[1], Path(sys.argv[2]), sys.argv[3]
+tracemalloc.start()
+t0 = time.perf_counter()
+if kind == "json":
+    raw = read_json(path)
+    ch = (raw.get("chats") or {}).get(key)
+else:
+    r = SnapshotReader(path)
+    ch = r.channel(key)
+load_ms = (time.perf_counter() - t0) * 1000.0
+peak_alloc = tracemalloc.get_traced_memory()[1]
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+print(json.dumps({"load_ms": load_ms, "peak_rss_kb": rss, "peak_alloc_kb": peak_alloc // 1024}))
+"""
+
+
+def benchmark(json_path: Path, snapshot_path: Path, key: Optional[str] = None, *, runs: int = 3) -> Dict[str, dict]:
+    """Compare `read_json` against the binary snapshot in fresh interpreters.
+
+    Each run loads the store (and one channel's history) in a child process and
+    reports wall time, process peak RSS, and the peak Python heap allocated
+    while loading; the best of `runs` is returned per format.
+    Requires the POSIX `resource` module.
+    """
+    if key is None:
+        reader = SnapshotReader(snapshot_path)
+        try:
+            key = next(iter(reader.index), "")
+        finally:
+            reader.close()
+    out: Dict[str, dict] = {}
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(Path(__file__).resolve().parents[1]), env.get("PYTHONPATH", "")])
+    for kind, p in (("json", json_path), ("binary", snapshot_path)):
+        best: Optional[dict] = None
+        for _ in range(max(1, runs)):
+            res = subprocess.run(
+                [sys.executable, "-c", _BENCH_CHILD, kind, str(p), key], capture_output=True, text=True, env=env, check=True
+            )
+            r = json.loads(res.stdout.strip().splitlines()[-1])
+            if best is None or r["load_ms"] < best["load_ms"]:
+                best = r
+        out[kind] = dict(best or {}, size_bytes=p.stat().st_size)
+    return out
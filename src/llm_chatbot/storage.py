@@ -0,0 +1,659 @@
+"""Pluggable persistence backends for `MemoryStore`.
+
+`MemoryStore` keeps the live state in memory and hands each save to a backend
+as a `WriteBatch` (mutation records plus the small rows they touched). The
+kit ships these backends:
+
+- `JsonBackend` (default): one JSON document, optionally in write-ahead
+  journal mode (see `journal.py`).
+- `SqliteBackend`: stdlib `sqlite3` in WAL mode with one table per concern;
+  channels load lazily and saves become row-level upserts batched into
+  transactions on a background writer thread.
+- `ShardedJsonBackend`: a directory with one JSON file per channel and guild.
+- `BinarySnapshotBackend`: one memory-mapped binary snapshot (see `snapshot.py`).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import read_json, write_json
+from .journal import RATE_EVENT_RETENTION_SECONDS, Journal, fold_journal, load_with_journal
+from .snapshot import CHANNEL_META_KEYS, META_KEYS, SnapshotReader, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteBatch:
+    """Changes accumulated since the previous save, prepared on the event loop.
+
+    Row payloads are already serialized so backends can apply them from a
+    worker thread without touching live store objects. The full JSON
+    snapshot is the exception: it is deferred to `snapshot()`, which only
+    reads stored message records (immutable) and cold-tier blobs.
+    """
+
+    records: List[dict] = field(default_factory=list)
+    # channel keys reset in this batch (applied before upserts)
+    deleted: List[str] = field(default_factory=list)
+    # channel key -> turns for channels upserted in this batch
+    channels: Dict[str, int] = field(default_factory=dict)
+    # channel key -> small per-channel state JSON (e.g., rolling summary) or None
+    channel_meta: Dict[str, Optional[str]] = field(default_factory=dict)
+    # channel key -> [(seq, role, content, extra_json)] appended since last save
+    messages: Dict[str, List[tuple]] = field(default_factory=dict)
+    guilds: Dict[str, str] = field(default_factory=dict)  # guild key -> settings JSON
+    billing: Dict[str, str] = field(default_factory=dict)  # bot key ("" = global) -> billing JSON
+    rate_events: List[tuple] = field(default_factory=list)  # (bot, dim, key, ts)
+    # channel key -> message dicts (with "seq") evicted from the ring buffer
+    archived: Dict[str, List[dict]] = field(default_factory=dict)
+    # Full retained channel documents / eager state (`needs_channel_docs` backends)
+    channel_docs: Dict[str, dict] = field(default_factory=dict)
+    meta: Optional[dict] = None
+    reset_all: bool = False
+    # Builds the consistent raw snapshot for backends that rewrite everything (`needs_snapshot`);
+    # captured on the loop, called by the backend so the encoding happens on its thread
+    snapshot: Optional[Callable[[], dict]] = None
+    # Ask the backend to make this write durable (fsync) before returning
+    fsync: bool = False
+    # Called once the batch has been applied (see `write_batch`); may run on a worker thread
+    on_written: Optional[Callable[[], None]] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.records or self.channels or self.deleted or self.guilds or self.billing or self.reset_all)
+
+
+class StorageBackend:
+    """Interface implemented by persistence backends."""
+
+    #: When True, `load()` omits chats and `load_channel()` is used on demand.
+    lazy: bool = False
+    #: When True, each `WriteBatch` must carry a full `snapshot`.
+    needs_snapshot: bool = False
+    #: When True, batches carry full documents for changed channels and eager state.
+    needs_channel_docs: bool = False
+    #: When True, `write()` only queues the batch and the backend calls `on_written` itself.
+    defers_writes: bool = False
+
+    def load(self) -> dict:
+        """Return raw state (`guild_settings`, `billing`, `billing_by_bot`, `rate_windows_by_bot`, and `chats` if eager)."""
+        raise NotImplementedError
+
+    def load_channel(self, key: str, limit: Optional[int] = None) -> Optional[dict]:
+        """Return `{"turns": int, "first_seq": int, "messages": [...]}` for one channel, or None."""
+        return None
+
+    def write(self, batch: WriteBatch) -> None:
+        """Persist a batch of changes."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Block until previously written batches are on disk."""
+
+    def close(self) -> None:
+        """Flush and release resources."""
+        self.flush()
+
+
+def write_batch(backend: StorageBackend, batch: WriteBatch) -> None:
+    """Write `batch` and, for backends that apply it synchronously, fire its `on_written` callback."""
+    backend.write(batch)
+    if not getattr(backend, "defers_writes", False) and batch.on_written is not None:
+        batch.on_written()
+
+
+def _safe_name(key: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_.-]", "_", str(key))
+
+
+def _append_archive(d: Path, archived: Dict[str, List[dict]]) -> None:
+    """Append evicted messages to per-channel JSONL files (archive tier)."""
+    if not archived:
+        return
+    d.mkdir(parents=True, exist_ok=True)
+    for key, msgs in archived.items():
+        with (d / f"{_safe_name(key)}.jsonl").open("a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(m, ensure_ascii=False, separators=(",", ":")) + "\n" for m in msgs))
+
+
+class JsonBackend(StorageBackend):
+    """Single JSON document, rewritten atomically or journaled (write-ahead)."""
+
+    def __init__(self, path: Path, *, journal: bool = False, journal_fsync: bool = False) -> None:
+        self.path = path
+        self.journal: Optional[Journal] = Journal(path, fsync=journal_fsync) if journal else None
+        self.needs_snapshot = self.journal is None
+
+    def load(self) -> dict:
+        raw = load_with_journal(self.path) if self.journal is not None else read_json(self.path)
+        return raw if isinstance(raw, dict) else {}
+
+    @property
+    def archive_dir(self) -> Path:
+        return self.path.with_suffix(".archive")
+
+    def write(self, batch: WriteBatch) -> None:
+        _append_archive(self.archive_dir, batch.archived)
+        if self.journal is not None:
+            for rec in batch.records:
+                self.journal.append(rec)
+            self.journal.flush(fsync=batch.fsync or None)
+            return
+        if batch.snapshot is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_json(self.path, batch.snapshot(), fsync=batch.fsync)
+
+    def seal_journal(self) -> bool:
+        return self.journal.seal() if self.journal is not None else False
+
+    def fold_journal(self) -> int:
+        return fold_journal(self.path, time.time()) if self.journal is not None else 0
+
+    def journal_records(self) -> int:
+        return self.journal.records if self.journal is not None else 0
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    turns INTEGER NOT NULL DEFAULT 0,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS channel_messages (
+    channel_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    extra TEXT,
+    PRIMARY KEY (channel_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS billing (
+    bot_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_events (
+    bot_id TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rate_events_lookup ON rate_events (bot_id, dim, key, ts);
+CREATE INDEX IF NOT EXISTS rate_events_ts ON rate_events (ts);
+"""
+
+
+def _message_row(seq: int, m: dict) -> tuple:
+    extra = {k: v for k, v in m.items() if k not in ("role", "content")}
+    return (seq, str(m.get("role", "user")), str(m.get("content", "")), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _message_from_row(role: str, content: str, extra: Optional[str]) -> dict:
+    m = {"role": role, "content": content}
+    if extra:
+        try:
+            m.update(json.loads(extra))
+        except Exception:
+            pass
+    return m
+
+
+# Longest pause between retries of a failed SQLite transaction, and retries left at close
+SQLITE_RETRY_CAP = 5.0
+SQLITE_CLOSE_RETRIES = 5
+
+
+class SqliteBackend(StorageBackend):
+    """SQLite (WAL) backend with lazy channel loads and a background writer."""
+
+    lazy = True
+    defers_writes = True
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Reader connection used from the event loop thread
+        self._read = self._connect()
+        self._read.executescript(_SCHEMA)
+        cols = {r[1] for r in self._read.execute("PRAGMA table_info(channels)")}
+        if "meta" not in cols:  # databases created before per-channel state existed
+            self._read.execute("ALTER TABLE channels ADD COLUMN meta TEXT")
+        self._queue: "queue.Queue[Optional[WriteBatch]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="llm-chatbot-sqlite", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load(self) -> dict:
+        cur = self._read
+        raw: dict = {"guild_settings": {}, "billing_by_bot": {}, "rate_windows_by_bot": {}}
+        for gid, data in cur.execute("SELECT guild_id, data FROM guild_settings"):
+            raw["guild_settings"][gid] = json.loads(data)
+        for bot_id, data in cur.execute("SELECT bot_id, data FROM billing"):
+            if bot_id == "":
+                raw["billing"] = json.loads(data)
+            else:
+                raw["billing_by_bot"][bot_id] = json.loads(data)
+        cutoff = time.time() - RATE_EVENT_RETENTION_SECONDS
+        for bot_id, dim, key, ts in cur.execute(
+            "SELECT bot_id, dim, key, ts FROM rate_events WHERE ts >= ? ORDER BY bot_id, dim, key, ts", (cutoff,)
+        ):
+            raw["rate_windows_by_bot"].setdefault(bot_id, {}).setdefault(dim, {}).setdefault(key, []).append(ts)
+        return raw
+
+    def load_channel(self, key: str, limit: Optional[int] = None) -> Optional[dict]:
+        row = self._read.execute("SELECT turns, meta FROM channels WHERE channel_id = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        # Rows older than the retention cap stay in the table as the archive tier
+        rows = self._read.execute(
+            "SELECT seq, role, content, extra FROM channel_messages WHERE channel_id = ? ORDER BY seq DESC LIMIT ?",
+            (key, int(limit) if limit else -1),
+        ).fetchall()
+        rows.reverse()
+        msgs = []
+        for seq, role, content, extra in rows:
+            m = _message_from_row(role, content, extra)
+            m["seq"] = seq
+            msgs.append(m)
+        doc = {"turns": int(row[0]), "first_seq": rows[0][0] if rows else 0, "messages": msgs}
+        if row[1]:
+            doc.update(json.loads(row[1]))
+        return doc
+
+    def write(self, batch: WriteBatch) -> None:
+        if batch:
+            self._queue.put(batch)
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self.flush()
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+        try:
+            self._read.close()
+        except Exception:
+            pass
+
+    def _take(self, block: bool, timeout: float) -> Tuple[List[WriteBatch], bool]:
+        """Queued batches to write together, and whether `close()` asked the writer to stop."""
+        try:
+            first = self._queue.get(timeout=None if block else timeout)
+        except queue.Empty:
+            return [], False
+        batches: List[WriteBatch] = []
+        nxt: Optional[WriteBatch] = first
+        while nxt is not None:
+            batches.append(nxt)
+            try:
+                nxt = self._queue.get_nowait()
+            except queue.Empty:
+                return batches, False
+        self._queue.task_done()  # the stop sentinel
+        return batches, True
+
+    def _commit(self, conn: sqlite3.Connection, batches: List[WriteBatch]) -> bool:
+        try:
+            conn.execute("PRAGMA synchronous=%s" % ("FULL" if any(b.fsync for b in batches) else "NORMAL"))
+            conn.execute("BEGIN")
+            for b in batches:
+                self._apply(conn, b)
+            conn.execute("COMMIT")
+        except Exception:
+            logger.exception("store: sqlite write failed; rolled back %d batch(es), keeping them for retry", len(batches))
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            return False
+        for b in batches:
+            if b.on_written is not None:
+                b.on_written()
+        return True
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        # Batches of a rolled-back transaction: their records were already drained
+        # from the store, so they are retried (ahead of newer batches) until written
+        failed: List[WriteBatch] = []
+        retries = 0
+        while True:
+            new, stop = self._take(block=not failed, timeout=min(SQLITE_RETRY_CAP, 0.1 * 2**retries))
+            batches = failed + new
+            if batches and self._commit(conn, batches):
+                failed, retries = [], 0
+            elif batches:
+                failed, retries = batches, retries + 1
+            for _ in new:
+                self._queue.task_done()
+            if stop:
+                for attempt in range(SQLITE_CLOSE_RETRIES):
+                    if not failed:
+                        break
+                    time.sleep(min(SQLITE_RETRY_CAP, 0.1 * 2**attempt))
+                    if self._commit(conn, failed):
+                        failed = []
+                if failed:
+                    logger.error("store: sqlite writer stopped with %d unwritten batch(es)", len(failed))
+                break
+        conn.close()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, b: WriteBatch) -> None:
+        if b.reset_all:
+            conn.execute("DELETE FROM channel_messages")
+            conn.execute("DELETE FROM channels")
+        for key in b.deleted:
+            conn.execute("DELETE FROM channel_messages WHERE channel_id = ?", (key,))
+            conn.execute("DELETE FROM channels WHERE channel_id = ?", (key,))
+        for key, turns in b.channels.items():
+            conn.execute(
+                "INSERT INTO channels (channel_id, turns, meta) VALUES (?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET turns = excluded.turns, meta = excluded.meta",
+                (key, turns, b.channel_meta.get(key)),
+            )
+        for key, rows in b.messages.items():
+            conn.executemany(
+                "INSERT OR REPLACE INTO channel_messages (channel_id, seq, role, content, extra) VALUES (?, ?, ?, ?, ?)",
+                [(key,) + r for r in rows],
+            )
+        for gid, data in b.guilds.items():
+            conn.execute(
+                "INSERT INTO guild_settings (guild_id, data) VALUES (?, ?) ON CONFLICT(guild_id) DO UPDATE SET data = excluded.data",
+                (gid, data),
+            )
+        for bot_id, data in b.billing.items():
+            conn.execute(
+                "INSERT INTO billing (bot_id, data) VALUES (?, ?) ON CONFLICT(bot_id) DO UPDATE SET data = excluded.data",
+                (bot_id, data),
+            )
+        if b.rate_events:
+            conn.executemany("INSERT INTO rate_events (bot_id, dim, key, ts) VALUES (?, ?, ?, ?)", b.rate_events)
+            conn.execute("DELETE FROM rate_events WHERE ts < ?", (time.time() - RATE_EVENT_RETENTION_SECONDS,))
+
+
+class ShardedJsonBackend(StorageBackend):
+    """Directory of small JSON shards with a manifest; channels load lazily.
+
+    Layout under `path` (a directory)::
+
+        manifest.json        channel and guild keys
+        state.json           billing, per-bot billing, rate windows (eager)
+        guilds/<id>.json     one file per guild (eager, small)
+        channels/<id>.json   one file per channel (lazy)
+        archive/<id>.jsonl   messages evicted from the retention window
+
+    Saves rewrite only the shards that changed.
+    """
+
+    lazy = True
+    needs_channel_docs = True
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._channels: set = set()
+        self._guilds: set = set()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.path / "manifest.json"
+
+    def _channel_path(self, key: str) -> Path:
+        return self.path / "channels" / f"{_safe_name(key)}.json"
+
+    def _guild_path(self, key: str) -> Path:
+        return self.path / "guilds" / f"{_safe_name(key)}.json"
+
+    def load(self) -> dict:
+        manifest = read_json(self.manifest_path)
+        self._channels = set(map(str, manifest.get("channels", []) or []))
+        self._guilds = set(map(str, manifest.get("guilds", []) or []))
+        raw = read_json(self.path / "state.json")
+        raw["guild_settings"] = {g: read_json(self._guild_path(g)) for g in self._guilds}
+        return raw
+
+    def channel_keys(self) -> List[str]:
+        return sorted(self._channels)
+
+    def load_channel(self, key: str, limit: Optional[int] = None) -> Optional[dict]:
+        if key not in self._channels:
+            return None
+        doc = read_json(self._channel_path(key))
+        return doc or None
+
+    def write(self, batch: WriteBatch) -> None:
+        _append_archive(self.path / "archive", batch.archived)
+        changed = False
+        if batch.reset_all:
+            for key in list(self._channels):
+                self._channel_path(key).unlink(missing_ok=True)
+            self._channels.clear()
+            changed = True
+        for key in batch.deleted:
+            self._channel_path(key).unlink(missing_ok=True)
+            if key in self._channels:
+                self._channels.discard(key)
+                changed = True
+        if batch.channel_docs:
+            (self.path / "channels").mkdir(parents=True, exist_ok=True)
+        for key, doc in batch.channel_docs.items():
+            write_json(self._channel_path(key), doc, fsync=batch.fsync)
+            if key not in self._channels:
+                self._channels.add(key)
+                changed = True
+        if batch.guilds:
+            (self.path / "guilds").mkdir(parents=True, exist_ok=True)
+        for gid, data in batch.guilds.items():
+            write_json(self._guild_path(gid), json.loads(data), fsync=batch.fsync)
+            if gid not in self._guilds:
+                self._guilds.add(gid)
+                changed = True
+        if batch.meta is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            write_json(self.path / "state.json", batch.meta, fsync=batch.fsync)
+        if changed:
+            self.path.mkdir(parents=True, exist_ok=True)
+            write_json(
+                self.manifest_path,
+                {"version": 1, "channels": sorted(self._channels), "guilds": sorted(self._guilds)},
+                fsync=batch.fsync,
+            )
+
+
+class BinarySnapshotBackend(StorageBackend):
+    """Single binary snapshot file read through `mmap` (see `snapshot.py`).
+
+    Guild settings, billing, and rate windows are decoded at startup; a
+    channel's records are decoded only when it is first requested. Saves
+    rewrite the snapshot, re-encoding changed channels and copying the bytes
+    of unchanged ones from the current mapping.
+    """
+
+    lazy = True
+    needs_channel_docs = True
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._reader: Optional[SnapshotReader] = None
+        self._meta: dict = {}
+        # `write` (writer thread) swaps readers while the loop may be decoding a
+        # channel from the old mapping: readers are leased, and a replaced one is
+        # closed only once its last lease is returned.
+        self._lock = threading.Lock()
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, SnapshotReader] = {}
+
+    def _open(self) -> None:
+        reader = SnapshotReader(self.path) if self.path.exists() and self.path.stat().st_size else None
+        with self._lock:
+            old, self._reader = self._reader, reader
+            if reader is not None:
+                self._meta = dict(reader.meta)
+            if old is not None and self._leases.get(id(old)):
+                self._retired[id(old)] = old
+                old = None
+        if old is not None:
+            old.close()
+
+    def _acquire(self) -> Optional[SnapshotReader]:
+        with self._lock:
+            reader = self._reader
+            if reader is not None:
+                self._leases[id(reader)] = self._leases.get(id(reader), 0) + 1
+            return reader
+
+    def _release(self, reader: SnapshotReader) -> None:
+        with self._lock:
+            n = self._leases.pop(id(reader)) - 1
+            if n:
+                self._leases[id(reader)] = n
+                return
+            reader = self._retired.pop(id(reader), None)
+        if reader is not None:
+            reader.close()
+
+    def _close_reader(self) -> None:
+        with self._lock:
+            old, self._reader = self._reader, None
+            retired, self._retired = list(self._retired.values()), {}
+        for r in [old, *retired]:
+            if r is not None:
+                r.close()
+
+    def load(self) -> dict:
+        self._open()
+        with self._lock:
+            return {k: self._meta.get(k) or {} for k in META_KEYS}
+
+    def load_channel(self, key: str, limit: Optional[int] = None) -> Optional[dict]:
+        reader = self._acquire()
+        if reader is None:
+            return None
+        try:
+            return reader.channel(key, limit)
+        finally:
+            self._release(reader)
+
+    def write(self, batch: WriteBatch) -> None:
+        _append_archive(self.path.with_suffix(".archive"), batch.archived)
+        if not (batch.channel_docs or batch.deleted or batch.reset_all or batch.guilds or batch.meta is not None):
+            return
+        with self._lock:
+            gs = self._meta.setdefault("guild_settings", {})
+            for gid, data in batch.guilds.items():
+                gs[gid] = json.loads(data)
+            if batch.meta is not None:
+                self._meta.update(batch.meta)
+            meta = self._meta
+        reader = self._acquire()
+        dropped = set(batch.deleted)
+
+        def channels():
+            if reader is not None and not batch.reset_all:
+                for key in reader.keys():
+                    if key in batch.channel_docs or key in dropped:
+                        continue
+                    yield key, (reader.raw_records(key), reader.index[key], reader.channel_meta(key))
+            yield from batch.channel_docs.items()
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_snapshot(self.path, meta, channels(), fsync=batch.fsync)
+        finally:
+            if reader is not None:
+                self._release(reader)
+        self._open()
+
+    def close(self) -> None:
+        self._close_reader()
+
+
+def _import_batch(raw: dict) -> WriteBatch:
+    """Build a full-import `WriteBatch` from a raw JSON store document."""
+    batch = WriteBatch(reset_all=True)
+    for key, ch in (raw.get("chats") or {}).items():
+        key = str(key)
+        msgs = [m for m in (ch.get("messages") or []) if isinstance(m, dict)]
+        first_seq = int(ch.get("first_seq", 0) or 0)
+        batch.channels[key] = int(ch.get("turns", 0) or 0)
+        batch.messages[key] = [_message_row(first_seq + i, m) for i, m in enumerate(msgs)]
+        meta = {k: ch[k] for k in CHANNEL_META_KEYS if ch.get(k)}
+        batch.channel_meta[key] = json.dumps(meta, ensure_ascii=False) if meta else None
+        batch.channel_docs[key] = dict(meta, turns=batch.channels[key], first_seq=first_seq, messages=msgs)
+    for gid, gs in (raw.get("guild_settings") or {}).items():
+        batch.guilds[str(gid)] = json.dumps(gs, ensure_ascii=False)
+    if raw.get("billing"):
+        batch.billing[""] = json.dumps(raw["billing"], ensure_ascii=False)
+    for bot_id, b in (raw.get("billing_by_bot") or {}).items():
+        batch.billing[str(bot_id)] = json.dumps(b, ensure_ascii=False)
+    for bot_id, dims in (raw.get("rate_windows_by_bot") or {}).items():
+        for dim, keys in (dims or {}).items():
+            for key, stamps in (keys or {}).items():
+                batch.rate_events.extend((str(bot_id), dim, str(key), float(t)) for t in stamps)
+    batch.meta = {
+        "billing": raw.get("billing") or {},
+        "billing_by_bot": raw.get("billing_by_bot") or {},
+        "rate_windows_by_bot": raw.get("rate_windows_by_bot") or {},
+    }
+    return batch
+
+
+def migrate_json_store(src: Path, dst: Path, kind: str = "sqlite") -> dict:
+    """Import an existing `context.json` store into a `sqlite`, `sharded`, or `binary` backend.
+
+    Returns counts of imported channels, messages, guilds, and billing rows.
+    """
+    raw = read_json(src)
+    backend = open_backend(kind, dst)
+    if backend.lazy is False:
+        raise ValueError(f"cannot migrate into backend {kind!r}")
+    if isinstance(backend, (ShardedJsonBackend, BinarySnapshotBackend)):
+        backend.load()
+    batch = _import_batch(raw)
+    backend.write(batch)
+    backend.close()
+    n_msgs = sum(len(rows) for rows in batch.messages.values())
+    return {"channels": len(batch.channels), "messages": n_msgs, "guilds": len(batch.guilds), "billing": len(batch.billing)}
+
+
+def migrate_json_to_sqlite(src: Path, dst: Path) -> dict:
+    """Import an existing `context.json` store into a SQLite database."""
+    return migrate_json_store(src, dst, "sqlite")
+
+
+def open_backend(kind: str, path: Path, *, journal: bool = False, journal_fsync: bool = False) -> StorageBackend:
+    """Return the storage backend named by `kind` (`json`, `sqlite`, `sharded`, or `binary`)."""
+    k = (kind or "json").lower()
+    if k == "sqlite":
+        return SqliteBackend(path)
+    if k == "sharded":
+        return ShardedJsonBackend(path)
+    if k == "binary":
+        return BinarySnapshotBackend(path)
+    if k != "json":
+        logger.warning("store: unknown backend %r; using json", kind)
+    return JsonBackend(path, journal=journal, journal_fsync=journal_fsync)
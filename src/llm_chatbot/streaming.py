@@ -1,8 +1,8 @@
 """Streaming helpers for human-like bursts to Discord.
 
 This module exposes two primitives:
-- `stream_deltas`: bridges OpenAI Responses streaming into an async iterator of
-  text deltas, returning immediately for true streaming.
+- `stream_deltas`: bridges OpenAI Responses async streaming into a bounded
+  async iterator of text deltas, returning immediately for true streaming.
 - `send_stream_as_messages`: consumes deltas and emits natural message bursts
   (first ASAP, then ~2 lines), while keeping the typing indicator and handling
   Discord constraints.
@@ -15,12 +15,18 @@ import logging
 import random
 import re
 import time
-from typing import Any, AsyncIterator, Dict, List, Optional
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple, Union
 
 import discord
 from discord.errors import HTTPException
 
+from .breaker import BREAKERS
+from .clients import get_async_client
+from .history import estimate_tokens
+from .keys import note_usage
 from .logging_setup import get_trace_openai_mode
+from .resilience import admitted, leased, paced_wait, pacing_scope, phase_timeout, retry_delay, wait_phase
 
 # Boundaries where we prefer to flush chunks
 BOUNDARY_NEWLINES = re.compile(r"\n+")
@@ -28,39 +34,326 @@ logger = logging.getLogger(__name__)
 BOUNDARY_PUNCT_WS = re.compile(r"(?<=[.!?…])\s+")
 
 
+_END = object()
+
+
 class DeltaStream:
     """Async iterator that carries text deltas and final usage.
 
-    The producer thread writes string chunks to an internal queue and finally
-    `None` to signal completion; consumers iterate asynchronously. The final
-    token usage (input, output, cached_input) is exposed via the `usage` field
-    once known.
+    A producer coroutine (one task per stream, see `stream_deltas`) awaits
+    `put()` for each chunk and `finish()` at the end. The queue is bounded:
+    when the consumer falls behind, the producer stops reading the upstream
+    response until there is room. A producer error is re-raised to the
+    consumer by `__anext__`. `aclose()` cancels the producer, which closes
+    the upstream HTTP stream. The final token usage (input, output,
+    cached_input) is exposed via the `usage` field once known, and the
+    Responses `id` via `response_id`; a stream closed early has neither, see
+    `estimated_usage()`.
     """
 
-    def __init__(self) -> None:
-        self.q: asyncio.Queue[str | None] = asyncio.Queue()
+    def __init__(self, maxsize: int = 64, *, input_tokens_est: int = 0, model: str = "") -> None:
+        self.q: asyncio.Queue[object] = asyncio.Queue(maxsize=max(1, int(maxsize)))
         self.usage: tuple[int, int, int] | None = None  # (input, output, cached_input)
-
-    def put(self, s: str) -> None:
-        """Enqueue a text delta (non-empty string)."""
-        self.q.put_nowait(s)
-
-    def close(self) -> None:
-        """Signal end-of-stream to consumers."""
-        self.q.put_nowait(None)
+        self.response_id: Optional[str] = None  # set once the response completes
+        self.error: BaseException | None = None
+        self.aborted = False  # closed before the response completed
+        self.received_chars = 0  # text pulled from upstream (including buffered, unconsumed deltas)
+        self.input_tokens_est = int(input_tokens_est)
+        self.model = model  # model that produced the text (the winner when hedged)
+        self.ttft: Optional[float] = None  # seconds from request to first delta
+        self.hedged = False  # a second request was started
+        self.hedge_usage: List[Tuple[str, Tuple[int, int, int]]] = []  # (model, estimated usage) of cancelled requests
+        self._started = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+        self._done = False
+
+    async def put(self, s: str) -> None:
+        """Enqueue a text delta, waiting while the buffer is full."""
+        if s:
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self._started
+                if self.model:
+                    TTFT.record(self.model, self.ttft)
+            self.received_chars += len(s)
+            await self.q.put(s)
+
+    async def finish(self, error: BaseException | None = None) -> None:
+        """Signal end-of-stream (optionally with the producer's error) to consumers."""
+        self.error = error
+        await self.q.put(_END)
 
     def set_usage(self, usage: tuple[int, int, int]) -> None:
         """Attach usage info after the final response is available."""
         self.usage = usage
 
+    def attach(self, task: asyncio.Task) -> None:
+        """Bind the producer task so `aclose()` can cancel it."""
+        self._task = task
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def estimated_usage(self) -> tuple[int, int, int]:
+        """Return final usage, or an estimate from text received so far when closed early."""
+        if self.usage is not None:
+            return self.usage
+        return self.input_tokens_est, (self.received_chars + 3) // 4, 0
+
+    async def aclose(self) -> None:
+        """Stop the producer (closing the upstream stream) and end iteration."""
+        self._done = True
+        task = self._task
+        if task is not None and not task.done():
+            self.aborted = True
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+
+    async def __aenter__(self) -> "DeltaStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
     def __aiter__(self):
         return self
 
     async def __anext__(self) -> str:
+        if self._done:
+            raise StopAsyncIteration
         item = await self.q.get()
-        if item is None:
+        if item is _END:
+            self._done = True
+            if self.error is not None:
+                raise self.error
             raise StopAsyncIteration
-        return item
+        return item  # type: ignore[return-value]
+
+
+class TtftStats:
+    """Rolling time-to-first-token samples per model, for picking hedge delays."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.window = int(window)
+        self.min_samples = int(min_samples)
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float) -> None:
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(float(seconds))
+
+    def quantile(self, model: str, q: float = 0.9) -> Optional[float]:
+        """Return the `q` quantile in seconds, or None until `min_samples` are known."""
+        xs = self._samples.get(model)
+        if not xs or len(xs) < self.min_samples:
+            return None
+        ordered = sorted(xs)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {m: {"n": len(xs), "p50": self.quantile(m, 0.5), "p90": self.quantile(m, 0.9)} for m, xs in self._samples.items()}
+
+
+TTFT = TtftStats()
+
+# Hedge delay used by `hedge_after="auto"` until a model has enough TTFT samples
+DEFAULT_HEDGE_AFTER = 3.0
+
+
+def _stream_kwargs(
+    model: str,
+    input_items: List[Dict[str, Any]],
+    reasoning: Optional[Dict[str, Any]],
+    verbosity: Optional[str],
+    truncation: Optional[str],
+    max_output_tokens: Optional[int],
+    previous_response_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"model": model, "input": input_items}
+    supports = model.startswith("gpt-5") and model != "gpt-5-chat-latest"
+    # Reasoning and text.verbosity only for GPT-5 models except chat-latest
+    if reasoning is not None and supports:
+        kwargs["reasoning"] = reasoning
+    if verbosity is not None and supports:
+        kwargs["text"] = {"format": {"type": "text"}, "verbosity": verbosity}
+    if truncation:
+        kwargs["truncation"] = truncation
+    if max_output_tokens:
+        kwargs["max_output_tokens"] = int(max_output_tokens)
+    if previous_response_id:
+        kwargs["previous_response_id"] = previous_response_id
+    return kwargs
+
+
+async def _read_stream(stream_obj: DeltaStream, client: Any, kwargs: Dict[str, Any]) -> Any:
+    """Forward one Responses stream's text deltas; return the final response.
+
+    The stream must open and produce its first delta within the first-token
+    timeout, and later events may not be further apart than the idle timeout.
+    """
+    first_by = time.monotonic() + phase_timeout("first_token")
+    manager = client.responses.stream(**kwargs)
+    stream = await wait_phase(manager.__aenter__(), "first_token")
+    try:
+        events = stream.__aiter__()
+        while True:
+            if stream_obj.ttft is None:
+                wait = wait_phase(events.__anext__(), "first_token", first_by - time.monotonic())
+            else:
+                wait = wait_phase(events.__anext__(), "idle")
+            try:
+                event = await wait
+            except StopAsyncIteration:
+                break
+            if event.type == "response.output_text.delta":
+                await stream_obj.put(event.delta or "")
+        final = await wait_phase(stream.get_final_response(), "idle")
+    except BaseException as e:
+        await manager.__aexit__(type(e), e, e.__traceback__)
+        raise
+    await manager.__aexit__(None, None, None)
+    return final
+
+
+async def _produce(stream_obj: DeltaStream, api_key: str, kwargs: Dict[str, Any], timeout: Optional[float]) -> None:
+    """Read one Responses stream into `stream_obj` (runs as that stream's task)."""
+    model = kwargs["model"]
+    started = time.perf_counter()
+    failures = 0
+    with pacing_scope():
+        while True:
+            try:
+                async with admitted():
+                    with leased():
+                        final = await _read_stream(stream_obj, get_async_client(api_key, timeout=timeout), kwargs)
+                        usage = getattr(final, "usage", None)
+                        note_usage((int(getattr(usage, "input_tokens", 0) or 0), int(getattr(usage, "output_tokens", 0) or 0)))
+                break
+            except asyncio.CancelledError:
+                raise  # consumer closed the stream; leaving the context closed the HTTP response
+            except Exception as e:
+                pause = paced_wait(e)
+                if pause is not None:  # rate-limit pause, taken before the first-token clock restarts
+                    await asyncio.sleep(pause)
+                    continue
+                failures += 1
+                # Retry only before any text reached the consumer, else the reply would repeat itself
+                wait = retry_delay(e, failures) if stream_obj.ttft is None else None
+                if wait is None:
+                    BREAKERS.failure(model, "responses", e)
+                    await stream_obj.finish(e)
+                    return
+                logger.info("openai-retry: stream model=%s attempt %d failed; retrying in %.2fs err=%s", model, failures, wait, e)
+                await asyncio.sleep(wait)
+    BREAKERS.success(model, "responses")
+    try:
+        usage = getattr(final, "usage", None)
+        it = int(getattr(usage, "input_tokens", 0) or 0)
+        ot = int(getattr(usage, "output_tokens", 0) or 0)
+        cit = int(getattr(usage, "cache_creation_input_tokens", 0) or 0)
+        stream_obj.set_usage((it, ot, cit))
+        stream_obj.response_id = getattr(final, "id", None)
+        if get_trace_openai_mode() != "off":
+            dur_ms = int((time.perf_counter() - started) * 1000)
+            rid = getattr(final, "id", None)
+            logger.info(
+                "trace-openai: path=%s model=%s latency_ms=%d input=%d output=%d cached=%d req_id=%s",
+                "responses.stream",
+                model,
+                dur_ms,
+                it,
+                ot,
+                cit,
+                str(rid) if rid is not None else "",
+                extra={
+                    "trace": {
+                        "type": "openai",
+                        "mode": "meta",
+                        "path": "responses.stream",
+                        "phase": "chat",
+                        "model": model,
+                        "latency_ms": dur_ms,
+                        "request_id": rid,
+                        "usage": {"input": it, "output": ot, "cached": cit},
+                    }
+                },
+            )
+    except Exception:
+        stream_obj.set_usage((0, 0, 0))
+    await stream_obj.finish()
+
+
+async def _first_delta(ds: DeltaStream) -> Tuple[DeltaStream, Optional[str], Optional[BaseException]]:
+    try:
+        return ds, await ds.__anext__(), None
+    except StopAsyncIteration:
+        return ds, None, None
+    except Exception as e:
+        return ds, None, e
+
+
+async def _hedge(
+    out: DeltaStream,
+    start: Any,
+    model: str,
+    hedge_model: str,
+    hedge_after: float,
+) -> None:
+    """Race a primary request against a delayed hedge; forward the first to answer into `out`."""
+    primary = start(model)
+    contenders = [primary]
+    pending = {asyncio.ensure_future(_first_delta(primary))}
+    winner: Optional[Tuple[DeltaStream, Optional[str]]] = None
+    errors: List[BaseException] = []
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_after)
+        if not done:
+            out.hedged = True
+            logger.info("stream: no delta after %.2fs from model=%s; hedging with model=%s", hedge_after, model, hedge_model)
+            backup = start(hedge_model)
+            contenders.append(backup)
+            pending.add(asyncio.ensure_future(_first_delta(backup)))
+        while winner is None:
+            for t in done:
+                ds, first, err = t.result()
+                if err is None:
+                    winner = (ds, first)
+                    break
+                errors.append(err)
+            if winner is not None or not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for t in pending:
+            t.cancel()
+        for ds in contenders:
+            if winner is None or ds is not winner[0]:
+                if ds.ttft is None and ds.error is None:
+                    TTFT.record(ds.model, time.perf_counter() - ds._started)  # lower bound: it was still waiting
+                await ds.aclose()
+                if out.hedged and ds.error is None:
+                    out.hedge_usage.append((ds.model, ds.estimated_usage()))
+        if winner is None:
+            await out.finish(errors[0] if errors else RuntimeError("no stream answered"))
+            return
+        ds, first = winner
+        out.model, out.ttft = ds.model, ds.ttft
+        if out.hedged:
+            logger.info("stream: hedge winner model=%s ttft=%.2fs", ds.model, ds.ttft or 0.0)
+        try:
+            if first is not None:
+                await out.put(first)
+            async for d in ds:
+                await out.put(d)
+        except Exception as e:
+            await out.finish(e)
+            return
+        out.usage, out.response_id = ds.usage, ds.response_id
+        await out.finish()
+    finally:
+        for ds in contenders:
+            await ds.aclose()
 
 
 async def stream_deltas(
@@ -71,6 +364,12 @@ async def stream_deltas(
     reasoning: Optional[Dict[str, Any]] = None,
     verbosity: Optional[str] = None,
     truncation: Optional[str] = None,
+    timeout: Optional[float] = None,
+    buffer: int = 64,
+    max_output_tokens: Optional[int] = None,
+    hedge_after: Union[float, str, None] = None,
+    hedge_model: Optional[str] = None,
+    previous_response_id: Optional[str] = None,
 ) -> DeltaStream:
     """Return a `DeltaStream` of text deltas and eventually usage.
 
@@ -84,74 +383,49 @@ async def stream_deltas(
         Responses API typed items (developer/user/assistant) already built.
     reasoning, verbosity, truncation: optional
         Extra fields passed to Responses streaming; guarded by model support.
+    timeout: float, optional
+        Per-call timeout in seconds (default: the shared client's).
+    buffer: int
+        Max deltas buffered ahead of the consumer.
+    max_output_tokens: int, optional
+        Upper bound on generated tokens (reasoning included), so capped
+        replies are bounded at the source.
+    hedge_after: float or "auto", optional
+        Opt-in hedging: if no delta arrives within this many seconds, start a
+        second request (to `hedge_model`, default `model`) and stream
+        whichever answers first, cancelling the other. "auto" uses the
+        model's observed p90 time to first token (`TTFT`).
+    hedge_model: str, optional
+        Model for the hedge request (e.g., a faster one).
+    previous_response_id: str, optional
+        Continue a stored response: `input_items` then only holds what is
+        new since it (see `chain.py`).
 
     Notes
     -----
-    The producer runs in a background executor so this function returns
-    immediately, enabling true streaming for consumers.
+    The producer is a task on the running loop reading the SDK's async
+    stream, so this function returns immediately, enabling true streaming
+    for consumers. Call `aclose()` on the result to abandon it early. When
+    hedged, `model` on the result is the winner and `hedge_usage` lists the
+    estimated usage of the cancelled request for cost accounting.
     """
-    stream_obj = DeltaStream()
-
-    def producer() -> None:
-        from openai import OpenAI  # imported here to avoid import costs if unused
-
-        client = OpenAI(api_key=api_key)
-        kwargs = {"model": model, "input": input_items}
-        # Pass reasoning for GPT-5 models except chat-latest
-        if reasoning is not None:
-            kwargs["reasoning"] = reasoning
-        # Use text.verbosity for GPT-5 (except chat-latest) if provided. This is
-        # accepted by Responses.stream according to current API.
-        if verbosity is not None and model.startswith("gpt-5") and model != "gpt-5-chat-latest":
-            kwargs["text"] = {"format": {"type": "text"}, "verbosity": verbosity}
-        if truncation:
-            kwargs["truncation"] = truncation
-        started = time.perf_counter()
-        with client.responses.stream(**kwargs) as stream:
-            for event in stream:
-                if event.type == "response.output_text.delta":
-                    stream_obj.put(event.delta or "")
-            final = stream.get_final_response()
-            try:
-                usage = getattr(final, "usage", None)
-                it = int(getattr(usage, "input_tokens", 0) or 0)
-                ot = int(getattr(usage, "output_tokens", 0) or 0)
-                cit = int(getattr(usage, "cache_creation_input_tokens", 0) or 0)
-                stream_obj.set_usage((it, ot, cit))
-                if get_trace_openai_mode() != "off":
-                    dur_ms = int((time.perf_counter() - started) * 1000)
-                    rid = getattr(final, "id", None)
-                    logger.info(
-                        "trace-openai: path=%s model=%s latency_ms=%d input=%d output=%d cached=%d req_id=%s",
-                        "responses.stream",
-                        model,
-                        dur_ms,
-                        it,
-                        ot,
-                        cit,
-                        str(rid) if rid is not None else "",
-                        extra={
-                            "trace": {
-                                "type": "openai",
-                                "mode": "meta",
-                                "path": "responses.stream",
-                                "phase": "chat",
-                                "model": model,
-                                "latency_ms": dur_ms,
-                                "request_id": rid,
-                                "usage": {"input": it, "output": ot, "cached": cit},
-                            }
-                        },
-                    )
-            except Exception:
-                stream_obj.set_usage((0, 0, 0))
-        stream_obj.close()
-
-    loop = asyncio.get_event_loop()
-    # Run producer in background to enable true streaming (return immediately)
-    fut = loop.run_in_executor(None, producer)
-    # keep a reference on the stream object to avoid GC of the future
-    setattr(stream_obj, "_producer_future", fut)
+    input_est = sum(estimate_tokens(str(c.get("text", ""))) for it in input_items for c in (it.get("content") or []) if isinstance(c, dict))
+    stream_obj = DeltaStream(buffer, input_tokens_est=input_est, model=model)
+    loop = asyncio.get_running_loop()
+
+    def start(m: str) -> DeltaStream:
+        ds = DeltaStream(buffer, input_tokens_est=input_est, model=m)
+        kwargs = _stream_kwargs(m, input_items, reasoning, verbosity, truncation, max_output_tokens, previous_response_id)
+        ds.attach(loop.create_task(_produce(ds, api_key, kwargs, timeout)))
+        return ds
+
+    delay = (TTFT.quantile(model, 0.9) or DEFAULT_HEDGE_AFTER) if hedge_after == "auto" else hedge_after
+    if delay is None:
+        kwargs = _stream_kwargs(model, input_items, reasoning, verbosity, truncation, max_output_tokens, previous_response_id)
+        # Run the producer as a task so this returns immediately (true streaming)
+        stream_obj.attach(loop.create_task(_produce(stream_obj, api_key, kwargs, timeout)))
+    else:
+        stream_obj.attach(loop.create_task(_hedge(stream_obj, start, model, hedge_model or model, float(delay))))
     return stream_obj
 
 
@@ -175,6 +449,18 @@ async def _send_chunks(channel, text: str, max_len: int, *, allowed_mentions: Op
                     raise
 
 
+async def _stop_upstream(delta_iter: Any, reason: str) -> None:
+    """Abort generation as soon as no more text will be sent."""
+    aclose = getattr(delta_iter, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+        logger.info("stream: stopped upstream early reason=%s", reason)
+    except Exception:
+        logger.debug("stream: closing upstream failed", exc_info=True)
+
+
 async def _gate_allow(send_gate) -> bool:
     if send_gate is None:
         return True
@@ -211,7 +497,9 @@ async def send_stream_as_messages(
 
     Returns the full concatenated text (not truncated), except when
     `max_total_chars` is set for an overall cap, in which case the returned
-    text is truncated to that cap.
+    text is truncated to that cap. When the cap is reached or `send_gate`
+    denies, `delta_iter.aclose()` (if any) is awaited first so the upstream
+    response stops generating.
     """
     MAX_LEN = 1900
     # Defaults tuned for a more human feel; smaller bursts to better preserve lists
@@ -265,6 +553,7 @@ async def send_stream_as_messages(
                                 changed = True
                         if changed:
                             to_send = ts
+                await _stop_upstream(delta_iter, "max_chars")
                 await _send_chunks(channel, to_send, MAX_LEN, allowed_mentions=allowed_mentions)
                 return full[:max_total_chars]
 
@@ -304,6 +593,7 @@ async def send_stream_as_messages(
                         if changed:
                             unsent = us
                 if not await _gate_allow(send_gate):
+                    await _stop_upstream(delta_iter, "send_gate")
                     return full
                 await _send_chunks(channel, unsent, MAX_LEN, allowed_mentions=allowed_mentions)
                 unsent = ""
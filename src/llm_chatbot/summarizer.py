@@ -0,0 +1,178 @@
+"""Rolling per-channel conversation summaries.
+
+Once a channel's history grows past the recent tail by `trigger` messages,
+`RollingSummarizer` folds those older messages into the channel's running
+summary with a cheap model, in a background task and never on the reply path.
+Prompts then carry the summary plus only the messages it does not cover.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .dedup import message_body
+from .history import estimate_tokens
+from .scheduler import set_work
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SummaryStats:
+    """Counters for summary refreshes and prompt savings."""
+
+    runs: int = 0
+    failures: int = 0
+    input_tokens: int = 0  # spent by the summarizer model
+    output_tokens: int = 0
+    turns: int = 0  # replies built with a summary
+    tokens_saved: int = 0  # estimated prompt tokens saved across those turns
+    last_saved: int = 0
+
+    @property
+    def avg_saved_per_turn(self) -> float:
+        return self.tokens_saved / self.turns if self.turns else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "turns": self.turns,
+            "tokens_saved": self.tokens_saved,
+            "last_saved": self.last_saved,
+            "avg_saved_per_turn": round(self.avg_saved_per_turn, 1),
+        }
+
+
+SummarizeFn = Callable[[str, List[Dict[str, str]]], Tuple[str, Tuple[int, int, int]]]
+
+
+class RollingSummarizer:
+    """Maintain `ChannelContext.summary` incrementally in the background.
+
+    Parameters
+    ----------
+    store: MemoryStore
+        Store holding the channel contexts.
+    summarize: callable
+        `(previous_summary, messages) -> (text, (input, output, cached))`;
+        runs in a worker thread.
+    trigger: int
+        Unsummarized messages older than the tail needed before a refresh.
+    keep_last: int
+        Recent messages always kept verbatim (never summarized).
+    on_usage: callable, optional
+        Called with the usage tuple after each refresh (e.g., cost tracking).
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        summarize: SummarizeFn,
+        *,
+        trigger: int = 30,
+        keep_last: int = 10,
+        on_usage: Optional[Callable[[Tuple[int, int, int]], None]] = None,
+    ) -> None:
+        self.store = store
+        self._summarize = summarize
+        self.trigger = max(1, int(trigger))
+        self.keep_last = max(1, int(keep_last))
+        self._on_usage = on_usage
+        self.stats = SummaryStats()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def pending_range(self, ctx: Any) -> Optional[Tuple[int, int]]:
+        """Return `(start, upto)` seqs to fold into the summary, or None if below the trigger."""
+        upto = ctx.messages.next_seq - self.keep_last
+        start = max(ctx.summary_upto, ctx.messages.first_seq)
+        if upto - start < self.trigger:
+            return None
+        return start, upto
+
+    def maybe_schedule(self, channel_id: int) -> bool:
+        """Start a background refresh for the channel when due; return True if one was started."""
+        key = str(channel_id)
+        if key in self._inflight:
+            return False
+        ctx = self.store.get(channel_id)
+        rng = self.pending_range(ctx)
+        if rng is None:
+            return False
+        start, upto = rng
+        msgs = [
+            # Stored user content already reads "Author: text"; keep exactly one prefix
+            {"role": m.role, "content": f"{m.author}: {message_body(m.content, m.author)}" if m.author else m.content}
+            for m in ctx.messages
+            if start <= m.seq < upto
+        ]
+        # A fresh context: the refresh must not inherit the triggering reply's
+        # deadline, work class or key lease (see `resilience`, `scheduler`)
+        loop = asyncio.get_running_loop()
+        task = contextvars.Context().run(loop.create_task, self._refresh(channel_id, ctx.summary, ctx.summary_upto, upto, msgs))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return True
+
+    async def _refresh(self, channel_id: int, previous: str, prev_upto: int, upto: int, msgs: List[Dict[str, str]]) -> None:
+        set_work("background", "summary")  # the summarizer's OpenAI call queues as background work
+        try:
+            text, usage = await asyncio.to_thread(self._summarize, previous, msgs)
+        except Exception as e:
+            self.stats.failures += 1
+            logger.warning("summary: refresh failed channel=%s err=%s", channel_id, e)
+            return
+        self.stats.runs += 1
+        self.stats.input_tokens += int(usage[0] or 0)
+        self.stats.output_tokens += int(usage[1] or 0)
+        if self._on_usage is not None:
+            try:
+                self._on_usage(usage)
+            except Exception:
+                logger.debug("summary: usage callback failed", exc_info=True)
+        text = (text or "").strip()
+        ctx = self.store.get(channel_id)
+        # Drop the result if the channel was reset or summarized meanwhile
+        if not text or ctx.summary_upto != prev_upto or ctx.messages.next_seq < upto:
+            logger.debug("summary: discarded stale refresh channel=%s", channel_id)
+            return
+        self.store.set_summary(channel_id, text, upto)
+        self.store.mark_dirty()
+        logger.info("summary: refreshed channel=%s upto=%d folded=%d chars=%d", channel_id, upto, len(msgs), len(text))
+
+    def select(
+        self, ctx: Any, include_n: int, *, include_non_addressed: bool = True, token_budget: Optional[int] = None
+    ) -> Tuple[str, list]:
+        """Return `(summary, history)` for a prompt and record the estimated tokens saved.
+
+        `history` is the usual recent selection minus messages the summary
+        covers; a token budget is shared between the summary and history.
+        """
+        full = ctx.messages.select(include_n, include_non_addressed=include_non_addressed, token_budget=token_budget)
+        if not ctx.summary:
+            return "", full
+        summary_tokens = estimate_tokens(ctx.summary)
+        if token_budget is not None:
+            budget = max(0, token_budget - summary_tokens)
+            history = ctx.messages.select(include_n, include_non_addressed=include_non_addressed, token_budget=budget)
+        else:
+            history = full
+        history = [m for m in history if m.seq >= ctx.summary_upto]
+        baseline = ctx.messages.tokens(full)
+        actual = ctx.messages.tokens(history) + summary_tokens
+        self.stats.turns += 1
+        self.stats.last_saved = baseline - actual
+        self.stats.tokens_saved += self.stats.last_saved
+        return ctx.summary, history
+
+    async def close(self) -> None:
+        """Cancel in-flight refreshes."""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
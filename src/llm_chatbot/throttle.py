@@ -0,0 +1,257 @@
+"""Client-side pacing from OpenAI rate-limit headers.
+
+Every OpenAI response carries `x-ratelimit-{limit,remaining,reset}-{requests,tokens}`
+for the key and model it was served under. `RateLimitTracker` keeps a token
+bucket per (key, model) and kind, refreshed from those headers and refilled
+in between at the rate the reset header implies. Before a request goes out
+(an httpx request hook on the shared clients, so streams are covered too)
+its cost is taken from the buckets: one request, and the body size as a
+token estimate. If either bucket would go negative the request waits for
+the refill instead of being sent into a 429, up to `max_wait` seconds and
+never past the reply deadline.
+
+The hook does not sleep itself when the call runs in a
+`resilience.pacing_scope` (every retried call and stream does): it raises
+`Paced` and the caller waits without holding an admission slot or running
+an attempt timeout, then resends; the budget reserved for the first try
+carries over to the resend.
+
+The model is read from the request body and the key from its
+`Authorization` header, so calls made with a pool key (`keys.py`) are
+tracked under that key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .keys import mask
+from .resilience import Paced, current_deadline, current_pacing
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("requests", "tokens")
+_MODEL_RE = re.compile(rb'"model"\s*:\s*"([^"]+)"')
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds in a reset header (`1s`, `6m0s`, `20ms`, `1h2m3.5s`), or None."""
+    if not value:
+        return None
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+    return sum(float(n) * units[u] for n, u in parts)
+
+
+@dataclass
+class ThrottleConfig:
+    """Pacing switches; with `enabled` off headers are still tracked."""
+
+    enabled: bool = True
+    max_wait: float = 10.0  # longest pause before a request (seconds)
+    chars_per_token: float = 4.0  # request body bytes per estimated token
+
+
+class Bucket:
+    """Token bucket mirroring one server-side limit."""
+
+    __slots__ = ("limit", "level", "rate", "updated")
+
+    def __init__(self, limit: float, level: float, rate: float, now: float) -> None:
+        self.limit = limit
+        self.level = level
+        self.rate = rate  # refill per second
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it already is)."""
+        if self.level >= amount or amount > self.limit:
+            return 0.0  # an oversized request cannot be paced into budget; let the server decide
+        return (amount - self.level) / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimitTracker:
+    """Live header-derived buckets per (key, model), thread-safe."""
+
+    def __init__(self, config: Optional[ThrottleConfig] = None, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config or ThrottleConfig()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, str], Dict[str, Bucket]] = {}
+        self._stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def configure(self, config: ThrottleConfig) -> None:
+        self.config = config
+
+    def _stat(self, key: Tuple[str, str]) -> Dict[str, float]:
+        s = self._stats.get(key)
+        if s is None:
+            s = self._stats[key] = {"requests": 0, "paced": 0, "paced_s": 0.0, "limited": 0}
+        return s
+
+    def observe(self, api_key: str, model: str, headers, status: int = 200) -> None:
+        """Refresh the buckets for (key, model) from response headers."""
+        now = self._clock()
+        with self._lock:
+            key = (api_key, model)
+            if status == 429:
+                self._stat(key)["limited"] += 1
+            for kind in KINDS:
+                try:
+                    limit = float(headers.get(f"x-ratelimit-limit-{kind}") or 0)
+                    remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+                except (TypeError, ValueError):
+                    continue
+                if limit <= 0:
+                    continue
+                reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                # Refill at the rate that gets the bucket back to full by the reset; limits are per minute
+                rate = (limit - remaining) / reset if reset and remaining < limit else limit / 60.0
+                self._buckets.setdefault(key, {})[kind] = Bucket(limit, max(0.0, remaining), max(rate, limit / 60.0), now)
+
+    def reserve(self, api_key: str, model: str, tokens: int) -> float:
+        """Take one request and `tokens` from the buckets; return seconds to wait first.
+
+        Unknown (key, model) pairs are not paced until a response has
+        reported their limits.
+        """
+        now = self._clock()
+        with self._lock:
+            key = (api_key, model)
+            self._stat(key)["requests"] += 1
+            buckets = self._buckets.get(key)
+            if not buckets:
+                return 0.0
+            wait = 0.0
+            for kind, amount in (("requests", 1.0), ("tokens", float(tokens))):
+                b = buckets.get(kind)
+                if b is None:
+                    continue
+                b.refill(now)
+                wait = max(wait, b.wait_for(amount))
+                b.level -= amount  # may go negative: later callers queue behind this one
+            if wait > 0:
+                s = self._stat(key)
+                s["paced"] += 1
+                s["paced_s"] += min(wait, self.config.max_wait)
+            return wait
+
+    def headroom(self, api_key: str, model: str) -> Dict[str, Optional[float]]:
+        """Fraction of each limit currently available (None when unknown)."""
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets.get((api_key, model), {})
+            out: Dict[str, Optional[float]] = {}
+            for kind in KINDS:
+                b = buckets.get(kind)
+                if b is not None:
+                    b.refill(now)
+                out[kind] = round(max(0.0, b.level) / b.limit, 3) if b is not None else None
+            return out
+
+    def snapshot(self) -> List[dict]:
+        now = self._clock()
+        out = []
+        with self._lock:
+            for (api_key, model), s in sorted(self._stats.items(), key=lambda kv: kv[0][1]):
+                row: dict = {"key": mask(api_key), "model": model, **s, "paced_s": round(s["paced_s"], 2)}
+                buckets = self._buckets.get((api_key, model), {})
+                for kind in KINDS:
+                    b = buckets.get(kind)
+                    if b is not None:
+                        b.refill(now)
+                    row[f"{kind}_limit"] = int(b.limit) if b is not None else None
+                    row[f"{kind}_left"] = int(max(0.0, b.level)) if b is not None else None
+                out.append(row)
+        return out
+
+    def _request_info(self, request) -> Optional[Tuple[str, str, int]]:
+        if request.method != "POST":
+            return None
+        try:
+            body = request.content
+        except Exception:
+            return None
+        m = _MODEL_RE.search(body or b"")
+        if m is None:
+            return None
+        api_key = request.headers.get("authorization", "").rpartition(" ")[2]
+        return api_key, m.group(1).decode("utf-8", "replace"), int(len(body) / max(0.1, self.config.chars_per_token))
+
+    def _bounded(self, wait: float) -> float:
+        wait = min(wait, self.config.max_wait)
+        dl = current_deadline()
+        if dl is not None:
+            wait = min(wait, max(0.0, dl.remaining() - 1.0))
+        return wait
+
+    def before_request(self, request) -> float:
+        """Reserve budget for an outgoing request; returns the pause to take (seconds).
+
+        Inside a pacing scope a pause is raised as `Paced` instead, and the
+        resent request (same key and model) reuses that reservation.
+        """
+        info = self._request_info(request)
+        if info is None:
+            return 0.0
+        request.extensions["llm_chatbot_ratelimit"] = info[:2]
+        pacing = current_pacing()
+        if pacing is not None and pacing.pop("prepaid", None) == info[:2]:
+            return 0.0
+        wait = self.reserve(*info)
+        if wait <= 0 or not self.config.enabled:
+            return 0.0
+        wait = self._bounded(wait)
+        logger.info("openai-throttle: pacing model=%s key=%s for %.2fs", info[1], mask(info[0]), wait)
+        if pacing is not None and wait > 0:
+            pacing["prepaid"] = info[:2]
+            raise Paced(wait)
+        return wait
+
+    def after_response(self, response) -> None:
+        target = response.request.extensions.get("llm_chatbot_ratelimit")
+        if target is not None:
+            self.observe(target[0], target[1], response.headers, response.status_code)
+
+    # httpx event hooks (see `clients.ClientRegistry._build`)
+
+    async def arequest_hook(self, request) -> None:
+        wait = self.before_request(request)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def aresponse_hook(self, response) -> None:
+        self.after_response(response)
+
+    def request_hook(self, request) -> None:
+        wait = self.before_request(request)
+        if wait > 0:
+            time.sleep(wait)
+
+    def response_hook(self, response) -> None:
+        self.after_response(response)
+
+
+THROTTLE = RateLimitTracker()
+
+
+def configure_throttle(config: ThrottleConfig) -> None:
+    """Apply pacing settings to the process-wide tracker."""
+    THROTTLE.configure(config)
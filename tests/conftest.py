@@ -0,0 +1,135 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_chatbot import clients, openai_client
+from llm_chatbot.breaker import BreakerBoard
+from llm_chatbot.clients import ClientPoolConfig, ClientRegistry
+
+
+class Clock:
+    """Manual clock for the `clock=` hooks of breakers, key pools and throttles."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def response_json(text="ok", usage=(3, 1), response_id="resp_1"):
+    """A non-streamed Responses API result."""
+    return {
+        "id": response_id,
+        "object": "response",
+        "output": [{"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": usage[0], "output_tokens": usage[1]},
+    }
+
+
+def sse_events(deltas, usage=(5, 2), response_id="resp_1"):
+    """Responses API stream events for one message made of `deltas`."""
+    resp = {"id": response_id, "object": "response", "created_at": 0, "model": "gpt-5-mini", "status": "in_progress", "output": []}
+    item = {"id": "msg_1", "type": "message", "role": "assistant", "status": "in_progress", "content": []}
+    where = {"output_index": 0, "item_id": "msg_1", "content_index": 0}
+    yield {"type": "response.created", "response": resp}
+    yield {"type": "response.output_item.added", "output_index": 0, "item": item}
+    yield {"type": "response.content_part.added", **where, "part": {"type": "output_text", "text": "", "annotations": []}}
+    for d in deltas:
+        yield {"type": "response.output_text.delta", **where, "delta": d, "logprobs": []}
+    part = {"type": "output_text", "text": "".join(deltas), "annotations": []}
+    done_item = dict(item, status="completed", content=[part])
+    yield {"type": "response.output_text.done", **where, "text": part["text"], "logprobs": []}
+    yield {"type": "response.content_part.done", **where, "part": part}
+    yield {"type": "response.output_item.done", "output_index": 0, "item": done_item}
+    u = {"input_tokens": usage[0], "output_tokens": usage[1], "total_tokens": sum(usage)}
+    yield {"type": "response.completed", "response": dict(resp, status="completed", output=[done_item], usage=u)}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Keep-alive fake of the OpenAI API; POSTs are answered by `server.respond(handler, body)`."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.send_json(200, {"object": "list", "data": []})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self.server.paths.append(self.path)
+        self.server.requests.append(body)
+        self.server.respond(self, body)
+
+    def send_json(self, status, obj, headers=None):
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):  # the client gave up (e.g. a deadline passed)
+            self.server.aborted = True
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {"error": {"message": message, "type": "invalid_request_error"}}, headers)
+
+    def send_events(self, events, headers=None):
+        """Stream `events` as SSE, counting them in `server.sent`; a client hang-up sets `server.aborted`."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        try:
+            for i, ev in enumerate(events):
+                self.wfile.write(f"event: {ev['type']}\ndata: {json.dumps(dict(ev, sequence_number=i))}\n\n".encode())
+                self.wfile.flush()
+                self.server.sent += 1
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.aborted = True
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def _reply_ok(handler, body):
+    if body.get("stream"):
+        handler.send_events(sse_events(["ok"]))
+    else:
+        handler.send_json(200, response_json())
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """A fake OpenAI server the shared client registry points at, with fresh breakers.
+
+    Tests set `server.respond` to answer the requests they make; by default every
+    request succeeds with "ok".
+    """
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    srv.respond, srv.paths, srv.requests = _reply_ok, [], []
+    srv.connections, srv.sent, srv.aborted = 0, 0, False
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    reg = ClientRegistry(ClientPoolConfig(base_url=srv.url))
+    monkeypatch.setattr(clients, "CLIENTS", reg)
+    monkeypatch.setattr(openai_client, "BREAKERS", BreakerBoard())
+    yield srv
+    clients.run_sync(reg.aclose())
+    srv.shutdown()
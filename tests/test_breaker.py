@@ -0,0 +1,85 @@
+from llm_chatbot import openai_client
+from llm_chatbot.breaker import BreakerBoard, BreakerConfig, classify_error
+from llm_chatbot.openai_client import chat_complete_with_usage
+
+MSGS = [{"role": "user", "content": "hi"}]
+
+
+class _Err(Exception):
+    def __init__(self, status, msg):
+        super().__init__(msg)
+        self.status_code = status
+
+
+def test_failures_open_then_half_open_probe_recovers(clock):
+    board = BreakerBoard(BreakerConfig(failure_threshold=2, cooldown=10, max_cooldown=30), clock=clock)
+    for _ in range(2):
+        assert board.route("m", ("responses", "chat")) == ["responses", "chat"]
+        board.failure("m", "responses", _Err(503, "upstream down"))
+    assert board.state("m", "responses") == "open"
+    assert board.route("m", ("responses", "chat")) == ["chat"]
+
+    clock.now = 11
+    assert board.route("m", ("responses", "chat")) == ["responses", "chat"]  # half-open probe
+    board.failure("m", "responses", _Err(500, "still down"))
+    assert board.state("m", "responses") == "open" and board.snapshot()[0]["retry_in_s"] == 20.0
+
+    clock.now = 32
+    assert board.allow("m", "responses") and board.state("m", "responses") == "half_open"
+    board.success("m", "responses")
+    snap = board.snapshot()[0]
+    assert snap["state"] == "closed" and snap["trips"] == 2 and snap["skipped"] == 1
+
+
+def test_half_open_admits_one_probe_at_a_time(clock):
+    board = BreakerBoard(BreakerConfig(failure_threshold=1, cooldown=10, probe_timeout=30), clock=clock)
+    board.failure("m", "responses", _Err(503, "upstream down"))
+    clock.now = 11
+    assert [board.allow("m", "responses") for _ in range(3)] == [True, False, False]  # concurrent callers
+    assert board.route("m", ("responses", "chat")) == ["chat"]
+    board.failure("m", "responses", _Err(429, "rate limited"))  # does not count, but ends the probe
+    assert board.state("m", "responses") == "half_open" and board.allow("m", "responses")
+    clock.now = 42  # the probe never reported back
+    assert board.allow("m", "responses") and not board.allow("m", "responses")
+    board.success("m", "responses")
+    assert all(board.allow("m", "responses") for _ in range(3))
+
+
+def test_error_classes():
+    assert classify_error(_Err(404, "The model `x` does not exist")) == "capability"
+    assert classify_error(_Err(400, "Unsupported parameter: 'reasoning'")) == "capability"
+    assert classify_error(_Err(400, "bad input")) is None
+    assert classify_error(_Err(429, "rate limited")) is None
+    assert classify_error(TimeoutError("read timeout")) == "failure"
+    board = BreakerBoard()
+    board.failure("m", "responses", _Err(429, "rate limited"))
+    assert board.state("m", "responses") == "closed"
+    board.failure("m", "responses", _Err(404, "model_not_found"))
+    assert board.state("m", "responses") == "open" and board.route("m", ("responses",)) == ["responses"]  # all open: try anyway
+
+
+def test_capability_error_routes_straight_to_chat_completions(server):
+    def respond(handler, body):
+        if handler.path.endswith("/responses"):
+            return handler.send_error_json(404, "The model `old-model` does not exist")
+        msg = {"role": "assistant", "content": "hello"}
+        handler.send_json(
+            200,
+            {
+                "id": "c1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "old-model",
+                "choices": [{"index": 0, "message": msg, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 4, "completion_tokens": 1, "total_tokens": 5},
+            },
+        )
+
+    server.respond = respond
+    assert chat_complete_with_usage("sk", "old-model", MSGS)[0] == "hello"
+    assert [p.rsplit("/", 1)[1] for p in server.paths] == ["responses", "completions"]
+    assert chat_complete_with_usage("sk", "old-model", MSGS)[0] == "hello"
+    assert [p.rsplit("/", 1)[1] for p in server.paths[2:]] == ["completions"]  # no failed request first
+    snap = {b["endpoint"]: b for b in openai_client.BREAKERS.snapshot()}
+    assert snap["responses"]["state"] == "open" and snap["responses"]["reason"] == "capability"
+    assert snap["chat"]["state"] == "closed" and snap["chat"]["successes"] == 2
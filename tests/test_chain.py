@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import response_json, sse_events
+from llm_chatbot import openai_client
+from llm_chatbot.chain import CHAIN_STATS, chain_delta, chain_key, chain_point, commit_chain
+from llm_chatbot.history import ChannelHistory
+from llm_chatbot.memory import ChannelContext
+from llm_chatbot.streaming import stream_deltas
+
+PERSONA = SimpleNamespace(name="bot", system_prompt="You are a long persona prompt.", developer_prompt=None, language="en")
+
+
+def _ctx(n):
+    ctx = ChannelContext(messages=ChannelHistory(maxlen=6))
+    for i in range(n):
+        ctx.messages.append({"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}", "addressed": True})
+    return ctx
+
+
+def _turn(ctx, key):
+    """Store a user message and a full-context reply to it, then commit the chain."""
+    ctx.messages.append({"role": "user", "content": "hello", "addressed": True})
+    sent_upto = ctx.messages.next_seq
+    ctx.messages.append({"role": "assistant", "content": "hi"})
+    commit_chain(ctx, f"resp_{ctx.messages.last.seq}", key, sent_upto, ctx.messages.last.seq, chained=False)
+
+
+def test_chain_extends_with_new_messages_only():
+    key = chain_key(PERSONA, "gpt-5-mini")
+    ctx = _ctx(2)
+    assert chain_point(ctx, key) is None
+    _turn(ctx, key)
+    assert chain_point(ctx, key) == ("resp_3", 4) and ctx.response_turns == 1
+    ctx.messages.append({"role": "user", "content": "aside", "addressed": False})
+    ctx.messages.append({"role": "user", "content": "@bot question", "addressed": True})
+    assert [r.content for r in chain_delta(ctx, 4)] == ["aside", "@bot question"]
+    assert [r.content for r in chain_delta(ctx, 4, include_non_addressed=False)] == ["@bot question"]
+    ctx.messages.append({"role": "assistant", "content": "answer"})
+    commit_chain(ctx, "resp_6", key, 6, 6, chained=True)
+    assert chain_point(ctx, key) == ("resp_6", 7) and ctx.response_turns == 2
+
+
+def test_chain_is_dropped_when_invalidated():
+    key = chain_key(PERSONA, "gpt-5-mini")
+    ctx = _ctx(0)
+    _turn(ctx, key)
+    other = SimpleNamespace(**dict(vars(PERSONA), system_prompt="A different persona."))
+    assert chain_point(ctx, chain_key(other, "gpt-5-mini")) is None and not ctx.response_id  # persona change
+
+    _turn(ctx, key)
+    assert chain_point(ctx, chain_key(PERSONA, "gpt-5")) is None  # model change
+    _turn(ctx, key)
+    assert chain_point(ctx, key, max_turns=1) is None
+
+    _turn(ctx, key)
+    for i in range(7):  # a message the chained reply never saw leaves the retained window
+        ctx.messages.append({"role": "user", "content": f"x{i}"})
+    assert chain_point(ctx, key) is None
+
+    ctx.messages.append({"role": "user", "content": "q"})
+    sent_upto = ctx.messages.next_seq
+    ctx.messages.append({"role": "user", "content": "someone else, meanwhile"})
+    ctx.messages.append({"role": "assistant", "content": "a"})
+    commit_chain(ctx, "resp_x", key, sent_upto, ctx.messages.last.seq, chained=False)
+    assert chain_point(ctx, key) is None and CHAIN_STATS.breaks["persona_or_model"] >= 2
+
+    assert ChannelContext().response_id == ""  # ~reset replaces the context: no chain
+
+
+def _respond(handler, body):
+    """Numbers responses by request; chaining onto `resp_gone` fails as an expired chain does."""
+    if body.get("previous_response_id") == "resp_gone":
+        return handler.send_error_json(404, "Previous response with id 'resp_gone' not found.")
+    rid = f"resp_{len(handler.server.requests)}"
+    if body.get("stream"):
+        handler.send_events(sse_events(["ok"], usage=(9, 1), response_id=rid))
+    else:
+        handler.send_json(200, response_json(usage=(9, 1), response_id=rid))
+
+
+def test_chained_requests_send_only_new_items(server):
+    server.respond = _respond
+    ids = []
+    new = [{"role": "user", "content": "Ana: and now?"}]
+
+    async def main():
+        ds = await stream_deltas("sk", "gpt-5-mini", [{"role": "user", "content": [{"type": "input_text", "text": "hi"}]}])
+        text = "".join([d async for d in ds])
+        await openai_client.chat_complete_with_usage_async(
+            "sk", "gpt-5-mini", new, previous_response_id=ds.response_id, on_response_id=ids.append
+        )
+        return text, ds.response_id
+
+    assert asyncio.run(main()) == ("ok", "resp_1") and ids == ["resp_2"]
+    body = server.requests[1]
+    assert body["previous_response_id"] == "resp_1" and [i["role"] for i in body["input"]] == ["user"]
+
+    # An expired chain fails fast on the Responses path only, without tripping its breaker
+    with pytest.raises(RuntimeError, match="not found"):
+        asyncio.run(openai_client.chat_complete_with_usage_async("sk", "gpt-5-mini", new, previous_response_id="resp_gone"))
+    assert server.paths == ["/v1/responses"] * 3
+    board = openai_client.BREAKERS
+    assert board.state("gpt-5-mini", "responses") == "closed" and board.snapshot()[0]["failures"] == 0
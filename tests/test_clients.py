@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import response_json
+from llm_chatbot.clients import ClientPoolConfig, ClientRegistry, benchmark
+from llm_chatbot.openai_client import chat_complete_with_usage, chat_complete_with_usage_async, judge_intervention_async
+
+
+@pytest.fixture
+def server(server):
+    """Answers every call with a judge verdict after `server.delay` seconds."""
+    server.delay = 0.0
+
+    def respond(handler, body):
+        time.sleep(server.delay)
+        handler.send_json(200, response_json('{"intervene": true, "intent": "joke", "confidence": 0.9}', usage=(7, 3)))
+
+    server.respond = respond
+    return server
+
+
+def test_registry_shares_client_and_connections(server):
+    reg = ClientRegistry(ClientPoolConfig(base_url=server.url, warmup_connections=1))
+    a = reg.get("sk-a")
+    assert reg.get("sk-a") is a and reg.get("sk-b") is not a
+    assert reg.get("sk-a", timeout=3.0).timeout == 3.0  # per-call option shares the pool
+
+    reg.warmup("sk-a")
+    for _ in range(5):
+        reg.get("sk-a", timeout=3.0).models.list()
+    assert server.connections == 1
+    assert reg.stats()["clients"] == 2
+    reg.close()
+
+
+def test_benchmark_reports_both_modes(server):
+    res = benchmark("sk-test", base_url=server.url, requests=4)
+    assert set(res) == {"per_call", "shared", "saved_ms"}
+    assert server.connections == 4 + 1  # one per fresh client, one for the pool
+
+
+def test_async_calls_overlap_and_sync_wrapper(server):
+    server.delay = 0.3
+    msgs = [{"role": "user", "content": "hi"}]
+
+    async def main():
+        await chat_complete_with_usage_async("sk-a", "gpt-5-mini", msgs)  # first use pays client setup and lazy imports
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            chat_complete_with_usage_async("sk-a", "gpt-5-mini", msgs),
+            judge_intervention_async("sk-a", "gpt-5-nano", msgs, 0.5),
+        )
+        return results, time.perf_counter() - started
+
+    (chat, judge), elapsed = asyncio.run(main())
+    assert elapsed < 0.55  # both requests in flight at once
+    assert chat[1][:2] == (7, 3) and judge == (True, "joke", 0.9)
+    text, _usage = chat_complete_with_usage("sk-a", "gpt-5-mini", msgs)
+    assert "intervene" in text
@@ -0,0 +1,38 @@
+from llm_chatbot.memory import MemoryStore
+
+
+def test_lru_eviction_and_transparent_fault_in(tmp_path):
+    store = MemoryStore(tmp_path / "context.json", max_resident=2)
+    for ch in (1, 2, 3):
+        store.append_message(ch, {"role": "user", "content": f"hello {ch}", "addressed": True})
+    cache = store.cache
+    assert cache.resident == 2 and cache.cold == 1
+    assert cache.stats.evictions == 1
+    # Channel 1 was least recently used; it comes back intact from the cold tier
+    ctx = store.get(1)
+    assert ctx.messages == [{"role": "user", "content": "hello 1", "addressed": True}]
+    assert cache.stats.cold_hits == 1
+    # Cold contexts still reach the snapshot
+    store.save()
+    again = MemoryStore(tmp_path / "context.json")
+    assert sorted(again._data) == ["1", "2", "3"]
+
+
+def test_idle_ttl_and_byte_budget(tmp_path):
+    now = [0.0]
+    store = MemoryStore(tmp_path / "context.json", idle_ttl=30)
+    store.cache._clock = lambda: now[0]
+    store.append_message(1, {"role": "user", "content": "a"})
+    now[0] = 60.0
+    store.append_message(2, {"role": "user", "content": "b"})
+    assert store.cache.stats.expired == 1
+    assert "1" in store._data and store.cache.resident == 1
+
+    big = MemoryStore(tmp_path / "big.json", max_resident_bytes=2000, cold_codec="lzma")
+    for ch in range(5):
+        big.append_message(ch, {"role": "user", "content": "x" * 900})
+    m = big.cache.metrics()
+    assert m["resident_bytes"] <= 2000
+    assert m["resident"] + m["cold"] == 5
+    assert 0 < m["cold_bytes"] < 900
+    assert big.get(0).messages[0]["content"] == "x" * 900
@@ -0,0 +1,70 @@
+import json
+
+from llm_chatbot.dedup import NearDuplicateDetector, collapse_repeats
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.storage import SqliteBackend
+
+SPAM = "check out this amazing giveaway at example dot com, free nitro for everyone today"
+
+
+def _user(author, text):
+    return {"role": "user", "content": f"{author}: {text}", "author": author}
+
+
+def test_detector_exact_near_and_distinct():
+    det = NearDuplicateDetector(threshold=0.8)
+    det.add(0, SPAM)
+    det.add(1, "lol")
+    assert det.find(SPAM) == 0
+    assert det.find(SPAM.upper() + "!!") == 0  # normalization
+    assert det.find(SPAM.replace("today", "today!!! ")) == 0
+    assert det.find("lol") == 1
+    assert det.find("lmao") is None
+    assert det.find("what time does the meeting start tomorrow, and who is bringing snacks") is None
+
+
+def test_store_dedup_persists_refs_and_collapses(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path, journal=True, history_max=6, dedup_threshold=0.85)
+    store.append_message(1, _user("ann", SPAM))
+    store.append_message(1, _user("bob", "hello there"))
+    store.append_message(1, _user("cid", SPAM))
+    store.append_message(1, _user("ann", SPAM + "!"))
+    store.append_message(1, {"role": "assistant", "content": "please stop"})
+    store.append_message(1, _user("bob", "why?"))
+    msgs = list(store.get(1).messages)
+    assert [m.ref for m in msgs] == [None, None, 0, 0, None, None]
+    assert msgs[2].content == "cid: " + SPAM and msgs[3].content is msgs[0].content
+
+    convo = collapse_repeats(msgs)
+    assert len(convo) == 4
+    assert convo[0]["content"].endswith("[repeated 3×: ann, cid]")
+
+    store.save()
+    journal = [json.loads(line) for line in path.with_suffix(".journal").read_text().splitlines()]
+    dup = [r["m"] for r in journal if r["op"] == "msg" and r["seq"] == 2][0]
+    assert dup["ref"] == 0 and "content" not in dup
+    again = MemoryStore(path, journal=True, history_max=6, dedup_threshold=0.85)
+    assert [m.content for m in again.get(1).messages] == [m.content for m in msgs]
+
+    # Evicting the original releases its duplicates back to full records
+    store.append_message(1, _user("dan", "ok"))
+    assert store.get(1).messages[1].ref is None
+    store.save()
+    reopened = MemoryStore(path, journal=True, history_max=6)
+    assert [(m.ref, m.content) for m in reopened.get(1).messages][1:3] == [(None, "cid: " + SPAM), (None, "ann: " + SPAM)]
+
+
+def test_sqlite_dedup_rows_resolve(tmp_path):
+    db = tmp_path / "context.db"
+    store = MemoryStore(db, backend=SqliteBackend(db), history_max=3, dedup_threshold=0.85)
+    store.append_message(7, _user("ann", SPAM))
+    store.append_message(7, _user("bob", SPAM))
+    store.flush()
+    again = MemoryStore(db, backend=SqliteBackend(db), history_max=3)
+    assert [m.content for m in again.get(7).messages] == ["ann: " + SPAM, "bob: " + SPAM]
+    store.append_message(7, _user("cid", "x"))
+    store.append_message(7, _user("dan", "y"))
+    store.flush()
+    again = MemoryStore(db, backend=SqliteBackend(db), history_max=3)
+    assert [m.content for m in again.get(7).messages] == ["bob: " + SPAM, "cid: x", "dan: y"]
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+
+import pytest
+
+from llm_chatbot.export import ExportFilter, export_store, iter_rows
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.storage import migrate_json_store
+
+
+def _populate(store):
+    for i in range(5):
+        store.append_message(10, {"role": "user", "content": f"ann: hi {i}", "author": "ann", "ts": 1000.0 + i})
+    store.set_channel_guild(10, 1)
+    store.append_message(20, {"role": "user", "content": "bob: yo", "author": "bob", "ts": 2000.0})
+    store.set_channel_guild(20, 2)
+    store.increment_turns(10)
+    store.guild_settings(1)["listen_enabled"] = True
+    store.touch_guild(1)
+    store.add_cost("42", "gpt-5-mini", "reply", 0.5)
+    store.save()
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_json_export_streams_with_filters(tmp_path, journal):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path, journal=journal, history_max=3)
+    _populate(store)
+    store.close()
+
+    rows = list(iter_rows("json", path, history_max=3))
+    types = [r["type"] for r in rows]
+    assert types.count("channel") == 2 and types.count("guild") == 1 and "billing" in types
+    msgs = [r for r in rows if r["type"] == "message" and r["channel"] == "10"]
+    assert [(r["seq"], r["archived"]) for r in msgs] == [(0, True), (1, True), (2, False), (3, False), (4, False)]
+    assert msgs[0]["guild"] == "1" and msgs[-1]["content"] == "ann: hi 4"
+
+    flt = ExportFilter(guilds={"1"}, since=1002.0, until=1004.0, kinds=("messages",))
+    assert [r["seq"] for r in iter_rows("json", path, flt)] == [2, 3]
+
+
+def test_export_other_backends_and_csv(tmp_path):
+    src = tmp_path / "context.json"
+    store = MemoryStore(src, history_max=3)
+    _populate(store)
+    expected = sorted(
+        (r["channel"], r["seq"], r["content"]) for r in iter_rows("json", src) if r["type"] == "message" and not r["archived"]
+    )
+    for kind, dst in (("sqlite", tmp_path / "c.db"), ("sharded", tmp_path / "c.d"), ("binary", tmp_path / "c.bin")):
+        migrate_json_store(src, dst, kind)
+        rows = list(iter_rows(kind, dst, history_max=3))
+        assert sorted((r["channel"], r["seq"], r["content"]) for r in rows if r["type"] == "message") == expected, kind
+        assert {r["guild"] for r in rows if r["type"] == "channel"} == {"1", "2"}, kind
+
+    out = io.StringIO()
+    counts = export_store("sqlite", tmp_path / "c.db", out, fmt="csv", flt=ExportFilter(channels={"20"}))
+    assert counts == {"channel": 1, "message": 1, "guild": 1, "billing": 2}
+    table = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert table[1]["content"] == "bob: yo" and json.loads(table[-1]["data"])["by_feature"] == {"reply": 0.5}
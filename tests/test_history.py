@@ -0,0 +1,68 @@
+import json
+
+from llm_chatbot.history import ChannelHistory, MessageRecord
+from llm_chatbot.memory import MemoryStore
+
+
+def test_ring_buffer_evicts_oldest_and_keeps_sequence():
+    h = ChannelHistory(maxlen=3)
+    evicted = [h.append({"role": "user", "content": f"m{i}"}) for i in range(5)]
+    assert [e.content for e in evicted if e is not None] == ["m0", "m1"]
+    assert [m["content"] for m in h] == ["m2", "m3", "m4"]
+    assert h.first_seq == 2 and h.next_seq == 5
+    assert [m["content"] for m in h[-2:]] == ["m3", "m4"]
+
+
+def test_tail_addressed_uses_index_and_respects_window():
+    h = ChannelHistory(maxlen=4)
+    h.extend(
+        [
+            {"role": "user", "content": "u0", "addressed": True},
+            {"role": "assistant", "content": "a1"},
+            {"role": "user", "content": "u2"},
+            {"role": "user", "content": "u3"},
+            {"role": "user", "content": "u4", "addressed": True},
+        ]
+    )
+    # u0 fell out of the ring, so it must not come back through the index
+    assert [m["content"] for m in h.select(10, include_non_addressed=False)] == ["a1", "u4"]
+    assert [m["content"] for m in h.select(2)] == ["u3", "u4"]
+
+
+def test_records_are_compact_and_dict_compatible():
+    r = MessageRecord.from_dict({"role": "user", "content": "hi", "author": "Ann", "addressed": False})
+    assert r["role"] == "user" and r.get("addressed") is None
+    assert r.to_dict() == {"role": "user", "content": "hi", "author": "Ann", "tok": 1}
+    assert r.author is MessageRecord("user", "x", author="Ann").author  # interned
+    assert not hasattr(r, "__dict__")
+
+
+def test_store_spills_evicted_messages_to_archive(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path, history_max=2)
+    for i in range(4):
+        store.append_message(1, {"role": "user", "content": f"m{i}"})
+    store.save()
+    raw = json.loads(path.read_text())["chats"]["1"]
+    assert [m["content"] for m in raw["messages"]] == ["m2", "m3"] and raw["first_seq"] == 2
+    archived = [json.loads(line) for line in (tmp_path / "context.archive" / "1.jsonl").read_text().splitlines()]
+    assert [(m["seq"], m["content"]) for m in archived] == [(0, "m0"), (1, "m1")]
+    again = MemoryStore(path, history_max=2)
+    assert again.get(1).messages.next_seq == 4
+
+
+def test_token_budget_selection_packs_newest_first():
+    h = ChannelHistory()
+    h.append({"role": "user", "content": "old " * 10})
+    h.append({"role": "user", "content": "pasted log " * 200})
+    h.append({"role": "assistant", "content": "ok"})
+    h.append({"role": "user", "content": "thanks", "addressed": True})
+    # Token estimates are computed once and persisted
+    assert MessageRecord.from_dict(h[1].to_dict()).tokens == h[1].tokens == 550
+    picked = h.select(10, token_budget=50)
+    assert [m["content"] for m in picked] == ["ok", "thanks"]
+    assert h.tokens(picked) <= 50
+    # The newest message is always included, even over budget
+    assert [m["content"] for m in h.select(10, token_budget=1)] == ["thanks"]
+    assert len(h.select(10, token_budget=10_000)) == 4
+    assert [m["content"] for m in h.select(10, include_non_addressed=False, token_budget=50)] == ["ok", "thanks"]
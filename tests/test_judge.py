@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_chatbot.judge import JudgeRunner, JudgeStats
+from llm_chatbot.openai_client import first_success
+
+MSGS = [{"role": "user", "content": "hi"}]
+
+
+def _fake_judge(verdicts, delay=0.1, calls=None, cancelled=None):
+    async def judge(model, msgs):
+        if calls is not None:
+            calls.append(model)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.append(model)
+            raise
+        return verdicts[model]
+
+    return judge
+
+
+def _runner(judge, stats, **kw):
+    return JudgeRunner("p", judge, model="gpt-5-nano", threshold=0.6, stats=stats, min_samples=3, **kw)
+
+
+def test_sequential_until_escalation_is_likely_then_concurrent():
+    verdicts = {"gpt-5-nano": (False, "joke", 0.5), "gpt-5-mini": (True, "joke", 0.8)}
+    calls, stats = [], JudgeStats()
+    runner = _runner(_fake_judge(verdicts, calls=calls), stats)
+
+    async def main():
+        return [await runner.decide(MSGS, channel_id=1) for _ in range(4)]
+
+    first, *_rest, last = asyncio.run(main())
+    assert first.strategy == "sequential" and first.escalated and first.accepted and first.model == "gpt-5-mini"
+    assert first.latency_ms >= 190
+    assert last.strategy == "concurrent" and last.escalated and last.accepted and last.latency_ms < 190
+    snap = stats.snapshot()
+    assert snap["strategies"]["sequential"]["n"] == 3 and snap["strategies"]["concurrent"]["n"] == 1
+    assert snap["escalations"] == 4 and snap["escalation_rate"] == 1.0 and snap["wasted"] == 0
+    assert calls.count("gpt-5-mini") == 4
+
+
+def test_concurrent_cancels_escalation_when_cheap_verdict_is_decisive():
+    verdicts = {"gpt-5-nano": (True, "help", 0.9), "gpt-5-mini": (True, "help", 0.9)}
+    cancelled, stats = [], JudgeStats()
+    runner = _runner(_fake_judge(verdicts, cancelled=cancelled), stats, strategy="concurrent")
+
+    async def main():
+        d = await runner.decide(MSGS, channel_id=1)
+        await asyncio.sleep(0)
+        return d
+
+    d = asyncio.run(main())
+    assert d.strategy == "concurrent" and not d.escalated and d.model == "gpt-5-nano"
+    assert cancelled == ["gpt-5-mini"] and stats.wasted == 1
+
+
+def test_non_nano_judge_runs_single():
+    runner = JudgeRunner("p", _fake_judge({"gpt-5-mini": (False, "help", 0.5)}, delay=0), model="gpt-5-mini", threshold=0.6)
+    d = asyncio.run(runner.decide(MSGS))
+    assert d.strategy == "single" and not d.escalated and not d.accepted
+
+
+def test_first_success_returns_fastest_success_and_cancels_rest():
+    cancelled = []
+
+    async def fail():
+        raise RuntimeError("unsupported")
+
+    async def slow():
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+        return "slow"
+
+    async def ok():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        started = time.perf_counter()
+        res = await first_success(fail(), slow(), ok())
+        await asyncio.sleep(0)
+        return res, time.perf_counter() - started
+
+    res, elapsed = asyncio.run(main())
+    assert res == "ok" and elapsed < 0.5 and cancelled == ["slow"]
+    with pytest.raises(RuntimeError, match="unsupported"):
+        asyncio.run(first_success(fail(), fail()))
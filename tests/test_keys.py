@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import response_json
+from llm_chatbot import keys, openai_client, resilience
+from llm_chatbot.keys import KeyPool, KeyPoolConfig, KeySpec, key_scope, note_usage
+from llm_chatbot.resilience import ResilienceConfig
+
+MSGS = [{"role": "user", "content": "hi"}]
+
+
+def _use(pool, tokens=0):
+    lease = pool.acquire()
+    with key_scope(lease):
+        note_usage((tokens, 0, 0))
+    pool.release(lease)
+    return lease.api_key
+
+
+def test_least_loaded_key_relative_to_budgets(clock):
+    pool = KeyPool(KeyPoolConfig(keys=[KeySpec("sk-small-0001", tpm=1000), KeySpec("sk-large-0002", tpm=10000)]), clock=clock)
+    used = [_use(pool, tokens=500) for _ in range(6)]
+    # 500 tokens is half the small key's budget but 5% of the large one's
+    assert used.count("sk-small-0001") == 1 and used.count("sk-large-0002") == 5
+    clock.now += 61  # the window rolls over
+    assert pool.snapshot()[0]["tpm"] == 0 and _use(pool) == "sk-small-0001"
+
+    leases = [pool.acquire() for _ in range(2)]  # in-flight calls count towards load
+    assert {lease.api_key for lease in leases} == {"sk-small-0001", "sk-large-0002"}
+    assert KeyPool().acquire() is None  # no pool: the bot's own key is used
+
+
+def test_rate_limited_key_is_drained_then_recovers(clock):
+    pool = KeyPool(KeyPoolConfig(keys=[KeySpec("sk-aaaa-0001"), KeySpec("sk-bbbb-0002")], drain_seconds=10), clock=clock)
+    lease = pool.acquire()
+    pool.release(lease, throttled=True, retry_in=2.0)
+    assert pool.available() == 1 and {_use(pool) for _ in range(3)} == {"sk-bbbb-0002"}
+    assert pool.snapshot()[0]["drained_s"] == 10.0 and pool.snapshot()[0]["throttled"] == 1
+    clock.now += 10
+    assert pool.available() == 2
+    # quota exhaustion drains for the maximum; with every key drained the first to recover is used
+    pool.release(pool.acquire(), throttled=True, quota=True)
+    pool.release(pool.acquire(), throttled=True)
+    assert pool.available() == 0 and pool.acquire().api_key == "sk-bbbb-0002"
+
+
+@pytest.fixture
+def server(server, monkeypatch):
+    """Answers with the key it was called with in `server.seen`; keys in `server.limited` get a 429."""
+    server.seen, server.limited = [], set()
+
+    def respond(handler, body):
+        key = handler.headers.get("Authorization", "").split()[-1]
+        server.seen.append(key)
+        if key in server.limited:
+            handler.send_error_json(429, "Rate limit reached", {"retry-after": "20"})
+        else:
+            handler.send_json(200, response_json(usage=(30, 10)))
+
+    server.respond = respond
+    monkeypatch.setattr(resilience, "SETTINGS", ResilienceConfig(backoff_base=0.05))
+    pool = KeyPool(KeyPoolConfig(keys=[KeySpec("sk-first-0001"), KeySpec("sk-second-0002")]))
+    monkeypatch.setattr(keys, "KEYS", pool)
+    monkeypatch.setattr(resilience, "KEYS", pool)
+    return server, pool
+
+
+def test_429_reroutes_to_another_key_without_waiting(server):
+    srv, pool = server
+    srv.limited = {"sk-first-0001"}
+    text, usage = openai_client.chat_complete_with_usage("sk-bot", "gpt-5-mini", MSGS)
+    assert text == "ok" and srv.seen == ["sk-first-0001", "sk-second-0002"]
+    for _ in range(3):
+        openai_client.chat_complete_with_usage("sk-bot", "gpt-5-mini", MSGS)
+    assert srv.seen[2:] == ["sk-second-0002"] * 3  # drained key is skipped
+    first, second = pool.snapshot()
+    assert first["throttled"] == 1 and first["drained_s"] > 15 and second["tokens"] == 160
@@ -0,0 +1,54 @@
+from llm_chatbot.journal import journal_path_for, sealed_path_for
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.rate_limit import MultiKeySlidingWindow
+
+
+def test_journal_replay_restores_mutations(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path, journal=True)
+    store.append_message(1, {"role": "user", "content": "hi", "addressed": True})
+    store.append_message(1, {"role": "assistant", "content": "hello"})
+    store.increment_turns(1)
+    store.add_cost("42", "gpt-5-mini", "mention_or_dm", 0.5)
+    store.mark_intervened(7, 1, 99)
+    limiter = MultiKeySlidingWindow({}, store.rate_windows_for("42"), on_event=store.rate_event_hook("42"))
+    limiter.allow("channel", "1")
+    store.save()
+    store.close()
+
+    # No full snapshot written in journal mode, only the journal
+    assert not path.exists()
+    assert journal_path_for(path).exists()
+
+    again = MemoryStore(path, journal=True)
+    ctx = again.get(1)
+    assert ctx.turns == 1
+    assert [m["content"] for m in ctx.messages] == ["hi", "hello"]
+    assert again.billing_for("42").daily_usd == 0.5
+    assert again.billing_for("42").by_feature["mention_or_dm"] == 0.5
+    assert "1" in again.guild_settings(7)["last_channel_ts"]
+    assert len(again.rate_windows_for("42")["channel"]["1"]) == 1
+
+
+def test_seal_and_fold_compacts_into_snapshot(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path, journal=True)
+    store.append_message(5, {"role": "user", "content": "a"})
+    store.save()
+    assert store.seal_journal()
+    store.append_message(5, {"role": "user", "content": "b"})
+    store.save()
+    assert store.fold_journal() == 1
+    assert path.exists() and not sealed_path_for(path).exists()
+
+    again = MemoryStore(path, journal=True)
+    assert [m["content"] for m in again.get(5).messages] == ["a", "b"]
+
+
+def test_reset_is_journaled(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path, journal=True)
+    store.append_message(3, {"role": "user", "content": "x"})
+    store.reset(3)
+    store.close()
+    assert MemoryStore(path, journal=True).get(3).messages == []
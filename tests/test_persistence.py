@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.persistence import WriteBehindScheduler
+
+
+def test_write_behind_coalesces_marks_into_one_write(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path)
+    writer = WriteBehindScheduler(store, max_delay=0.05, max_pending=1000, fsync="never")
+    store.attach_writer(writer)
+
+    async def main():
+        writer.start()
+        for i in range(20):
+            store.append_message(1, {"role": "user", "content": f"m{i}"})
+            store.mark_dirty()
+        assert not path.exists()  # nothing written synchronously
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    store.close()
+    assert writer.stats.writes == 1
+    assert writer.stats.coalesced == 19
+    assert len(json.loads(path.read_text())["chats"]["1"]["messages"]) == 20
+
+
+def test_write_behind_pending_cap_triggers_early_write(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path)
+    writer = WriteBehindScheduler(store, max_delay=60, max_pending=3, fsync="always")
+    store.attach_writer(writer)
+
+    async def main():
+        writer.start()
+        for i in range(3):
+            store.append_message(1, {"role": "user", "content": f"m{i}"})
+            store.mark_dirty()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert path.exists()
+    assert writer.stats.writes == 1 and writer.stats.fsyncs == 1
+    store.close()
+
+
+def test_mark_dirty_without_scheduler_saves_synchronously(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path)
+    store.append_message(2, {"role": "user", "content": "x"})
+    store.mark_dirty()
+    assert json.loads(path.read_text())["chats"]["2"]["messages"][0]["content"] == "x"
+
+
+def test_snapshot_is_captured_on_loop_and_built_by_the_writer(tmp_path, monkeypatch):
+    from llm_chatbot.history import MessageRecord
+
+    store = MemoryStore(tmp_path / "context.json", max_resident=1)
+    store.append_message(1, {"role": "user", "content": "cold"})
+    store.append_message(2, {"role": "user", "content": "hot"})
+    built = []
+    to_dict = MessageRecord.to_dict
+    monkeypatch.setattr(MessageRecord, "to_dict", lambda self, **kw: built.append(self.seq) or to_dict(self, **kw))
+    batch = store._take_batch()
+    assert built == [] and callable(batch.snapshot)  # no message dicts built on the loop
+    store.append_message(2, {"role": "user", "content": "later"})
+    store.reset(1)
+    chats = batch.snapshot()["chats"]
+    assert [m["content"] for m in chats["2"]["messages"]] == ["hot"] and chats["1"]["messages"][0]["content"] == "cold"
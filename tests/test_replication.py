@@ -0,0 +1,77 @@
+import asyncio
+
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.replication import Replica, ReplicationPublisher, follow
+
+
+def _contents(store, ch):
+    return [m.content for m in store.get(ch).messages]
+
+
+def test_standby_follows_and_takes_over(tmp_path):
+    path = tmp_path / "context.json"
+    sock = tmp_path / "r.sock"
+    primary = MemoryStore(path, journal=True, history_max=3)
+    primary.append_message(1, {"role": "user", "content": "before standby"})
+    primary.save()
+
+    async def main():
+        pub = ReplicationPublisher(primary, sock, heartbeat=0.05)
+        await pub.start()
+        replica = Replica()
+        task = asyncio.create_task(follow(sock, replica, timeout=1.0, grace=0.1, retry=0.02))
+        while not replica.synced:
+            await asyncio.sleep(0.01)
+        for i in range(4):
+            primary.append_message(1, {"role": "user", "content": f"m{i}"})
+        primary.increment_turns(1)
+        primary.guild_settings(9)["listen_enabled"] = True
+        primary.touch_guild(9)
+        primary.add_cost("42", "gpt-5-mini", "reply", 0.25)
+        primary.save()  # everything so far is on disk
+        primary.append_message(2, {"role": "user", "content": "unsaved"})
+        primary.add_cost("42", "gpt-5-mini", "reply", 0.5)
+        await asyncio.sleep(0.1)
+        await pub.close()  # primary dies before writing the last changes
+        return await task
+
+    replica = asyncio.run(main())
+    assert replica.stats.detect_ms > 0 and replica.lsn == primary.lsn
+    assert [r["op"] for r in replica.unsaved()[0]] == ["msg", "cost"]
+
+    standby = replica.promote(lambda raw: MemoryStore(path, journal=True, history_max=3, initial=raw))
+    assert _contents(standby, 1) == ["m1", "m2", "m3"] and _contents(standby, 2) == ["unsaved"]
+    assert standby.get(1).turns == 1 and standby.guild_settings(9)["listen_enabled"] is True
+    assert standby.billing_for("42").daily_usd == 0.75
+    standby.save()
+
+    reopened = MemoryStore(path, journal=True, history_max=3)
+    assert _contents(reopened, 1) == ["m1", "m2", "m3"] and _contents(reopened, 2) == ["unsaved"]
+    assert reopened.billing_for("42").daily_usd == 0.75
+
+
+def test_standby_syncs_a_snapshot_larger_than_the_default_stream_limit(tmp_path):
+    sock = tmp_path / "r.sock"
+    primary = MemoryStore(tmp_path / "context.json", journal=True)
+    for i in range(600):
+        primary.append_message(1 + i % 3, {"role": "user", "content": f"Alice: message {i} " + "x" * 140})
+    primary.save()
+
+    async def main():
+        pub = ReplicationPublisher(primary, sock, heartbeat=0.05)
+        await pub.start()
+        replica = Replica()
+        task = asyncio.create_task(follow(sock, replica, timeout=1.0, grace=0.1, retry=0.02))
+        for _ in range(200):
+            if replica.synced:
+                break
+            await asyncio.sleep(0.01)
+        synced = replica.synced
+        await pub.close()
+        await asyncio.wait_for(task, 5.0)
+        return replica, synced
+
+    replica, synced = asyncio.run(main())
+    assert synced and replica.lsn == primary.lsn
+    standby = replica.promote(lambda raw: MemoryStore(tmp_path / "context.json", journal=True, initial=raw))
+    assert sum(len(standby.get(ch).messages) for ch in (1, 2, 3)) == 600
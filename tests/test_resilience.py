@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import response_json, sse_events
+from llm_chatbot import openai_client, resilience
+from llm_chatbot.resilience import DeadlineExceeded, ResilienceConfig, deadline_scope, retry_after
+from llm_chatbot.streaming import stream_deltas
+
+MSGS = [{"role": "user", "content": "hi"}]
+ITEMS = [{"role": "user", "content": [{"type": "input_text", "text": "hi"}]}]
+
+
+@pytest.fixture
+def server(server, monkeypatch):
+    """Each request takes the next step of `server.script`: an error status, a delay, or a stall mid-stream."""
+    server.script = []
+
+    def respond(handler, body):
+        step = server.script.pop(0) if server.script else {}
+        time.sleep(step.get("delay", 0.0))
+        if "status" in step:
+            handler.send_error_json(step["status"], "try later", step.get("headers"))
+        elif body.get("stream"):
+            handler.send_events(_stalling(sse_events(["He", "llo"]), step.get("stall", 0.0)))
+        else:
+            handler.send_json(200, response_json())
+
+    server.respond = respond
+    monkeypatch.setattr(resilience, "SETTINGS", ResilienceConfig(backoff_base=0.05, first_token_timeout=0.5, idle_timeout=0.5))
+    return server
+
+
+def _stalling(events, stall):
+    for i, ev in enumerate(events):
+        if i == 4:  # after the first delta
+            time.sleep(stall)
+        yield ev
+
+
+def test_retry_after_is_honoured_then_succeeds(server):
+    server.script = [{"status": 429, "headers": {"retry-after-ms": "300"}}, {"status": 503}]
+
+    async def main():
+        started = time.perf_counter()
+        text, _usage = await openai_client.chat_complete_with_usage_async("sk", "gpt-5-mini", MSGS)
+        return text, time.perf_counter() - started
+
+    text, elapsed = asyncio.run(main())
+    assert text == "ok" and len(server.requests) == 3 and elapsed >= 0.3
+
+
+def test_deadline_bounds_a_stuck_call_and_later_stages(server):
+    server.script = [{"delay": 3.0}]
+
+    async def main():
+        with deadline_scope(0.6):
+            started = time.perf_counter()
+            with pytest.raises(TimeoutError):
+                await openai_client.chat_complete_with_usage_async("sk", "gpt-5-mini", MSGS)
+            elapsed = time.perf_counter() - started
+            with pytest.raises(DeadlineExceeded):  # e.g. the non-stream fallback
+                await openai_client.chat_complete_with_usage_async("sk", "gpt-5-mini", MSGS)
+        return elapsed
+
+    assert asyncio.run(main()) < 1.5
+
+
+def test_stream_retries_slow_first_token_and_times_out_when_idle(server):
+    server.script = [{"delay": 1.0}, {}]
+
+    async def first():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS)
+        return "".join([d async for d in ds])
+
+    assert asyncio.run(first()) == "Hello" and len(server.requests) == 2
+
+    server.script = [{"stall": 2.0}]
+
+    async def stalled():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS)
+        got = []
+        started = time.perf_counter()
+        with pytest.raises(TimeoutError, match="idle"):
+            async for d in ds:
+                got.append(d)
+        return got, time.perf_counter() - started
+
+    got, elapsed = asyncio.run(stalled())
+    assert got == ["He"] and elapsed < 1.5
+
+
+def test_retry_after_parsing():
+    class _Resp:
+        def __init__(self, headers):
+            self.headers = headers
+
+    class _Err(Exception):
+        def __init__(self, headers):
+            self.response = _Resp(headers)
+
+    assert retry_after(_Err({"retry-after": "2"})) == 2.0
+    assert retry_after(_Err({"retry-after-ms": "250", "retry-after": "9"})) == 0.25
+    assert retry_after(_Err({})) is None
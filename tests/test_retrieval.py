@@ -0,0 +1,29 @@
+from llm_chatbot.history import ChannelHistory
+from llm_chatbot.retrieval import BM25Index, tokenize
+
+
+def test_bm25_ranks_rare_terms_and_supports_removal():
+    idx = BM25Index()
+    idx.add(0, "the deploy key lives in the vault under prod")
+    idx.add(1, "lunch anyone? pizza again")
+    idx.add(2, "pizza pizza pizza")
+    assert tokenize("The Vault, and the KEY!") == ["vault", "key"]
+    assert [d for d, _ in idx.search("where is the vault key", 2)] == [0]
+    assert [d for d, _ in idx.search("pizza", 5)][0] == 2
+    idx.remove(2, "pizza pizza pizza")
+    assert [d for d, _ in idx.search("pizza", 5)] == [1]
+    assert [d for d, _ in idx.search("pizza", 5, exclude_from=1)] == []
+
+
+def test_channel_history_search_is_bounded_by_retention():
+    h = ChannelHistory(maxlen=50)
+    h.append({"role": "user", "content": "the wifi password is hunter2", "addressed": True})
+    for i in range(30):
+        h.append({"role": "user", "content": f"chatter {i}"})
+    hits = h.search("what was the wifi password?", 2, before_seq=h.next_seq - 5)
+    assert [m.seq for m in hits] == [0]
+    # Index follows evictions: once the message leaves the ring it is no longer found
+    for i in range(50):
+        h.append({"role": "user", "content": f"more {i}"})
+    assert h.search("wifi password", 2) == []
+    assert len(h._search) == len(h) == 50
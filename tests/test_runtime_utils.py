@@ -1,8 +1,15 @@
+import asyncio
+from types import SimpleNamespace
+
+from llm_chatbot.memory import MemoryStore
 from llm_chatbot.personality import Personality
 from llm_chatbot.runtime_utils import (
     _chunk_message,
     _effective_model_and_params,
+    _effective_reply_cap,
     _effective_truncation,
+    _max_output_tokens,
+    _maybe_alert_owner,
 )
 
 
@@ -64,3 +71,39 @@ def test_effective_truncation_prefers_guild_override():
     msg = FakeMessage(gid=123)
     out = _effective_truncation(p, store, msg)
     assert out == "auto"
+
+
+def test_reply_cap_maps_to_max_output_tokens():
+    p = Personality(name="t", system_prompt="s", response_max_chars=900)
+    assert _effective_reply_cap(p, intervened=False) == 900
+    assert _effective_reply_cap(p, intervened=True) == p.listen.response_max_chars
+    assert _max_output_tokens(None, {"effort": "minimal"}) is None
+    assert _max_output_tokens(600, None) == 216
+    assert _max_output_tokens(600, {"effort": "minimal"}) == 216 + 256  # reasoning counts against the cap
+    assert _max_output_tokens(600, {"effort": "minimal"}, override=100) == 100
+
+
+def test_owner_alert_records_billing_only_when_an_alert_goes_out(tmp_path):
+    store = MemoryStore(tmp_path / "context.json", journal=True)
+    store.set_budgets(10.0, None)
+    store.save()
+    sent = []
+
+    async def fetch_user(_uid):
+        async def send(text):
+            sent.append(text)
+
+        return SimpleNamespace(send=send)
+
+    bot = SimpleNamespace(fetch_user=fetch_user)
+    cfg = SimpleNamespace(owner_id="1")
+    i18n = SimpleNamespace(t=lambda key, **kw: f"{key}:{kw['ratio']}")
+    store.billing.daily_usd = 1.0
+    asyncio.run(_maybe_alert_owner(bot, cfg, store, i18n))
+    assert sent == [] and store._pending == []  # under every threshold: no write
+    store.billing.daily_usd = 8.5
+    asyncio.run(_maybe_alert_owner(bot, cfg, store, i18n))
+    assert sent == ["cost_alert_daily:50", "cost_alert_daily:80"] and store.billing.last_daily_alert == 0.8
+    assert [r["op"] for r in store._pending] == ["billing"]
+    asyncio.run(_maybe_alert_owner(bot, cfg, store, i18n))  # already alerted
+    assert len(sent) == 2 and len(store._pending) == 1
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from llm_chatbot import scheduler
+from llm_chatbot.scheduler import AdmissionScheduler, SchedulerConfig, Shed, admission, set_work
+
+
+async def _run(sched, jobs, order):
+    """Start `jobs` [(priority, flow, label)] while one slot is held, then release it."""
+    await sched.acquire("direct", "hold")
+
+    async def job(p, f, label):
+        try:
+            await sched.acquire(p, f)
+        except Shed:
+            order.append(f"shed:{label}")
+            return
+        order.append(label)
+        await asyncio.sleep(0)
+        sched.release()
+
+    tasks = []
+    for p, f, label in jobs:
+        tasks.append(asyncio.ensure_future(job(p, f, label)))
+        await asyncio.sleep(0)
+    sched.release()
+    await asyncio.gather(*tasks)
+
+
+def test_strict_priority_classes():
+    sched, order = AdmissionScheduler(SchedulerConfig(max_concurrency=1)), []
+    jobs = [
+        ("background", "g1", "bg"),
+        ("judge", "g1", "judge"),
+        ("listen", "g1", "listen"),
+        ("trigger", "g1", "trig"),
+        ("direct", "g2", "dm"),
+    ]
+    asyncio.run(_run(sched, jobs, order))
+    assert order == ["dm", "trig", "listen", "judge", "bg"]
+    snap = sched.snapshot()
+    assert snap["classes"]["background"]["admitted"] == 1 and snap["max_depth"] == 5 and snap["in_flight"] == 0
+
+
+def test_weighted_fair_queuing_across_guilds():
+    sched, order = AdmissionScheduler(SchedulerConfig(max_concurrency=1)), []
+    jobs = [("listen", "noisy", f"n{i}") for i in range(4)] + [("listen", "quiet", f"q{i}") for i in range(2)]
+    asyncio.run(_run(sched, jobs, order))
+    assert order == ["n0", "q0", "n1", "q1", "n2", "n3"]
+
+    sched, order = AdmissionScheduler(SchedulerConfig(max_concurrency=1, weights={"vip": 2.0})), []
+    jobs = [("listen", "a", f"a{i}") for i in range(3)] + [("listen", "vip", f"v{i}") for i in range(4)]
+    asyncio.run(_run(sched, jobs, order))
+    assert order == ["v0", "a0", "v1", "v2", "a1", "v3", "a2"]  # vip tags advance by 0.5, others by 1
+
+
+def test_overload_sheds_lowest_priority_first():
+    sched, order = AdmissionScheduler(SchedulerConfig(max_concurrency=1, max_queue=2)), []
+    jobs = [("judge", "g", "judge"), ("background", "g", "bg"), ("direct", "g", "dm"), ("background", "g", "bg2")]
+    asyncio.run(_run(sched, jobs, order))
+    assert sorted(order[:2]) == ["shed:bg", "shed:bg2"] and order[2:] == ["dm", "judge"]
+    assert sched.snapshot()["classes"]["background"]["shed"] == 2
+
+
+def test_max_wait_sheds_and_work_context_classes_calls(monkeypatch):
+    sched = AdmissionScheduler(SchedulerConfig(max_concurrency=1, max_wait={"listen": 0.05}))
+    monkeypatch.setattr(scheduler, "SCHEDULER", sched)
+
+    async def main():
+        set_work("direct", "g")
+        async with admission():
+            with pytest.raises(Shed, match="max wait"):
+                async with admission("listen"):
+                    pass
+        async with admission():
+            pass
+
+    asyncio.run(main())
+    snap = sched.snapshot()["classes"]
+    assert snap["direct"]["admitted"] == 2 and snap["listen"]["shed"] == 1 and snap["listen"]["queued"] == 0
+
+
+def test_admission_control_is_off_by_default(tmp_path, monkeypatch):
+    from llm_chatbot.config import load_config
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv("LLM_MAX_CONCURRENCY", raising=False)
+    cfg = load_config()
+    sched = AdmissionScheduler(SchedulerConfig(max_concurrency=cfg.llm_max_concurrency, max_queue=cfg.llm_max_queue))
+    assert cfg.llm_max_concurrency == 0 and not sched.enabled
@@ -0,0 +1,85 @@
+import json
+import threading
+
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.snapshot import SnapshotReader, is_snapshot, json_to_snapshot, snapshot_to_json
+from llm_chatbot.storage import BinarySnapshotBackend, WriteBatch
+
+
+def test_binary_backend_lazy_roundtrip(tmp_path):
+    p = tmp_path / "context.bin"
+    store = MemoryStore(p, backend=BinarySnapshotBackend(p))
+    store.append_message(1, {"role": "user", "content": "héllo", "addressed": True})
+    store.increment_turns(1)
+    store.append_message(2, {"role": "user", "content": "other"})
+    store.guild_settings(9)["listen_enabled"] = True
+    store.touch_guild(9)
+    store.add_cost("42", "gpt-5-mini", "listen", 0.25)
+    store.close()
+    assert is_snapshot(p)
+
+    again = MemoryStore(p, backend=BinarySnapshotBackend(p))
+    assert again._data == {}
+    assert again.billing_for("42").by_feature == {"listen": 0.25}
+    assert again.guild_settings(9)["listen_enabled"] is True
+    assert again.get(1).turns == 1
+    # Channel 2 is copied verbatim when only channel 1 changes
+    again.append_message(1, {"role": "assistant", "content": "hi"})
+    again.close()
+    third = MemoryStore(p, backend=BinarySnapshotBackend(p))
+    assert [m["content"] for m in third.get(1).messages] == ["héllo", "hi"]
+    assert third.get(2).messages == [{"role": "user", "content": "other"}]
+    third.close()
+
+
+def test_json_binary_conversion_roundtrip(tmp_path):
+    raw = {
+        "chats": {"5": {"turns": 2, "first_seq": 3, "messages": [{"role": "user", "content": str(i)} for i in range(4)]}},
+        "guild_settings": {"7": {"listen_enabled": True}},
+        "billing": {"daily_usd": 1.0},
+        "billing_by_bot": {},
+        "rate_windows_by_bot": {},
+    }
+    src = tmp_path / "context.json"
+    src.write_text(json.dumps(raw))
+    assert json_to_snapshot(src, tmp_path / "context.bin") == 1
+    reader = SnapshotReader(tmp_path / "context.bin")
+    # Only the requested tail is decoded; first_seq accounts for the skipped records
+    assert reader.channel("5", limit=2) == {
+        "turns": 2,
+        "first_seq": 5,
+        "messages": [{"role": "user", "content": "2"}, {"role": "user", "content": "3"}],
+    }
+    reader.close()
+    snapshot_to_json(tmp_path / "context.bin", tmp_path / "back.json")
+    assert json.loads((tmp_path / "back.json").read_text()) == raw
+
+
+def test_binary_backend_loads_channels_while_the_writer_swaps_snapshots(tmp_path):
+    p = tmp_path / "context.bin"
+    store = MemoryStore(p, backend=BinarySnapshotBackend(p))
+    for ch in range(4):
+        store.append_message(ch, {"role": "user", "content": f"c{ch} " + "x" * 200})
+    store.close()
+    backend = BinarySnapshotBackend(p)
+    backend.load()
+    stop, errors = threading.Event(), []
+
+    def writer():
+        doc = {"turns": 1, "first_seq": 0, "messages": [{"role": "user", "content": "w"}]}
+        while not stop.is_set():
+            backend.write(WriteBatch(channel_docs={"9": doc}, meta={}))
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        for i in range(3000):
+            try:
+                assert backend.load_channel(str(i % 4))["messages"][0]["content"].startswith(f"c{i % 4} ")
+            except Exception as e:  # collected for the assertion below
+                errors.append(e)
+    finally:
+        stop.set()
+        t.join()
+    backend.close()
+    assert errors == [] and backend._retired == {} and backend._leases == {}
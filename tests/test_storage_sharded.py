@@ -0,0 +1,85 @@
+import json
+
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.storage import ShardedJsonBackend, migrate_json_store
+
+
+def _store(path):
+    return MemoryStore(path, backend=ShardedJsonBackend(path))
+
+
+def test_sharded_lazy_load_and_eager_state(tmp_path):
+    d = tmp_path / "context.d"
+    store = _store(d)
+    store.append_message(1, {"role": "user", "content": "hi", "addressed": True})
+    store.increment_turns(1)
+    store.append_message(2, {"role": "user", "content": "other"})
+    store.guild_settings(9)["listen_enabled"] = True
+    store.touch_guild(9)
+    store.add_cost("42", "gpt-5-mini", "listen", 0.25)
+    store.close()
+
+    manifest = json.loads((d / "manifest.json").read_text())
+    assert manifest["channels"] == ["1", "2"]
+    assert manifest["guilds"] == ["9"]
+
+    again = _store(d)
+    assert again._data == {}
+    assert again.billing_for("42").by_feature == {"listen": 0.25}
+    assert again.guild_settings(9)["listen_enabled"] is True
+    ctx = again.get(1)
+    assert ctx.turns == 1
+    assert ctx.messages == [{"role": "user", "content": "hi", "addressed": True}]
+    assert list(again._data) == ["1"]
+    again.close()
+
+
+def test_sharded_writes_only_changed_shards(tmp_path):
+    d = tmp_path / "context.d"
+    store = _store(d)
+    store.append_message(1, {"role": "user", "content": "a"})
+    store.append_message(2, {"role": "user", "content": "b"})
+    store.save()
+    (d / "channels" / "2.json").write_text('{"turns": 0, "messages": [{"role": "user", "content": "sentinel"}]}')
+
+    store.append_message(1, {"role": "assistant", "content": "c"})
+    store.save()
+    # Channel 2 was not rewritten; no billing/rate change means no state.json either
+    assert json.loads((d / "channels" / "2.json").read_text())["messages"][0]["content"] == "sentinel"
+    assert not (d / "state.json").exists()
+    assert len(json.loads((d / "channels" / "1.json").read_text())["messages"]) == 2
+    store.close()
+
+
+def test_sharded_reset_removes_shard(tmp_path):
+    d = tmp_path / "context.d"
+    store = _store(d)
+    store.append_message(1, {"role": "user", "content": "x"})
+    store.save()
+    store.reset(1)
+    store.save()
+    assert not (d / "channels" / "1.json").exists()
+    store.close()
+    again = _store(d)
+    assert again.get(1).messages == []
+    again.close()
+
+
+def test_migrate_json_to_sharded(tmp_path):
+    src = tmp_path / "context.json"
+    src.write_text(
+        json.dumps(
+            {
+                "chats": {"5": {"turns": 2, "messages": [{"role": "user", "content": "a"}]}},
+                "guild_settings": {"7": {"listen_enabled": True}},
+                "billing": {"daily_usd": 1.0, "daily_key": "2025-01-01", "monthly_usd": 1.0, "monthly_key": "2025-01"},
+            }
+        )
+    )
+    counts = migrate_json_store(src, tmp_path / "context.d", "sharded")
+    assert counts["channels"] == 1
+    store = _store(tmp_path / "context.d")
+    assert store.get(5).turns == 2
+    assert store.guild_settings(7)["listen_enabled"] is True
+    assert store.billing.monthly_usd == 1.0
+    store.close()
@@ -0,0 +1,89 @@
+import json
+
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.storage import SqliteBackend, migrate_json_to_sqlite
+
+
+def test_sqlite_roundtrip_with_lazy_channels(tmp_path):
+    db = tmp_path / "context.db"
+    store = MemoryStore(db, backend=SqliteBackend(db))
+    store.append_message(1, {"role": "user", "content": "hi", "addressed": True})
+    store.append_message(1, {"role": "assistant", "content": "hello"})
+    store.increment_turns(1)
+    store.append_message(2, {"role": "user", "content": "other"})
+    store.guild_settings(9)["listen_enabled"] = True
+    store.touch_guild(9)
+    store.add_cost("42", "gpt-5-mini", "listen", 0.25)
+    store.close()
+
+    again = MemoryStore(db, backend=SqliteBackend(db))
+    # Channels are not loaded until asked for
+    assert again._data == {}
+    ctx = again.get(1)
+    assert ctx.turns == 1
+    assert ctx.messages == [{"role": "user", "content": "hi", "addressed": True}, {"role": "assistant", "content": "hello"}]
+    assert list(again._data) == ["1"]
+    assert again.guild_settings(9)["listen_enabled"] is True
+    assert again.billing_for("42").by_feature == {"listen": 0.25}
+    again.close()
+
+
+def test_sqlite_reset_does_not_fault_back_stale_rows(tmp_path):
+    db = tmp_path / "context.db"
+    store = MemoryStore(db, backend=SqliteBackend(db))
+    store.append_message(1, {"role": "user", "content": "x"})
+    store.flush()
+    store.reset(1)
+    assert store.get(1).messages == []
+    store.close()
+    again = MemoryStore(db, backend=SqliteBackend(db))
+    assert again.get(1).messages == []
+    again.close()
+
+
+def test_migrate_json_to_sqlite(tmp_path):
+    src = tmp_path / "context.json"
+    src.write_text(
+        json.dumps(
+            {
+                "chats": {"5": {"turns": 2, "messages": [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]}},
+                "guild_settings": {"7": {"listen_enabled": True}},
+                "billing_by_bot": {"42": {"daily_usd": 1.5}},
+            }
+        )
+    )
+    counts = migrate_json_to_sqlite(src, tmp_path / "context.db")
+    assert counts == {"channels": 1, "messages": 2, "guilds": 1, "billing": 1}
+    store = MemoryStore(tmp_path / "context.db", backend=SqliteBackend(tmp_path / "context.db"))
+    assert [m["content"] for m in store.get(5).messages] == ["a", "b"]
+    assert store.billing_for("42").daily_usd == 1.5
+    store.close()
+
+
+def test_sqlite_failed_transaction_is_retried_not_dropped(tmp_path, monkeypatch):
+    import sqlite3
+    import time
+
+    db = tmp_path / "context.db"
+    apply = SqliteBackend._apply
+    fails = [1]
+
+    def flaky(conn, b):
+        if fails and fails.pop():
+            raise sqlite3.OperationalError("database is locked")
+        apply(conn, b)
+
+    monkeypatch.setattr(SqliteBackend, "_apply", staticmethod(flaky))
+    store = MemoryStore(db, backend=SqliteBackend(db))
+    store.append_message(1, {"role": "user", "content": "lost?"})
+    store.add_cost("42", "gpt-5-mini", "reply", 0.25)
+    store.save()
+    store.backend.flush()  # the first transaction was rolled back
+    time.sleep(0.3)  # retried on its own
+    store.append_message(1, {"role": "user", "content": "later"})  # later batches only carry increments
+    store.close()
+
+    again = MemoryStore(db, backend=SqliteBackend(db))
+    assert [m["content"] for m in again.get(1).messages] == ["lost?", "later"]
+    assert again.billing_for("42").by_feature == {"reply": 0.25}
+    again.close()
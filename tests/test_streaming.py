@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import sse_events
+from llm_chatbot.streaming import TTFT, send_stream_as_messages, stream_deltas
+
+ITEMS = [{"role": "user", "content": [{"type": "input_text", "text": "hi"}]}]
+
+
+@pytest.fixture
+def server(server):
+    """Streams `server.deltas`, pausing `server.delay` after each event and `server.first_delay[model]` before the first."""
+    server.deltas, server.delay, server.fail, server.first_delay = ["Hel", "lo ", "world"], 0.0, False, {}
+
+    def respond(handler, body):
+        if server.fail:
+            return handler.send_error_json(400, "bad model")
+        time.sleep(server.first_delay.get(body["model"], 0.0))
+        handler.send_events(_paced(sse_events(server.deltas), server.delay))
+
+    server.respond = respond
+    return server
+
+
+def _paced(events, delay):
+    for ev in events:
+        yield ev
+        time.sleep(delay)
+
+
+def _wait_aborted(server):
+    deadline = time.time() + 2
+    while not server.aborted and time.time() < deadline:
+        time.sleep(0.02)
+    return server.aborted
+
+
+def test_stream_deltas_yields_text_and_usage(server):
+    async def main():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS)
+        return [d async for d in ds], ds.usage
+
+    assert asyncio.run(main()) == (["Hel", "lo ", "world"], (5, 2, 0))
+
+
+def test_producer_error_reaches_consumer(server):
+    server.fail = True
+
+    async def main():
+        ds = await stream_deltas("sk", "nope", ITEMS)
+        return [d async for d in ds]
+
+    with pytest.raises(Exception, match="bad model"):
+        asyncio.run(main())
+
+
+def test_bounded_buffer_and_close_abort_upstream(server):
+    server.deltas = [f"w{i} " for i in range(400)]
+    server.delay = 0.002
+
+    async def main():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS, buffer=4)
+        first = await ds.__anext__()
+        await asyncio.sleep(0.3)  # consumer stalls: producer must stop pulling
+        assert ds.q.qsize() <= 4
+        await ds.aclose()
+        assert [d async for d in ds] == []
+        return first
+
+    assert asyncio.run(main()) == "w0 "
+    assert _wait_aborted(server) and server.sent < 400
+
+
+class _Channel:
+    def __init__(self):
+        self.sent = []
+
+    def typing(self):
+        class _Typing:
+            async def __aenter__(self):
+                return None
+
+            async def __aexit__(self, *exc):
+                return None
+
+        return _Typing()
+
+    async def send(self, text, **kwargs):
+        self.sent.append(text)
+
+
+def test_char_cap_aborts_upstream_and_sets_max_output_tokens(server):
+    server.deltas = ["word. " for _ in range(400)]
+    server.delay = 0.002
+    channel = _Channel()
+
+    async def main():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS, max_output_tokens=120)
+        text = await send_stream_as_messages(channel, ds, max_total_chars=30, rate_hz=100.0)
+        return text, ds
+
+    text, ds = asyncio.run(main())
+    assert text == ("word. " * 5) and ds.aborted and ds.usage is None
+    assert ds.estimated_usage()[1] >= 8 and ds.estimated_usage()[0] > 0
+    assert server.requests[0]["max_output_tokens"] == 120
+    assert _wait_aborted(server) and server.sent < 400
+    assert "".join(channel.sent).strip() == text.strip()
+
+
+def test_send_gate_denial_aborts_upstream(server):
+    server.deltas = ["line\n" for _ in range(400)]
+    server.delay = 0.002
+
+    async def main():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS)
+        await send_stream_as_messages(_Channel(), ds, send_gate=lambda: False)
+        return ds
+
+    assert asyncio.run(main()).aborted
+    assert _wait_aborted(server)
+
+
+def test_hedge_races_slow_first_token(server):
+    server.first_delay = {"gpt-5-mini": 1.5}
+
+    async def main():
+        started = time.perf_counter()
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS, hedge_after=0.2, hedge_model="gpt-5-nano")
+        text = "".join([d async for d in ds])
+        return ds, text, time.perf_counter() - started
+
+    ds, text, elapsed = asyncio.run(main())
+    assert text == "Hello world" and elapsed < 1.2
+    assert ds.hedged and ds.model == "gpt-5-nano" and ds.usage == (5, 2, 0)
+    assert [m for m, _u in ds.hedge_usage] == ["gpt-5-mini"] and ds.hedge_usage[0][1][0] > 0
+    assert [r["model"] for r in server.requests] == ["gpt-5-mini", "gpt-5-nano"]
+    assert TTFT.quantile("gpt-5-nano", 0.9) is None  # too few samples for "auto"
+
+
+def test_no_hedge_when_first_token_is_fast(server):
+    async def main():
+        ds = await stream_deltas("sk", "gpt-5-mini", ITEMS, hedge_after=1.0)
+        return ds, [d async for d in ds]
+
+    ds, out = asyncio.run(main())
+    assert out == ["Hel", "lo ", "world"] and not ds.hedged and ds.hedge_usage == []
+    assert len(server.requests) == 1
@@ -0,0 +1,83 @@
+import asyncio
+
+from llm_chatbot.memory import MemoryStore
+from llm_chatbot.summarizer import RollingSummarizer
+
+
+def test_rolling_summary_refresh_select_and_persist(tmp_path):
+    path = tmp_path / "context.json"
+    store = MemoryStore(path)
+    calls = []
+
+    def fake_summarize(previous, msgs):
+        calls.append((previous, [m["content"] for m in msgs]))
+        return f"summary of {len(msgs)}", (100, 10, 0)
+
+    summ = RollingSummarizer(store, fake_summarize, trigger=5, keep_last=3)
+    for i in range(7):
+        store.append_message(1, {"role": "user", "content": "ann: " + f"message number {i} " * 5, "author": "ann"})  # as the bot stores it
+    assert summ.pending_range(store.get(1)) is None
+
+    async def main():
+        store.append_message(1, {"role": "user", "content": "message number 7 " * 5})
+        assert summ.maybe_schedule(1)
+        assert not summ.maybe_schedule(1)  # already in flight
+        while summ._inflight:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert len(calls) == 1 and len(calls[0][1]) == 5
+    assert calls[0][1][0].startswith("ann: message number 0") and "ann: ann:" not in calls[0][1][0]
+    ctx = store.get(1)
+    assert (ctx.summary, ctx.summary_upto) == ("summary of 5", 5)
+
+    summary, history = summ.select(ctx, 8)
+    assert summary == "summary of 5"
+    assert [m.seq for m in history] == [5, 6, 7]
+    assert summ.stats.last_saved > 0 and summ.stats.input_tokens == 100
+
+    store.save()
+    again = MemoryStore(path)
+    assert again.get(1).summary_upto == 5 and again.get(1).summary == "summary of 5"
+
+
+def test_stale_summary_is_discarded_after_reset(tmp_path):
+    store = MemoryStore(tmp_path / "context.json")
+    summ = RollingSummarizer(store, lambda prev, msgs: ("s", (0, 0, 0)), trigger=2, keep_last=1)
+    for i in range(4):
+        store.append_message(1, {"role": "user", "content": str(i)})
+
+    async def main():
+        assert summ.maybe_schedule(1)
+        store.reset(1)
+        while summ._inflight:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert store.get(1).summary == ""
+
+
+def test_refresh_does_not_inherit_the_reply_context(tmp_path):
+    from llm_chatbot.resilience import current_deadline, start_deadline
+    from llm_chatbot.scheduler import _WORK, set_work
+
+    store = MemoryStore(tmp_path / "context.json")
+    seen = []
+
+    def fake_summarize(previous, msgs):
+        seen.append((current_deadline(), _WORK.get()))
+        return "s", (1, 1, 0)
+
+    summ = RollingSummarizer(store, fake_summarize, trigger=1, keep_last=1)
+    for i in range(3):
+        store.append_message(1, {"role": "user", "content": f"m{i}"})
+
+    async def main():
+        start_deadline(0.01)  # the reply's deadline, about to run out
+        set_work("direct", "guild-1")
+        assert summ.maybe_schedule(1)
+        while summ._inflight:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert seen == [(None, ("background", "summary"))] and summ.stats.runs == 1
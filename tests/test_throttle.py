@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import response_json, sse_events
+from llm_chatbot import openai_client
+from llm_chatbot.streaming import stream_deltas
+from llm_chatbot.throttle import THROTTLE, RateLimitTracker, ThrottleConfig, parse_reset
+
+
+def _headers(limit_r, left_r, reset_r, limit_t, left_t, reset_t):
+    return {
+        "x-ratelimit-limit-requests": str(limit_r),
+        "x-ratelimit-remaining-requests": str(left_r),
+        "x-ratelimit-reset-requests": reset_r,
+        "x-ratelimit-limit-tokens": str(limit_t),
+        "x-ratelimit-remaining-tokens": str(left_t),
+        "x-ratelimit-reset-tokens": reset_t,
+    }
+
+
+def test_parse_reset_durations():
+    assert parse_reset("1s") == 1.0 and parse_reset("6m0s") == 360.0 and parse_reset("20ms") == 0.02
+    assert parse_reset("1h2m3.5s") == 3723.5 and parse_reset("2") == 2.0 and parse_reset("") is None
+
+
+def test_buckets_follow_headers_and_pace_bursts(clock):
+    t = RateLimitTracker(ThrottleConfig(), clock=clock)
+    assert t.reserve("sk", "gpt-5-mini", 100) == 0.0  # nothing known yet
+    t.observe("sk", "gpt-5-mini", _headers(60, 2, "2s", 10000, 9000, "6s"))
+    assert t.headroom("sk", "gpt-5-mini") == {"requests": round(2 / 60, 3), "tokens": 0.9}
+    assert t.reserve("sk", "gpt-5-mini", 100) == 0.0
+    assert t.reserve("sk", "gpt-5-mini", 100) == 0.0
+    # Third request in the burst: one request short, refilled at (60 - 2) / 2s per second
+    assert t.reserve("sk", "gpt-5-mini", 100) == pytest.approx(1 / 29)
+    clock.now += 1.0
+    assert t.reserve("sk", "gpt-5-mini", 9000) == pytest.approx((9000 - 8700 - 1000 / 6) / (1000 / 6))
+    row = t.snapshot()[0]
+    assert row["model"] == "gpt-5-mini" and row["requests_limit"] == 60 and row["paced"] == 2 and row["requests"] == 5
+    assert t.reserve("sk", "gpt-5-nano", 100) == 0.0  # limits are per model
+
+
+@pytest.fixture
+def server(server):
+    """Sends `server.limits` as rate-limit headers and records request times in `server.times`."""
+    server.times, server.limits = [], _headers(100, 0, "20s", 100000, 99000, "1s")
+
+    def respond(handler, body):
+        server.times.append(time.perf_counter())
+        if body.get("stream"):
+            handler.send_events(sse_events(["ok"]), server.limits)
+        else:
+            handler.send_json(200, response_json(), server.limits)
+
+    server.respond = respond
+    return server
+
+
+def test_requests_and_streams_wait_for_header_budget(server):
+    key = "sk-throttle-e2e-7e2e"
+    msgs = [{"role": "user", "content": "hi"}]
+
+    async def main():
+        await openai_client.chat_complete_with_usage_async(key, "gpt-5-nano", msgs)  # warms the SDK; other model, other limits
+        await openai_client.chat_complete_with_usage_async(key, "gpt-5-mini", msgs)  # learns: 0 requests left
+        await openai_client.chat_complete_with_usage_async(key, "gpt-5-mini", msgs)
+        ds = await stream_deltas(key, "gpt-5-mini", [{"role": "user", "content": [{"type": "input_text", "text": "hi"}]}])
+        return "".join([d async for d in ds])
+
+    assert asyncio.run(main()) == "ok"
+    gaps = [b - a for a, b in zip(server.times[1:], server.times[2:])]
+    # 100 requests refill over 20 s: the next one waits ~200 ms instead of drawing a 429
+    assert len(gaps) == 2 and all(g >= 0.18 for g in gaps)
+    row = next(r for r in THROTTLE.snapshot() if r["key"] == "…7e2e" and r["model"] == "gpt-5-mini")
+    assert row["paced"] == 2 and row["requests_limit"] == 100 and row["limited"] == 0
+
+
+def test_pause_is_taken_outside_the_attempt_timeout(server, monkeypatch):
+    from llm_chatbot import resilience
+    from llm_chatbot.resilience import ResilienceConfig
+
+    key = "sk-throttle-pace-0a1b"
+    msgs = [{"role": "user", "content": "hi"}]
+    server.limits = _headers(4, 0, "6s", 100000, 99000, "1s")  # the next request is 1.5 s away
+    asyncio.run(openai_client.chat_complete_with_usage_async(key, "gpt-5-nano", msgs))  # warms the SDK
+    asyncio.run(openai_client.chat_complete_with_usage_async(key, "gpt-5-mini", msgs))  # learns: 0 requests left
+    # The pause is longer than a whole attempt may take, and no retry is allowed
+    monkeypatch.setattr(resilience, "SETTINGS", ResilienceConfig(attempts=1, chat_timeout=0.2))
+    text, _usage = asyncio.run(openai_client.chat_complete_with_usage_async(key, "gpt-5-mini", msgs))
+    assert text == "ok" and server.times[-1] - server.times[-2] >= 1.4
+    row = next(r for r in THROTTLE.snapshot() if r["key"] == "…0a1b" and r["model"] == "gpt-5-mini")
+    assert row["paced"] == 1 and row["requests"] == 2  # the resend reused the paced reservation